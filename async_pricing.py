@@ -0,0 +1,170 @@
+import asyncio
+import functools
+import random
+import time
+
+import instrumentation
+from aws_cost_estimation import (
+    SharedPricingClient,
+    make_query_key,
+    plan_service_estimate,
+    price_service_estimate,
+)
+from instrumentation import instrumented
+from price_records import records_from_response
+
+# The Pricing API quota is low; these defaults keep a single process under it
+DEFAULT_RATE_PER_SECOND = 10.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_BASE_DELAY = 0.2
+DEFAULT_MAX_DELAY = 10.0
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "SlowDown",
+}
+
+
+def is_throttling_error(error):
+    # botocore's ClientError carries the service error code in .response
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter shared by every request made through a client."""
+
+    def __init__(self, rate_per_second=DEFAULT_RATE_PER_SECOND, burst=DEFAULT_BURST):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive.")
+        self.rate_per_second = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    async def acquire(self):
+        # Holding the lock while sleeping hands tokens out in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+                self._refill()
+            self._tokens -= 1
+
+
+class AsyncPricingClient:
+    """Async wrapper around a blocking pricing client.
+
+    Calls run in a thread executor so the event loop never blocks. All calls
+    share one TokenBucket, throttling errors are retried with full-jitter
+    exponential backoff, and identical in-flight queries share a single call.
+    """
+
+    def __init__(self, client, rate_limiter=None, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, executor=None):
+        self.client = client
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = executor
+        self.calls = 0
+        self.retries = 0
+        self._in_flight = {}
+
+    async def get_products(self, ServiceCode, Filters, MaxResults=1, **kwargs):
+        if kwargs.get("NextToken"):
+            return await self._fetch(ServiceCode, Filters, MaxResults, kwargs)
+
+        key = make_query_key(ServiceCode, Filters, MaxResults)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(ServiceCode, Filters, MaxResults, kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _fetch(self, service_code, filters, max_results, kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(
+            self.client.get_products, ServiceCode=service_code, Filters=filters, MaxResults=max_results, **kwargs
+        )
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            self.calls += 1
+            try:
+                return await loop.run_in_executor(self.executor, call)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+            self.retries += 1
+            await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+            attempt += 1
+
+
+def create_async_pricing_client(rate_per_second=DEFAULT_RATE_PER_SECOND, burst=DEFAULT_BURST,
+                                max_retries=DEFAULT_MAX_RETRIES, client=None, executor=None):
+    return AsyncPricingClient(
+        client if client is not None else SharedPricingClient(),
+        rate_limiter=TokenBucket(rate_per_second, burst),
+        max_retries=max_retries,
+        executor=executor,
+    )
+
+
+async def _fetch_records_async(pricing_client, service_code, filters):
+    with instrumentation.QueryTimer(pricing_client, service_code, filters) as timer:
+        response = timer.received(
+            await pricing_client.get_products(ServiceCode=service_code, Filters=filters, MaxResults=1)
+        )
+        return records_from_response(response, service_code)
+
+
+async def _fetch_unique_queries_async(pricing_client, unique_queries):
+    keys = list(unique_queries)
+    records = await asyncio.gather(*(
+        _fetch_records_async(pricing_client, service_code, filters)
+        for service_code, filters in unique_queries.values()
+    ), return_exceptions=True)
+    return dict(zip(keys, records))
+
+
+async def _estimate_service_async(pricing_client, architecture_json, node_type, node_index=None):
+    nodes, configs, unique_queries = plan_service_estimate(architecture_json, node_type, node_index)
+    records_by_key = await _fetch_unique_queries_async(pricing_client, unique_queries)
+    return price_service_estimate(nodes, configs, records_by_key)
+
+
+@instrumented("get_rds_cost_estimate_async")
+async def get_rds_cost_estimate_async(pricing_client, architecture_json, node_index=None):
+    return await _estimate_service_async(pricing_client, architecture_json, 'AmazonRDS', node_index)
+
+
+@instrumented("get_ec2_cost_estimate_async")
+async def get_ec2_cost_estimate_async(pricing_client, architecture_json, node_index=None):
+    return await _estimate_service_async(pricing_client, architecture_json, 'AmazonEC2', node_index)
+
+
+@instrumented("get_lambda_cost_estimate_async")
+async def get_lambda_cost_estimate_async(pricing_client, architecture_json, node_index=None):
+    return await _estimate_service_async(pricing_client, architecture_json, 'AWSLambda', node_index)
+
+
+@instrumented("get_s3_cost_estimate_async")
+async def get_s3_cost_estimate_async(pricing_client, architecture_json, node_index=None):
+    return await _estimate_service_async(pricing_client, architecture_json, 'AmazonS3', node_index)
@@ -1,14 +1,13 @@
-import boto3
 import json
 import os
-from dotenv import load_dotenv
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize logger for this module
+from instrumentation import instrumented
+from price_records import fetch_price_records, first_price
+from tiered_pricing import TierTable, tier_table
 
-# Load credentials from .env
-load_dotenv()
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+# Initialize logger for this module
 
 REGION_CODE_MAP = {
                   "US East (N. Virginia)": "us-east-1",
@@ -44,28 +43,171 @@ REGION_CODE_MAP = {
                 }
 
 REGION_USAGE_TYPE_PREFIX = {
-                              "ap-south-1": "APS3", # Mumbai
-                              "ap-southeast-1": "APS1", # Singapore
                               "us-east-1": "USE1", # N. Virginia
+                              "us-east-2": "USE2", # Ohio
+                              "us-west-1": "USW1", # N. California
                               "us-west-2": "USW2", # Oregon
+                              "af-south-1": "AFS1", # Cape Town
+                              "ap-east-1": "APE1", # Hong Kong
+                              "ap-south-2": "APS5", # Hyderabad
+                              "ap-southeast-3": "APS6", # Jakarta
+                              "ap-southeast-4": "APS7", # Melbourne
+                              "ap-south-1": "APS3", # Mumbai
+                              "ap-northeast-3": "APN3", # Osaka
+                              "ap-northeast-2": "APN2", # Seoul
+                              "ap-southeast-1": "APS1", # Singapore
+                              "ap-southeast-2": "APS2", # Sydney
+                              "ap-northeast-1": "APN1", # Tokyo
+                              "ca-central-1": "CAN1", # Central
+                              "eu-central-1": "EUC1", # Frankfurt
+                              "eu-west-1": "EU", # Ireland
+                              "eu-west-2": "EUW2", # London
+                              "eu-south-1": "EUS1", # Milan
+                              "eu-west-3": "EUW3", # Paris
+                              "eu-south-2": "EUS2", # Spain
+                              "eu-north-1": "EUN1", # Stockholm
+                              "eu-central-2": "EUC2", # Zurich
+                              "me-south-1": "MES1", # Bahrain
+                              "me-central-1": "MEC1", # UAE
+                              "sa-east-1": "SAE1", # São Paulo
+                              "us-gov-east-1": "UGE1", # GovCloud (US-East)
+                              "us-gov-west-1": "UGW1", # GovCloud (US-West)
                             }
 
+LAMBDA_FREE_REQUESTS_PER_MONTH = 1000000
+
+# Instance hours billed in a month
+HOURS_PER_MONTH = 730
+
+
+def clip_at_zero(quantity):
+    # max(0, quantity) that also works element-wise on NumPy arrays
+    if hasattr(quantity, "clip"):
+        return quantity.clip(0)
+    return max(0, quantity)
+
+
+def node_attribute_reader(node):
+    # attribute(name) reads a required usage attribute, attribute(name, default) an optional one
+    attributes = node['attributes']
+
+    def attribute(name, *default):
+        return attributes.get(name, default[0]) if default else attributes[name]
+
+    return attribute
+
+
+def node_components(node, records, attribute=None):
+    """[(component, monthly quantity, TierTable)] for one node.
+
+    attribute defaults to node_attribute_reader(node); pass another reader
+    (e.g. one returning arrays of sampled values) to price other quantities.
+    """
+    usage, component_prices = NODE_COMPONENTS[node['type']]
+    quantities = usage(attribute if attribute is not None else node_attribute_reader(node))
+    prices = component_prices(records, node)
+    return [(name, quantity, prices[name]) for name, quantity in quantities.items()]
 
-def create_pricing_client():
+
+def price_components(components, total_key, total_digits=4):
+    costs = {f"{name}_monthly_usd": round(tiers.cost(quantity), 4) for name, quantity, tiers in components}
+    costs[total_key] = round(sum(costs.values()), total_digits)
+    return costs
+
+
+def resolve_region(region):
+    # Accepts a region code ("ap-south-1") or a Pricing API location name;
+    # returns (location name, region code)
+    if region in REGION_CODE_MAP:
+        return region, REGION_CODE_MAP[region]
+    for location, region_code in REGION_CODE_MAP.items():
+        if region_code == region:
+            return location, region_code
+    raise ValueError(f"Region '{region}' not mapped to AWS region code.")
+
+
+def resolve_regions(regions):
+    return [resolve_region(region) for region in regions]
+
+
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+
+_credentials = None
+_shared_clients = {}  # max_pool_connections -> boto3 pricing client
+_shared_clients_lock = threading.Lock()
+
+
+def load_credentials():
+    # .env is only read once a live client is needed; cache-only and offline
+    # estimates never import dotenv or boto3.
+    global _credentials
+    if _credentials is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _credentials = (os.getenv("AWS_ACCESS_KEY_ID"), os.getenv("AWS_SECRET_ACCESS_KEY"))
+    return _credentials
+
+
+def create_pricing_client(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+    import boto3
+    from botocore.config import Config
+
+    access_key, secret_key = load_credentials()
     return boto3.client(
         'pricing',
         region_name='us-east-1',  # Pricing API is only in us-east-1
-        aws_access_key_id=AWS_ACCESS_KEY,
-        aws_secret_access_key=AWS_SECRET_KEY
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        config=Config(max_pool_connections=max_pool_connections, tcp_keepalive=True),
+    )
+
+
+def get_shared_pricing_client(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+    # boto3 clients are thread-safe, so one per pool size is shared by every
+    # thread and keeps its TLS connections alive between estimates.
+    client = _shared_clients.get(max_pool_connections)
+    if client is None:
+        with _shared_clients_lock:
+            client = _shared_clients.get(max_pool_connections)
+            if client is None:
+                client = _shared_clients[max_pool_connections] = create_pricing_client(max_pool_connections)
+    return client
+
+
+class SharedPricingClient:
+    """Handle on the process-wide pricing client, which is only built on the first get_products call."""
+
+    def __init__(self, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+        self.max_pool_connections = max_pool_connections
+
+    def get_products(self, **kwargs):
+        return get_shared_pricing_client(self.max_pool_connections).get_products(**kwargs)
+
+def make_query_key(service_code, filters, max_results=1):
+    # Filter order and field-name case do not change the Pricing API answer,
+    # so both are normalised away before the key is built.
+    canonical_filters = sorted(
+        (f.get("Type", "TERM_MATCH"), f["Field"].lower(), str(f["Value"]))
+        for f in filters
     )
+    return json.dumps([service_code, canonical_filters, max_results], separators=(",", ":"))
+
 
-def get_rds_cost_estimate(pricing_client,architecture_json):
+def index_nodes_by_type(architecture_json):
+    # One pass over the diagram: node type -> [nodes]
+    node_index = {}
+    for node in architecture_json['nodes']:
+        node_index.setdefault(node['type'], []).append(node)
+    return node_index
 
-    # Find RDS node
-    rds_node = next((node for node in architecture_json['nodes'] if node['type'] == 'AmazonRDS'), None)
-    if not rds_node:
-        raise ValueError("No AmazonRDS node found in the architecture JSON.")
 
+def node_config_key(node):
+    # Nodes with the same type, region and attributes always price the same
+    return json.dumps([node['type'], node.get('region'), node.get('attributes', {})], sort_keys=True, separators=(",", ":"))
+
+
+def build_rds_queries(rds_node):
     region_friendly = rds_node['region']
     aws_region = REGION_CODE_MAP.get(region_friendly)
     if not aws_region:
@@ -75,10 +217,8 @@ def get_rds_cost_estimate(pricing_client,architecture_json):
     instance_type = attributes['instanceType']
     db_engine = attributes['databaseEngine'].lower()
     term_type = attributes['termType']
-    storage_gb = attributes['storageGB']
-    storage_type = attributes['storageType']
 
-    # Fetch RDS Instance Price 
+    # RDS Instance Price
     instance_filters = [
         {"Type": "TERM_MATCH", "Field": "instanceType", "Value": instance_type},
         {"Type": "TERM_MATCH", "Field": "databaseEngine", "Value": db_engine},
@@ -88,34 +228,7 @@ def get_rds_cost_estimate(pricing_client,architecture_json):
         {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Database Instance"},
     ]
 
-    instance_price_response = pricing_client.get_products(
-        ServiceCode='AmazonRDS',
-        Filters=instance_filters,
-        MaxResults=1
-    )
-
-    if not instance_price_response['PriceList']:
-        raise ValueError("Could not fetch RDS instance pricing info.")
-
-    price_item = json.loads(instance_price_response['PriceList'][0])
-
-    # Get correct term level (e.g., "OnDemand" or "Reserved")
-    term_type_key = list(price_item["terms"].keys())[0]  # usually 'OnDemand'
-    term_data_map = price_item["terms"][term_type_key]
-    first_term_id = next(iter(term_data_map))  # grab the first SKU id under OnDemand
-    term_data = term_data_map[first_term_id]
-
-    # Now get the price
-    if "priceDimensions" not in term_data:
-        raise ValueError("priceDimensions not found in RDS term data.")
-
-    price_dimension = next(iter(term_data["priceDimensions"].values()))
-    instance_price_per_hour = float(price_dimension["pricePerUnit"]["USD"])
-
-    instance_price_per_hour = float(price_dimension['pricePerUnit']['USD'])
-    monthly_instance_cost = round(instance_price_per_hour * 730, 4)
-
-    #  Fetch RDS Storage Price 
+    # RDS Storage Price
     storage_filters = [
         {"Type": "TERM_MATCH", "Field": "serviceCode", "Value": "AmazonRDS"},
         {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Database Storage"},
@@ -123,268 +236,178 @@ def get_rds_cost_estimate(pricing_client,architecture_json):
         {"Type": "TERM_MATCH", "Field": "volumeType", "Value": "General Purpose"},
         {"Type": "TERM_MATCH", "Field": "databaseEngine", "Value": db_engine},
         {"Type": "TERM_MATCH", "Field": "deploymentOption", "Value": "Single-AZ"},
-         ]
+    ]
+
+    return {
+        "instance": ('AmazonRDS', instance_filters),
+        "storage": ('AmazonRDS', storage_filters),
+    }
+
+
+def rds_usage(attribute):
+    return {
+        "rds_instance": HOURS_PER_MONTH,
+        "rds_storage": attribute("storageGB"),
+    }
+
+
+def rds_component_prices(records, node):
+    # Hourly rate of the first term of the node's term type (e.g., "OnDemand" or
+    # "Reserved"); the live API returns every term of the matched product
+    term_type = node['attributes'].get('termType', "OnDemand")
+    return {
+        "rds_instance": TierTable.flat(first_price(records["instance"], "RDS instance", term_type, unit="Hrs")),
+        "rds_storage": TierTable.flat(first_price(records["storage"], "RDS storage", term_type="OnDemand")),
+    }
 
-    storage_price_response = pricing_client.get_products(
-        ServiceCode='AmazonRDS',
-        Filters=storage_filters,
-        MaxResults=1
-    )
 
+def price_rds_node(rds_node, records):
+    return price_components(node_components(rds_node, records), "rds_total_monthly_usd")
 
-    if not storage_price_response['PriceList']:
-        raise ValueError("Could not fetch RDS storage pricing info.")
 
-    storage_item = json.loads(storage_price_response['PriceList'][0])
-    storage_term_data = next(iter(storage_item['terms']['OnDemand'].values()))
-    storage_price_dimension = next(iter(storage_term_data['priceDimensions'].values()))
-    storage_price_per_gb = float(storage_price_dimension['pricePerUnit']['USD'])
-    monthly_storage_cost = round(storage_price_per_gb * storage_gb, 4)
+@instrumented("get_rds_cost_estimate")
+def get_rds_cost_estimate(pricing_client, architecture_json, node_index=None):
+    return _estimate_service(pricing_client, architecture_json, 'AmazonRDS', node_index)
 
-    # --- 3. Total Cost ---
-    total_rds_monthly_cost = round(monthly_instance_cost + monthly_storage_cost, 4)
 
+def build_ec2_queries(ec2_node):
+    region = ec2_node['region']  # For EC2 pricing API, region is used as location (full name)
+
+    attributes = ec2_node['attributes']
+    instance_type = attributes.get("instanceType", "t3.micro")
+    operating_system = attributes.get("operatingSystem", "Linux")
+    tenancy = attributes.get("tenancy", "Shared")
+    capacity_status = attributes.get("capacitystatus", "Used")
+    pre_installed_sw = attributes.get("preInstalledSw", "NA")
+    term_type = attributes.get("termType", "OnDemand")
+    volume_type = attributes.get("volumeType", "gp3")  # typical default
+
+    # EC2 instance pricing filters
+    ec2_filters = [
+        {"Type": "TERM_MATCH", "Field": "instanceType", "Value": instance_type},
+        {"Type": "TERM_MATCH", "Field": "operatingSystem", "Value": operating_system},
+        {"Type": "TERM_MATCH", "Field": "tenancy", "Value": tenancy},
+        {"Type": "TERM_MATCH", "Field": "capacitystatus", "Value": capacity_status},
+        {"Type": "TERM_MATCH", "Field": "preInstalledSw", "Value": pre_installed_sw},
+        {"Type": "TERM_MATCH", "Field": "termType", "Value": term_type},
+        {"Type": "TERM_MATCH", "Field": "location", "Value": region}
+    ]
+
+    # EBS (EC2 storage) pricing filters
+    storage_filters = [
+        {"Type": "TERM_MATCH", "Field": "serviceCode", "Value": "AmazonEC2"},
+        {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Storage"},
+        {"Type": "TERM_MATCH", "Field": "location", "Value": region},
+        {"Type": "TERM_MATCH", "Field": "volumeApiName", "Value": volume_type},
+    ]
+
+    return {
+        "instance": ('AmazonEC2', ec2_filters),
+        "storage": ('AmazonEC2', storage_filters),
+    }
+
+
+def ec2_usage(attribute):
     return {
-        "rds_instance_monthly_usd": monthly_instance_cost,
-        "rds_storage_monthly_usd": monthly_storage_cost,
-        "rds_total_monthly_usd": total_rds_monthly_cost
+        "ec2_instance": HOURS_PER_MONTH,
+        "ec2_storage": attribute("storageGB", 30),  # default EBS size
     }
 
-def get_ec2_cost_estimate(pricing_client, architecture_json):
-  #  Find EC2 node 
-        ec2_node = next((node for node in architecture_json['nodes'] if node['type'] == 'AmazonEC2'), None)
-        if not ec2_node:
-            raise ValueError("No AmazonEC2 node found in the architecture JSON.")
-
-        region_friendly = ec2_node['region']
-        region = region_friendly  # For EC2 pricing API, region is used as location (full name)
-
-        attributes = ec2_node['attributes']
-        instance_type = attributes.get("instanceType", "t3.micro")
-        operating_system = attributes.get("operatingSystem", "Linux")
-        tenancy = attributes.get("tenancy", "Shared")
-        capacity_status = attributes.get("capacitystatus", "Used")
-        pre_installed_sw = attributes.get("preInstalledSw", "NA")
-        term_type = attributes.get("termType", "OnDemand")
-
-  #  Build EC2 pricing filters 
-        ec2_filters = [
-            {"Type": "TERM_MATCH", "Field": "instanceType", "Value": instance_type},
-            {"Type": "TERM_MATCH", "Field": "operatingSystem", "Value": operating_system},
-            {"Type": "TERM_MATCH", "Field": "tenancy", "Value": tenancy},
-            {"Type": "TERM_MATCH", "Field": "capacitystatus", "Value": capacity_status},
-            {"Type": "TERM_MATCH", "Field": "preInstalledSw", "Value": pre_installed_sw},
-            {"Type": "TERM_MATCH", "Field": "termType", "Value": term_type},
-            {"Type": "TERM_MATCH", "Field": "location", "Value": region}
-        ]
-
-  #  Query Pricing API 
-        ec2_price_response = pricing_client.get_products(
-            ServiceCode='AmazonEC2',
-            Filters=ec2_filters,
-            MaxResults=1
-        )
-
-        if not ec2_price_response['PriceList']:
-            raise ValueError("Could not fetch EC2 instance pricing info.")
-
-        price_item = json.loads(ec2_price_response['PriceList'][0])
-        term_type_key = list(price_item['terms'].keys())[0]  # 'OnDemand' or 'Reserved'
-        term_data_map = price_item['terms'][term_type_key]
-        first_term_id = next(iter(term_data_map))
-        term_data = term_data_map[first_term_id]
-
-        if "priceDimensions" not in term_data:
-            raise ValueError("priceDimensions not found in EC2 term data.")
-
-        price_dimension = next(iter(term_data["priceDimensions"].values()))
-        instance_price_per_hour = float(price_dimension["pricePerUnit"]["USD"])
-        monthly_instance_cost = round(instance_price_per_hour * 730, 4)
-
-        
-        
-
-  # Start of EBS calculation block      
-        storage_gb = attributes.get("storageGB", 30)  # default EBS size
-        volume_type = attributes.get("volumeType", "gp3")  # typical default
-        
-
-  # Build EBS (EC2 storage) pricing filter
-        storage_filters = [
-                            {"Type": "TERM_MATCH", "Field": "serviceCode", "Value": "AmazonEC2"},
-                            {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Storage"},
-                            {"Type": "TERM_MATCH", "Field": "location", "Value": region},
-                            {"Type": "TERM_MATCH", "Field": "volumeApiName", "Value": volume_type},
-                                 
-                          ]
-  #  Query Pricing API 
-        ebs_price_response = pricing_client.get_products(
-            ServiceCode='AmazonEC2',
-            Filters=storage_filters,
-            MaxResults=1
-        )
-  # logger.debug(json.dumps(ebs_price_response, indent=2))
-
-        if not ebs_price_response['PriceList']:
-            raise ValueError("Could not fetch EC2 storage (EBS) pricing info.")
-
-        storage_item = json.loads(ebs_price_response['PriceList'][0])
-        term_type_key = list(storage_item['terms'].keys())[0]  # 'OnDemand'
-        term_data_map = storage_item['terms'][term_type_key]
-        first_term_id = next(iter(term_data_map))
-        term_data = term_data_map[first_term_id]
-
-        if "priceDimensions" not in term_data:
-            raise ValueError("priceDimensions not found in EC2 storage term data.")
-
-        price_dimension = next(iter(term_data["priceDimensions"].values()))
-        storage_price_per_gb = float(price_dimension["pricePerUnit"]["USD"])
-        monthly_storage_cost = round(storage_price_per_gb * storage_gb, 4)
-        total_ec2_monthly_cost = round(monthly_instance_cost + monthly_storage_cost, 3)
-
-        return {
-            "ec2_instance_monthly_usd": monthly_instance_cost,
-            "ec2_storage_monthly_usd": monthly_storage_cost,
-            "ec2_total_monthly_usd": total_ec2_monthly_cost
-        }
-
-def get_lambda_cost_estimate(pricing_client, architecture_json):
-    # Find Lambda node
-    lambda_node = next((node for node in architecture_json['nodes'] if node['type'] == 'AWSLambda'), None)
-    if not lambda_node:
-        raise ValueError("No AWSLambda node found in the architecture JSON.")
 
+def ec2_component_prices(records, node):
+    term_type = node['attributes'].get("termType", "OnDemand")
+    return {
+        "ec2_instance": TierTable.flat(first_price(records["instance"], "EC2 instance", term_type, unit="Hrs")),
+        "ec2_storage": TierTable.flat(first_price(records["storage"], "EC2 storage (EBS)")),
+    }
+
+
+def price_ec2_node(ec2_node, records):
+    return price_components(node_components(ec2_node, records), "ec2_total_monthly_usd", total_digits=3)
+
+
+@instrumented("get_ec2_cost_estimate")
+def get_ec2_cost_estimate(pricing_client, architecture_json, node_index=None):
+    return _estimate_service(pricing_client, architecture_json, 'AmazonEC2', node_index)
+
+
+def build_lambda_queries(lambda_node):
     region_friendly = lambda_node['region']
     aws_region = REGION_CODE_MAP.get(region_friendly.strip())
+    if not aws_region:
+        raise ValueError(f"Region '{region_friendly}' not mapped to AWS region code.")
     aws_region_prefix = REGION_USAGE_TYPE_PREFIX.get(aws_region.strip())
-
-
-    attributes = lambda_node['attributes']
-    requests_per_month = attributes.get("requestsPerMonth", 1000000)
-    memory_mb = attributes.get("memorySizeMB", 128)
-    duration_ms = attributes.get("durationMs", 100)
-    
     if not aws_region_prefix:
-       raise ValueError(f"Region prefix for '{aws_region}' not found.")
+        raise ValueError(f"Region prefix for '{aws_region}' not found.")
 
     # Lambda pricing filters for compute (GB-second)
     compute_filters = [
-                      {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Serverless"},
-                      {"Type": "TERM_MATCH", "Field": "regionCode", "Value": aws_region},
-                      {"Type": "TERM_MATCH", "Field": "usagetype", "Value": f"{aws_region_prefix}-Lambda-GB-Second"},
-                  ]
-
+        {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Serverless"},
+        {"Type": "TERM_MATCH", "Field": "regionCode", "Value": aws_region},
+        {"Type": "TERM_MATCH", "Field": "usagetype", "Value": f"{aws_region_prefix}-Lambda-GB-Second"},
+    ]
 
-    compute_price_response = pricing_client.get_products(
-        ServiceCode="AWSLambda",
-        Filters=compute_filters,
-        MaxResults=1
-    )
-    # logger.debug( compute_price_response)
-    if not compute_price_response['PriceList']:
-        raise ValueError("Could not fetch Lambda compute pricing info.")
-
-    compute_item = json.loads(compute_price_response['PriceList'][0])
-    term_type_key = list(compute_item['terms'].keys())[0]
-    term_data_map = compute_item['terms'][term_type_key]
-    first_term_id = next(iter(term_data_map))
-    term_data = term_data_map[first_term_id]
-
-    if "priceDimensions" not in term_data:
-        raise ValueError("priceDimensions not found in Lambda compute term data.")
-
-    compute_price_dimension = next(iter(term_data["priceDimensions"].values()))
-    price_per_gb_second = float(compute_price_dimension["pricePerUnit"]["USD"])
-    
     # Lambda pricing filters for requests
     request_filters = [
-                      {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Serverless"},
-                      {"Type": "TERM_MATCH", "Field": "regionCode", "Value": "ap-south-1"},
-                      {"Type": "TERM_MATCH", "Field": "usagetype", "Value": "APS3-Request"},
-                      ]
-     
-
-    request_price_response = pricing_client.get_products(
-        ServiceCode="AWSLambda",
-        Filters=request_filters,
-        MaxResults=1
-    )
-#    response = pricing_client.get_products(
-#    ServiceCode="AWSLambda",
-#    Filters=[
-#        {"Type": "TERM_MATCH", "Field": "location", "Value": region_friendly},
-#    ],
-#    MaxResults=100
-#    )
-#
-#    for p in response['PriceList']:
-#        product = json.loads(p)
-#        logger.debug(json.dumps(product['product']['attributes'], indent=2))
-
-    #logger.debug(request_price_response['PriceList'])
-    if not request_price_response['PriceList']:
-        raise ValueError("Could not fetch Lambda request pricing info.")
-
-    request_item = json.loads(request_price_response['PriceList'][0])
-    term_data_map = request_item['terms'][term_type_key]
-    first_term_id = next(iter(term_data_map))
-    request_term_data = term_data_map[first_term_id]
-
-    if "priceDimensions" not in request_term_data:
-        raise ValueError("priceDimensions not found in Lambda request term data.")
-
-    request_price_dimension = next(iter(request_term_data["priceDimensions"].values()))
-    price_per_request = float(request_price_dimension["pricePerUnit"]["USD"])
-
-    # Compute cost calculation
-    total_gb_seconds = (duration_ms / 1000) * (memory_mb / 1024) * requests_per_month
-    total_compute_cost = round(price_per_gb_second * total_gb_seconds, 4)
-
-    billable_requests = max(0, requests_per_month - 1000000)
-    total_request_cost = round(price_per_request * billable_requests, 4)
-    total_lambda_cost = round(total_compute_cost + total_request_cost, 4)
+        {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Serverless"},
+        {"Type": "TERM_MATCH", "Field": "regionCode", "Value": aws_region},
+        {"Type": "TERM_MATCH", "Field": "usagetype", "Value": f"{aws_region_prefix}-Request"},
+    ]
+
     return {
-        "lambda_compute_monthly_usd": total_compute_cost,
-        "lambda_request_monthly_usd": total_request_cost
+        "compute": ("AWSLambda", compute_filters),
+        "request": ("AWSLambda", request_filters),
     }
 
-def get_s3_cost_estimate(pricing_client, architecture_json):
 
-    REGION_CODE_MAP = {
-        "Asia Pacific (Mumbai)": "ap-south-1",
-        "US East (N. Virginia)": "us-east-1",
-        "Asia Pacific (Singapore)": "ap-southeast-1",
-        # Add more as needed
+def lambda_unit_prices(records):
+    # Returns (GB-second tier table, price per request)
+    compute_tiers = tier_table(records["compute"], "Lambda compute")
+    price_per_request = first_price(records["request"], "Lambda request")
+    return compute_tiers, price_per_request
+
+
+def lambda_usage(attribute):
+    requests_per_month = attribute("requestsPerMonth", 1000000)
+    memory_mb = attribute("memorySizeMB", 128)
+    duration_ms = attribute("durationMs", 100)
+    return {
+        # GB-seconds are priced in graduated tiers
+        "lambda_compute": (duration_ms / 1000) * (memory_mb / 1024) * requests_per_month,
+        "lambda_request": clip_at_zero(requests_per_month - LAMBDA_FREE_REQUESTS_PER_MONTH),
     }
-    REGION_USAGE_TYPE_PREFIX = {
-                              "ap-south-1": "APS3",
-                              "ap-southeast-1": "APS1",
-                              "us-east-1": "USE1",
-                              "us-west-2": "USW2",
-                              
-                            }
 
-    #  Parse the S3 node from the architecture JSON
-    s3_node = next((node for node in architecture_json['nodes'] if node['type'] == 'AmazonS3'), None)
-    if not s3_node:
-        raise ValueError("No AmazonS3 node found in the architecture JSON.")
 
+def lambda_component_prices(records, node=None):
+    compute_tiers, price_per_request = lambda_unit_prices(records)
+    return {
+        "lambda_compute": compute_tiers,
+        "lambda_request": TierTable.flat(price_per_request),
+    }
+
+
+def price_lambda_node(lambda_node, records):
+    return price_components(node_components(lambda_node, records), "lambda_total_monthly_usd")
+
+
+@instrumented("get_lambda_cost_estimate")
+def get_lambda_cost_estimate(pricing_client, architecture_json, node_index=None):
+    return _estimate_service(pricing_client, architecture_json, 'AWSLambda', node_index)
+
+
+def build_s3_queries(s3_node):
     region_friendly = s3_node['region']
     aws_region = REGION_CODE_MAP.get(region_friendly)
     if not aws_region:
         raise ValueError(f"Region '{region_friendly}' not mapped to AWS region code.")
 
-    attributes = s3_node['attributes']
-    storage_gb = attributes.get('storageGB', 100)
-    storage_class = attributes.get('storageClass', 'Standard')
-    num_put_requests = attributes.get('numPUTRequests', 1000)
-    num_get_requests = attributes.get('numGETRequests', 10000)
-
     usage_prefix = REGION_USAGE_TYPE_PREFIX.get(aws_region)
     if not usage_prefix:
         raise ValueError(f"Usage prefix for region '{aws_region}' not found.")
 
-    #  Storage Cost 
+    storage_class = s3_node['attributes'].get('storageClass', 'Standard')
+
+    #  Storage Cost
     storage_filters = [
         {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Storage"},
         {"Type": "TERM_MATCH", "Field": "location", "Value": region_friendly},
@@ -392,94 +415,223 @@ def get_s3_cost_estimate(pricing_client, architecture_json):
         {"Type": "TERM_MATCH", "Field": "usagetype", "Value": f"{usage_prefix}-TimedStorage-ByteHrs"},
     ]
 
-#    response = pricing_client.get_products(
-#        ServiceCode="AmazonS3",
-#        Filters=[
-#            {"Type": "TERM_MATCH", "Field": "location", "Value": region_friendly},
-#        ],
-#        MaxResults=100
-#    )
-#
-#    for p in response['PriceList']:
-#            product = json.loads(p)
-#            logger.debug(json.dumps(product['product']['attributes'], indent=2))
-
-#    logger.debug(request_price_response['PriceList'])
-
-    storage_price_response = pricing_client.get_products(
-        ServiceCode='AmazonS3',
-        Filters=storage_filters,
-        MaxResults=1
-    )
-    if not storage_price_response['PriceList']:
-        raise ValueError("Could not fetch S3 storage pricing info.")
-
-    storage_item = json.loads(storage_price_response['PriceList'][0])
-    term_type_key = list(storage_item['terms'].keys())[0]
-    term_data_map = storage_item['terms'][term_type_key]
-    first_term_id = next(iter(term_data_map))
-    term_data = term_data_map[first_term_id]
-    price_dimension = next(iter(term_data["priceDimensions"].values()))
-    price_per_gb_month = float(price_dimension["pricePerUnit"]["USD"])
-    monthly_storage_cost = round(storage_gb * price_per_gb_month, 4)
-
-    #  PUT Request Cost 
+    #  PUT Request Cost
     put_filters = [
         {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Requests"},
         {"Type": "TERM_MATCH", "Field": "operation", "Value": "PutObject"},
         {"Type": "TERM_MATCH", "Field": "regionCode", "Value": aws_region},
     ]
 
-    put_price_response = pricing_client.get_products(
-        ServiceCode='AmazonS3',
-        Filters=put_filters,
-        MaxResults=1
-    )
-
-    put_price = 0.0
-    if put_price_response['PriceList']:
-        put_item = json.loads(put_price_response['PriceList'][0])
-        term_data_map = put_item['terms'][term_type_key]
-        first_term_id = next(iter(term_data_map))
-        term_data = term_data_map[first_term_id]
-        price_dimension = next(iter(term_data["priceDimensions"].values()))
-        put_price = float(price_dimension["pricePerUnit"]["USD"])
-    monthly_put_cost = round(put_price * num_put_requests, 4)
-
-    #  GET Request Cost 
+    #  GET Request Cost
     get_filters = [
         {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Requests"},
         {"Type": "TERM_MATCH", "Field": "operation", "Value": "GetObject"},
         {"Type": "TERM_MATCH", "Field": "regionCode", "Value": aws_region},
     ]
 
-    get_price_response = pricing_client.get_products(
-        ServiceCode='AmazonS3',
-        Filters=get_filters,
-        MaxResults=1
-    )
+    return {
+        "storage": ('AmazonS3', storage_filters),
+        "put": ('AmazonS3', put_filters),
+        "get": ('AmazonS3', get_filters),
+    }
 
-    get_price = 0.0
-    if get_price_response['PriceList']:
-        get_item = json.loads(get_price_response['PriceList'][0])
-        term_data_map = get_item['terms'][term_type_key]
-        first_term_id = next(iter(term_data_map))
-        term_data = term_data_map[first_term_id]
-        price_dimension = next(iter(term_data["priceDimensions"].values()))
-        get_price = float(price_dimension["pricePerUnit"]["USD"])
-    monthly_get_cost = round(get_price * num_get_requests, 4)
 
-    #  Total S3 Cost 
-    total_s3_cost = round(monthly_storage_cost + monthly_put_cost + monthly_get_cost, 4)
+def s3_usage(attribute):
+    return {
+        "s3_storage": attribute('storageGB', 100),
+        "s3_put_request": attribute('numPUTRequests', 1000),
+        "s3_get_request": attribute('numGETRequests', 10000),
+    }
+
 
+def s3_component_prices(records, node=None):
+    # Request prices are optional; a missing one prices as free
     return {
-        "s3_storage_monthly_usd": monthly_storage_cost,
-        "s3_put_request_monthly_usd": monthly_put_cost,
-        "s3_get_request_monthly_usd": monthly_get_cost,
-        "s3_total_monthly_usd": total_s3_cost
+        "s3_storage": tier_table(records["storage"], "S3 storage"),
+        "s3_put_request": TierTable.flat(records["put"][0].usd if records["put"] else 0.0),
+        "s3_get_request": TierTable.flat(records["get"][0].usd if records["get"] else 0.0),
     }
-#def get_iam_cost_estimate(pricing_client,architecture_json):
-    
+
+
+def price_s3_node(s3_node, records):
+    return price_components(node_components(s3_node, records), "s3_total_monthly_usd")
+
+
+@instrumented("get_s3_cost_estimate")
+def get_s3_cost_estimate(pricing_client, architecture_json, node_index=None):
+    return _estimate_service(pricing_client, architecture_json, 'AmazonS3', node_index)
+
+
+# node type -> (usage quantities from a node's attributes, unit prices from its records
+# and the node), both keyed by component; component names are the pricer result keys without "_monthly_usd"
+NODE_COMPONENTS = {
+    "AmazonRDS": (rds_usage, rds_component_prices),
+    "AmazonEC2": (ec2_usage, ec2_component_prices),
+    "AWSLambda": (lambda_usage, lambda_component_prices),
+    "AmazonS3": (s3_usage, s3_component_prices),
+}
+
+# node type -> (query builder, pricer, key of the node's total in the pricer result)
+NODE_ESTIMATORS = {
+    "AmazonRDS": (build_rds_queries, price_rds_node, "rds_total_monthly_usd"),
+    "AmazonEC2": (build_ec2_queries, price_ec2_node, "ec2_total_monthly_usd"),
+    "AWSLambda": (build_lambda_queries, price_lambda_node, "lambda_total_monthly_usd"),
+    "AmazonS3": (build_s3_queries, price_s3_node, "s3_total_monthly_usd"),
+}
+
+DEFAULT_MAX_WORKERS = 16
+
+
+def plan_node_queries(nodes):
+    # Group nodes by configuration and collect the distinct queries they need.
+    # configs: config key -> (representative node, {query name: query key}, [node ids])
+    configs = {}
+    unique_queries = {}
+    errors = {}
+    for node in nodes:
+        config = node_config_key(node)
+        planned = configs.get(config)
+        if planned is not None:
+            planned[2].append(node['id'])
+            continue
+        try:
+            queries = NODE_ESTIMATORS[node['type']][0](node)
+        except (KeyError, ValueError) as e:
+            errors[node['id']] = e
+            continue
+        query_keys = {}
+        for name, (service_code, filters) in queries.items():
+            key = make_query_key(service_code, filters)
+            unique_queries.setdefault(key, (service_code, filters))
+            query_keys[name] = key
+        configs[config] = (node, query_keys, [node['id']])
+    return configs, unique_queries, errors
+
+
+def price_planned_configs(configs, records_by_key):
+    # Returns node id -> costs for every node whose configuration priced, and
+    # node id -> exception for the rest
+    node_costs = {}
+    errors = {}
+    for node, query_keys, node_ids in configs.values():
+        node_records = {name: records_by_key[key] for name, key in query_keys.items()}
+        try:
+            failed = next((r for r in node_records.values() if isinstance(r, Exception)), None)
+            if failed is not None:
+                raise failed
+            costs = NODE_ESTIMATORS[node['type']][1](node, node_records)
+        except Exception as e:
+            for node_id in node_ids:
+                errors[node_id] = e
+            continue
+        for node_id in node_ids:
+            node_costs[node_id] = costs
+    return node_costs, errors
+
+
+def sum_node_costs(node_costs):
+    subtotals = {}
+    for costs in node_costs:
+        for key, value in costs.items():
+            subtotals[key] = round(subtotals.get(key, 0.0) + value, 4)
+    return subtotals
+
+
+def plan_service_estimate(architecture_json, node_type, node_index=None):
+    # Returns (nodes, configs, unique_queries) for one service; the caller
+    # fetches the queries however it likes and hands the records to
+    # price_service_estimate
+    if node_index is None:
+        node_index = index_nodes_by_type(architecture_json)
+    nodes = node_index.get(node_type)
+    if not nodes:
+        raise ValueError(f"No {node_type} node found in the architecture JSON.")
+
+    configs, unique_queries, errors = plan_node_queries(nodes)
+    if errors:
+        raise next(iter(errors.values()))
+    return nodes, configs, unique_queries
+
+
+def price_service_estimate(nodes, configs, records_by_key):
+    node_costs, errors = price_planned_configs(configs, records_by_key)
+    if errors:
+        raise next(iter(errors.values()))
+
+    # Per-service subtotals keep the single-node result keys
+    per_node = {node['id']: node_costs[node['id']] for node in nodes}
+    return {**sum_node_costs(per_node.values()), "nodes": per_node}
+
+
+def _estimate_service(pricing_client, architecture_json, node_type, node_index=None):
+    nodes, configs, unique_queries = plan_service_estimate(architecture_json, node_type, node_index)
+    records_by_key = fetch_unique_queries(pricing_client, unique_queries, max_workers=1)
+    return price_service_estimate(nodes, configs, records_by_key)
+
+
+def fetch_unique_queries(pricing_client, unique_queries, max_workers=DEFAULT_MAX_WORKERS):
+    # Returns query key -> price records, or the exception raised while fetching them
+    def fetch(service_code, filters):
+        try:
+            return fetch_price_records(pricing_client, service_code, filters)
+        except Exception as e:
+            return e
+
+    if len(unique_queries) <= 1 or max_workers <= 1:
+        return {key: fetch(*query) for key, query in unique_queries.items()}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_queries))) as executor:
+        futures = {key: executor.submit(fetch, *query) for key, query in unique_queries.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+
+@instrumented("estimate_architecture")
+def estimate_architecture(architecture_json, pricing_client=None, max_workers=DEFAULT_MAX_WORKERS,
+                          data_transfer=False):
+    if pricing_client is None:
+        pricing_client = SharedPricingClient()
+
+    node_index = index_nodes_by_type(architecture_json)
+    priced_nodes = [node for node_type in NODE_ESTIMATORS for node in node_index.get(node_type, ())]
+    unpriced = [node['id'] for node in architecture_json['nodes'] if node['type'] not in NODE_ESTIMATORS]
+
+    # Plan every query up front so identical ones are only fetched once
+    configs, unique_queries, plan_errors = plan_node_queries(priced_nodes)
+    records_by_key = fetch_unique_queries(pricing_client, unique_queries, max_workers)
+
+    # Fan the shared records back out to the nodes that asked for them
+    costs_by_id, price_errors = price_planned_configs(configs, records_by_key)
+    errors = {node_id: str(e) for node_id, e in {**plan_errors, **price_errors}.items()}
+
+    node_costs = {}
+    service_totals = {}
+    for node in priced_nodes:
+        costs = costs_by_id.get(node['id'])
+        if costs is None:
+            continue
+        node_costs[node['id']] = {"type": node['type'], **costs}
+        total = costs[NODE_ESTIMATORS[node['type']][2]]
+        service_totals[node['type']] = round(service_totals.get(node['type'], 0.0) + total, 4)
+
+    result = {
+        "nodes": node_costs,
+        "services": service_totals,
+        "total_monthly_usd": round(sum(service_totals.values()), 4),
+        "errors": errors,
+        "unpriced": unpriced,
+        "query_count": len(unique_queries),
+    }
+    if data_transfer:
+        # Edge and CloudFront egress costs; imported here as it needs NumPy
+        from data_transfer import estimate_data_transfer
+
+        transfer = estimate_data_transfer(architecture_json, pricing_client, max_workers)
+        result["data_transfer"] = transfer
+        result["total_monthly_usd"] = round(result["total_monthly_usd"] + transfer["total_monthly_usd"], 4)
+        result["unpriced"] = [node_id for node_id in unpriced if node_id not in transfer["nodes"]]
+        result["query_count"] += transfer["query_count"]
+    return result
+
 
 if  __name__ == "__main__":
     architecture_json = {
@@ -568,11 +720,5 @@ if  __name__ == "__main__":
               ]
             }
 
-    pricing_client = create_pricing_client()
-    try:
-        print(get_rds_cost_estimate(pricing_client, architecture_json))
-        print(get_ec2_cost_estimate(pricing_client, architecture_json))
-        print(get_lambda_cost_estimate(pricing_client, architecture_json))
-        # print(get_s3_cost_estimate(pricing_client, architecture_json))
-    except Exception as e:
-        print("Error:", e)
\ No newline at end of file
+    pricing_client = SharedPricingClient()
+    print(json.dumps(estimate_architecture(architecture_json, pricing_client), indent=2))
\ No newline at end of file
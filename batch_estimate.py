@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aws_cost_estimation import estimate_architecture
+from offline_pricing import create_offline_pricing_client
+from price_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, create_cached_pricing_client
+
+# Each worker process builds its own client; the SQLite price cache behind it
+# is shared by all of them, so a price fetched by one worker warms the rest.
+_worker_client = None
+
+
+def _init_worker(cache_path, ttl_seconds, offline_source):
+    global _worker_client
+    if offline_source:
+        # Already indexed in memory; keep offline prices out of the shared
+        # cache, whose keys do not say which backend answered
+        _worker_client = create_offline_pricing_client(offline_source)
+        return
+    _worker_client = create_cached_pricing_client(db_path=cache_path, ttl_seconds=ttl_seconds)
+
+
+def estimate_record(line_number, line, query_workers=4, pricing_client=None, with_regions=False):
+    record = {"line": line_number}
+    try:
+        document = json.loads(line)
+        # Lines are either a bare architecture or {"id": ..., "architecture": {...}}
+        if "nodes" not in document and "architecture" in document:
+            record["id"] = document.get("id")
+            document = document["architecture"]
+        else:
+            record["id"] = document.get("id", document.get("title"))
+        client = pricing_client if pricing_client is not None else _worker_client
+        record["estimate"] = estimate_architecture(document, client, max_workers=query_workers)
+        if with_regions:
+            record["node_regions"] = {node["id"]: node.get("region", "") for node in document["nodes"]}
+            record["node_types"] = {node["id"]: node["type"] for node in document["nodes"]}
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def estimate_chunk(chunk, query_workers=4, with_regions=False):
+    return [estimate_record(line_number, line, query_workers, with_regions=with_regions) for line_number, line in chunk]
+
+
+def iter_records(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            yield line_number, line
+
+
+def iter_chunks(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(stream, output, workers=None, cache_path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS,
+              offline_source=None, query_workers=4, chunk_size=16, window=None, report=sys.stderr,
+              report_every=1000, results=None):
+    workers = workers or os.cpu_count() or 1
+    # A bounded number of chunks in flight keeps memory flat for any input size
+    window = window or workers * 4
+    stats = {"records": 0, "errors": 0, "node_errors": 0}
+    with_regions = results is not None
+    started_at = time.perf_counter()
+
+    def emit(record):
+        stats["records"] += 1
+        if "error" in record:
+            stats["errors"] += 1
+            print(f"line {record['line']}: {record['error']}", file=report)
+        elif record["estimate"]["errors"]:
+            stats["node_errors"] += 1
+        if results is not None and "estimate" in record:
+            # Cost rows go to the columnar store; the JSONL line stays as before
+            architecture_id = record["id"] if record.get("id") is not None else record["line"]
+            results.add_estimate(architecture_id, record["estimate"], record.pop("node_regions"),
+                                 record.pop("node_types"))
+        output.write(json.dumps(record) + "\n")
+        if report_every and stats["records"] % report_every == 0:
+            elapsed = time.perf_counter() - started_at
+            print(f"{stats['records']} architectures, {stats['records'] / elapsed:.1f}/s", file=report)
+
+    if workers == 1:
+        _init_worker(cache_path, ttl_seconds, offline_source)
+        for line_number, line in iter_records(stream):
+            emit(estimate_record(line_number, line, query_workers, with_regions=with_regions))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(cache_path, ttl_seconds, offline_source)) as executor:
+            pending = deque()
+            for chunk in iter_chunks(iter_records(stream), chunk_size):
+                pending.append(executor.submit(estimate_chunk, chunk, query_workers, with_regions))
+                if len(pending) >= window:
+                    for record in pending.popleft().result():
+                        emit(record)
+            while pending:
+                for record in pending.popleft().result():
+                    emit(record)
+
+    elapsed = time.perf_counter() - started_at
+    stats["seconds"] = round(elapsed, 3)
+    stats["architectures_per_second"] = round(stats["records"] / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate AWS costs for a JSONL stream of architectures.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of architectures ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Where to write JSONL results ('-' for stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--query-workers", type=int, default=4, help="Concurrent pricing queries per architecture")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Architectures handed to a worker at a time")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH,
+                        help="SQLite price cache shared by workers (not used with --offline)")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL_SECONDS, help="Price cache TTL in seconds")
+    parser.add_argument("--offline", default=None, help="Price from bulk offer files or a compiled store instead of the API")
+    parser.add_argument("--results", default=None, help="Also append per-node cost rows to this columnar result directory")
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    results = None
+    if args.results:
+        from result_store import ResultWriter
+
+        results = ResultWriter(args.results)
+    try:
+        stats = run_batch(stream, output, workers=args.workers, cache_path=args.cache_path,
+                          ttl_seconds=args.ttl, offline_source=args.offline,
+                          query_workers=args.query_workers, chunk_size=args.chunk_size, results=results)
+    finally:
+        if results is not None:
+            results.close()
+        if stream is not sys.stdin:
+            stream.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(
+        f"Estimated {stats['records']} architectures in {stats['seconds']}s "
+        f"({stats['architectures_per_second']}/s), {stats['errors']} failed, "
+        f"{stats['node_errors']} with node errors",
+        file=sys.stderr,
+    )
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
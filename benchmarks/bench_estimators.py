@@ -0,0 +1,169 @@
+"""Benchmarks for the estimators against the local fake pricing backend.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_estimators
+    python -m benchmarks.bench_estimators --json bench.json
+    python -m benchmarks.bench_estimators --baseline bench.json  # exits 1 on regression
+"""
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from aws_cost_estimation import estimate_architecture
+from fake_pricing import FakePricingClient
+from price_cache import CachedPricingClient
+
+ARCHITECTURE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aws_archtecture.json")
+
+EC2_TYPES = ("t3.micro", "t3.small", "t3.medium", "m5.large", "c5.large")
+RDS_TYPES = ("db.t3.micro", "db.t3.small", "db.t3.medium")
+REGIONS = ("Asia Pacific (Mumbai)", "Asia Pacific (Singapore)")
+
+
+def load_architecture():
+    with open(ARCHITECTURE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_large_architecture(base, node_count):
+    # Cycles through the base diagram's nodes with a spread of configurations
+    templates = base["nodes"]
+    nodes = []
+    for i in range(node_count):
+        node = copy.deepcopy(templates[i % len(templates)])
+        node["id"] = f"{node['id']}-{i}"
+        attributes = node["attributes"]
+        if node["type"] == "AmazonEC2":
+            attributes["instanceType"] = EC2_TYPES[i % len(EC2_TYPES)]
+            node["region"] = REGIONS[i % len(REGIONS)]
+        elif node["type"] == "AmazonRDS":
+            attributes["instanceType"] = RDS_TYPES[i % len(RDS_TYPES)]
+        elif node["type"] == "AWSLambda":
+            attributes["memorySizeMB"] = 128 * (1 + i % 8)
+        elif node["type"] == "AmazonS3":
+            attributes["storageGB"] = 100 * (1 + i % 10)
+        nodes.append(node)
+    return {"title": f"bench-{node_count}", "nodes": nodes, "edges": []}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_scenario(name, make_client, architectures, repeat=1):
+    client = make_client()
+    backend = getattr(client, "client", client)
+    backend.reset_counters()
+
+    latencies = []
+    estimates = 0
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        for architecture in architectures:
+            t0 = time.perf_counter()
+            estimate_architecture(architecture, client)
+            latencies.append(time.perf_counter() - t0)
+            estimates += 1
+    elapsed = time.perf_counter() - started_at
+    api_calls = backend.calls
+
+    # Peak memory is measured on a separate pass; tracemalloc skews timings
+    client = make_client()
+    tracemalloc.start()
+    for architecture in architectures:
+        estimate_architecture(architecture, client)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "estimates": estimates,
+        "api_calls_per_estimate": round(api_calls / estimates, 4),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "estimates_per_second": round(estimates / elapsed, 2),
+        "peak_memory_mb": round(peak_bytes / (1024 * 1024), 3),
+    }
+
+
+def run_benchmarks(latency_seconds=0.02, large_nodes=1000, batch_size=10000, single_runs=50):
+    base = load_architecture()
+
+    def uncached():
+        return FakePricingClient(latency_seconds=latency_seconds)
+
+    def cached():
+        # Warm before timing so the scenario measures the steady state
+        client = CachedPricingClient(FakePricingClient(latency_seconds=latency_seconds), db_path=None)
+        estimate_architecture(base, client)
+        return client
+
+    large = make_large_architecture(base, large_nodes)
+    batch = [make_large_architecture(base, 6 + i % 6) for i in range(batch_size)]
+    return [
+        run_scenario("single_diagram_uncached", uncached, [base], repeat=single_runs),
+        run_scenario("single_diagram_cached", cached, [base], repeat=single_runs),
+        run_scenario(f"diagram_{large_nodes}_nodes_uncached", uncached, [large], repeat=3),
+        run_scenario(f"batch_{batch_size}_diagrams_cached", cached, batch),
+    ]
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+    previous = {r["scenario"]: r for r in baseline}
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        if result["api_calls_per_estimate"] > before["api_calls_per_estimate"]:
+            regressions.append(f"{result['scenario']}: API calls per estimate "
+                               f"{before['api_calls_per_estimate']} -> {result['api_calls_per_estimate']}")
+        if result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p50 {before['p50_ms']}ms -> {result['p50_ms']}ms")
+        if result["peak_memory_mb"] > before["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: peak memory "
+                               f"{before['peak_memory_mb']}MB -> {result['peak_memory_mb']}MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the estimators against the fake pricing backend.")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Injected latency per pricing call")
+    parser.add_argument("--large-nodes", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--single-runs", type=int, default=50)
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    parser.add_argument("--baseline", default=None, help="Fail if results regress against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative slowdown vs. the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.latency_ms / 1000, args.large_nodes, args.batch_size, args.single_runs)
+
+    columns = ("scenario", "estimates", "api_calls_per_estimate", "p50_ms", "p99_ms",
+               "estimates_per_second", "peak_memory_mb")
+    print("  ".join(f"{c:>22}" for c in columns))
+    for result in results:
+        print("  ".join(f"{result[c]!s:>22}" for c in columns))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from aws_cost_estimation import (
+    DEFAULT_MAX_WORKERS,
+    NODE_COMPONENTS,
+    NODE_ESTIMATORS,
+    REGION_CODE_MAP,
+    SharedPricingClient,
+    fetch_unique_queries,
+    make_query_key,
+    node_components,
+    node_config_key,
+    resolve_regions,
+)
+from offline_pricing import add_offline_argument, client_from_args
+
+# Price components in matrix column order, named after the estimator result keys
+COMPONENTS = (
+    "ec2_instance", "ec2_storage",
+    "rds_instance", "rds_storage",
+    "lambda_compute", "lambda_request",
+    "s3_storage", "s3_put_request", "s3_get_request",
+)
+_COLUMN = {name: i for i, name in enumerate(COMPONENTS)}
+
+
+def _effective_rate(tiers, quantity):
+    # Tiered price folded into a per-unit rate at this quantity, so it can sit
+    # in the price matrix next to the flat rates
+    return tiers.cost(quantity) / quantity if quantity else tiers.marginal_price(0)
+
+
+def compare_regions(architecture_json, pricing_client=None, regions=None, max_workers=DEFAULT_MAX_WORKERS):
+    """Prices every regional node of an architecture in every region and ranks the regions by total.
+
+    Best run against a cached or offline client: the first pass over all
+    regions needs one lookup per (region, distinct query).
+    """
+    if pricing_client is None:
+        pricing_client = SharedPricingClient()
+    regions = resolve_regions(regions) if regions is not None else list(REGION_CODE_MAP.items())
+
+    nodes = [node for node in architecture_json['nodes'] if node['type'] in NODE_COMPONENTS]
+    unpriced = [node['id'] for node in architecture_json['nodes'] if node['type'] not in NODE_COMPONENTS]
+
+    # Nodes that only differ by region are the same configuration everywhere
+    configs = {}
+    for node in nodes:
+        configs.setdefault(node_config_key(dict(node, region="")), (node, []))[1].append(node['id'])
+    config_list = list(configs.values())
+
+    # (region, config) -> {query name: query key}, planned before one concurrent fetch
+    planned = {}
+    unique_queries = {}
+    plan_errors = {}
+    for r, (location, _) in enumerate(regions):
+        for c, (node, _) in enumerate(config_list):
+            moved = dict(node, region=location)
+            try:
+                queries = NODE_ESTIMATORS[node['type']][0](moved)
+            except (KeyError, ValueError) as e:
+                plan_errors[r, c] = str(e)
+                continue
+            keys = {}
+            for name, query in queries.items():
+                keys[name] = make_query_key(*query)
+                unique_queries.setdefault(keys[name], query)
+            planned[r, c] = (moved, keys)
+    records_by_key = fetch_unique_queries(pricing_client, unique_queries, max_workers)
+
+    # quantities[config, component] and prices[region, config, component]; a
+    # price that could not be found is NaN so it poisons only its own cells
+    quantities = np.zeros((len(config_list), len(COMPONENTS)))
+    prices = np.zeros((len(regions), len(config_list), len(COMPONENTS)))
+    errors = dict(plan_errors)
+    for (r, c), (moved, keys) in planned.items():
+        node_records = {name: records_by_key[key] for name, key in keys.items()}
+        try:
+            failed = next((v for v in node_records.values() if isinstance(v, Exception)), None)
+            if failed is not None:
+                raise failed
+            components = node_components(moved, node_records)
+        except Exception as e:
+            errors[r, c] = str(e)
+            continue
+        for name, quantity, tiers in components:
+            quantities[c, _COLUMN[name]] = quantity
+            prices[r, c, _COLUMN[name]] = _effective_rate(tiers, quantity)
+    for r, c in errors:
+        prices[r, c, :] = np.nan
+
+    # One pass for every node in every region, then per-region breakdowns
+    node_counts = np.array([len(ids) for _, ids in config_list], dtype=float)
+    config_costs = prices * quantities[None, :, :]  # (region, config, component)
+    component_costs = np.einsum("rcp,c->rp", config_costs, node_counts)
+    totals = component_costs.sum(axis=1)
+    per_config = config_costs.sum(axis=2)
+
+    ranked = []
+    for r in np.argsort(np.where(np.isnan(totals), np.inf, totals), kind="stable"):
+        location, region_code = regions[r]
+        entry = {
+            "region": location,
+            "region_code": region_code,
+            "total_monthly_usd": None if np.isnan(totals[r]) else round(float(totals[r]), 4),
+            "components": {
+                name: round(float(component_costs[r, i]), 4)
+                for i, name in enumerate(COMPONENTS) if quantities[:, i].any() and not np.isnan(component_costs[r, i])
+            },
+            "nodes": {
+                node_id: round(float(per_config[r, c]), 4)
+                for c, (_, ids) in enumerate(config_list) if not np.isnan(per_config[r, c]) for node_id in ids
+            },
+        }
+        missing = {
+            node_id: errors[r, c]
+            for c, (_, ids) in enumerate(config_list) if (r, c) in errors for node_id in ids
+        }
+        if missing:
+            entry["missing"] = missing
+        ranked.append(entry)
+
+    return {
+        "regions": ranked,
+        "unpriced": unpriced,
+        "query_count": len(unique_queries),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank regions by the monthly cost of an architecture.")
+    parser.add_argument("architecture", help="Architecture JSON")
+    parser.add_argument("--regions", nargs="+", default=None, help="Region codes or location names (default: all)")
+    add_offline_argument(parser)
+    parser.add_argument("--complete-only", action="store_true", help="Hide regions missing a price")
+    args = parser.parse_args(argv)
+
+    with open(args.architecture, encoding="utf-8") as f:
+        architecture_json = json.load(f)
+    pricing_client = client_from_args(args.offline)
+    result = compare_regions(architecture_json, pricing_client, args.regions)
+    if args.complete_only:
+        result["regions"] = [entry for entry in result["regions"] if "missing" not in entry]
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import numpy as np
+
+from aws_cost_estimation import (
+    DEFAULT_MAX_WORKERS,
+    REGION_CODE_MAP,
+    SharedPricingClient,
+    fetch_unique_queries,
+    make_query_key,
+)
+from tiered_pricing import tier_table
+
+# Nodes in these regions (CloudFront, IAM, ...) are not in a billing region;
+# traffic to or from them is either free or priced by the node itself.
+GLOBAL_REGIONS = frozenset(("Global", ""))
+# Edges into a node of one of these types leave AWS
+INTERNET_NODE_TYPES = frozenset(("Internet",))
+
+DEFAULT_CLOUDFRONT_LOCATION = "United States"
+
+FREE, INTRA_REGION, INTER_REGION, INTERNET = range(4)
+TRANSFER_TYPES = {
+    INTRA_REGION: "IntraRegion",
+    INTER_REGION: "InterRegion Outbound",
+    INTERNET: "AWS Outbound",
+}
+
+
+def build_transfer_query(kind, from_location, to_location):
+    if from_location not in REGION_CODE_MAP:
+        raise ValueError(f"Region '{from_location}' not mapped to AWS region code.")
+    to_location = "External" if kind == INTERNET else to_location
+    filters = [
+        {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Data Transfer"},
+        {"Type": "TERM_MATCH", "Field": "transferType", "Value": TRANSFER_TYPES[kind]},
+        {"Type": "TERM_MATCH", "Field": "fromLocation", "Value": from_location},
+        {"Type": "TERM_MATCH", "Field": "toLocation", "Value": to_location},
+    ]
+    return "AWSDataTransfer", filters
+
+
+def build_cloudfront_query(from_location):
+    filters = [
+        {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Data Transfer"},
+        {"Type": "TERM_MATCH", "Field": "transferType", "Value": "CloudFront Outbound"},
+        {"Type": "TERM_MATCH", "Field": "fromLocation", "Value": from_location},
+    ]
+    return "AmazonCloudFront", filters
+
+
+class EdgeIndex:
+    """An architecture's edges as parallel arrays of node positions.
+
+    Built once per architecture; locations are dictionary-encoded so edges can
+    be classified and grouped into priced routes with array operations.
+    Edge volume is the edge's attributes.dataTransferGB, sent from "from" to "to".
+    """
+
+    def __init__(self, architecture_json):
+        nodes = architecture_json["nodes"]
+        self.node_ids = [node["id"] for node in nodes]
+        self.position = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.locations = sorted({node.get("region", "") for node in nodes})
+        location_code = {location: i for i, location in enumerate(self.locations)}
+        self.node_location = np.array([location_code[node.get("region", "")] for node in nodes], dtype=np.int64)
+        self.node_is_global = np.array([node.get("region", "") in GLOBAL_REGIONS for node in nodes], dtype=bool)
+        self.node_is_internet = np.array([node["type"] in INTERNET_NODE_TYPES for node in nodes], dtype=bool)
+        zones = [node.get("attributes", {}).get("availabilityZone") for node in nodes]
+
+        src, dst, gb, cross_az = [], [], [], []
+        self.errors = {}
+        for i, edge in enumerate(architecture_json.get("edges", ())):
+            a = self.position.get(edge.get("from"))
+            b = self.position.get(edge.get("to"))
+            if a is None or b is None:
+                self.errors[f"edge {i}"] = f"Edge {edge.get('from')} -> {edge.get('to')} references an unknown node."
+                continue
+            attributes = edge.get("attributes", {})
+            src.append(a)
+            dst.append(b)
+            gb.append(float(attributes.get("dataTransferGB", 0.0)))
+            # Only charged as cross-AZ when we know the zones differ
+            cross_az.append(bool(attributes.get("crossAZ", zones[a] is not None and zones[b] is not None
+                                                and zones[a] != zones[b])))
+        self.src = np.array(src, dtype=np.int64)
+        self.dst = np.array(dst, dtype=np.int64)
+        self.gb = np.array(gb, dtype=float)
+        self.cross_az = np.array(cross_az, dtype=bool)
+
+        # CSR adjacency over outgoing edges
+        order = np.argsort(self.src, kind="stable")
+        self._out_edges = order
+        self._out_offsets = np.searchsorted(self.src[order], np.arange(len(self.node_ids) + 1))
+
+    def __len__(self):
+        return len(self.src)
+
+    def outgoing(self, node_id):
+        # Positions (into src/dst/gb) of the edges leaving node_id
+        i = self.position[node_id]
+        return self._out_edges[self._out_offsets[i]:self._out_offsets[i + 1]]
+
+    def neighbours(self, node_id):
+        return [self.node_ids[j] for j in self.dst[self.outgoing(node_id)]]
+
+    def classify(self):
+        src_location = self.node_location[self.src]
+        dst_location = self.node_location[self.dst]
+        kind = np.full(len(self.src), FREE, dtype=np.int64)
+        kind[self.cross_az & (src_location == dst_location)] = INTRA_REGION
+        kind[src_location != dst_location] = INTER_REGION
+        # Origin fetches into CloudFront and anything from a global node are free
+        kind[self.node_is_global[self.dst] | self.node_is_global[self.src]] = FREE
+        kind[self.node_is_internet[self.dst] & ~self.node_is_global[self.src]] = INTERNET
+        kind[self.gb <= 0] = FREE
+        return kind
+
+
+def _allocate(group_of, group_costs, group_volumes, volumes):
+    # Share each group's (tiered) cost out to its members by volume
+    share = np.divide(volumes, group_volumes[group_of], out=np.zeros_like(volumes), where=group_volumes[group_of] > 0)
+    return group_costs[group_of] * share
+
+
+def estimate_data_transfer(architecture_json, pricing_client=None, max_workers=DEFAULT_MAX_WORKERS, edge_index=None):
+    if pricing_client is None:
+        pricing_client = SharedPricingClient()
+    index = edge_index if edge_index is not None else EdgeIndex(architecture_json)
+    errors = dict(index.errors)
+    node_count = len(index.node_ids)
+
+    # Edges priced as one route per (transfer type, from, to); tiers apply to the route's total volume
+    kind = index.classify()
+    priced = np.flatnonzero(kind != FREE)
+    location_count = len(index.locations)
+    src_location = index.node_location[index.src[priced]]
+    dst_location = np.where(kind[priced] == INTERNET, 0, index.node_location[index.dst[priced]])
+    route_keys = (kind[priced] * location_count + src_location) * location_count + dst_location
+    routes, route_of_edge = np.unique(route_keys, return_inverse=True)
+    route_gb = np.bincount(route_of_edge, weights=index.gb[priced], minlength=len(routes))
+
+    route_info = []  # route -> (transfer kind, from location, to location)
+    for key in routes.tolist():
+        route_kind, rest = divmod(key, location_count * location_count)
+        from_position, to_position = divmod(rest, location_count)
+        route_info.append((route_kind, index.locations[from_position], index.locations[to_position]))
+
+    route_queries = {}
+    unique_queries = {}
+    for r, (route_kind, from_location, to_location) in enumerate(route_info):
+        try:
+            query = build_transfer_query(route_kind, from_location, to_location)
+        except ValueError as e:
+            errors[f"{from_location} -> {to_location}"] = str(e)
+            continue
+        route_queries[r] = make_query_key(*query)
+        unique_queries.setdefault(route_queries[r], query)
+
+    # CloudFront egress, grouped by edge location for the same reason
+    cloudfront = {}
+    for node in architecture_json["nodes"]:
+        if node["type"] == "AmazonCloudFront":
+            attributes = node.get("attributes", {})
+            location = attributes.get("fromLocation", DEFAULT_CLOUDFRONT_LOCATION)
+            cloudfront.setdefault(location, []).append((node["id"], float(attributes.get("dataOutGB", 0.0))))
+    for location in cloudfront:
+        query = build_cloudfront_query(location)
+        unique_queries.setdefault(make_query_key(*query), query)
+
+    records_by_key = fetch_unique_queries(pricing_client, unique_queries, max_workers)
+
+    route_costs = np.zeros(len(routes))
+    route_rows = []
+    for r, (route_kind, from_location, to_location) in enumerate(route_info):
+        if r not in route_queries:
+            continue
+        records = records_by_key[route_queries[r]]
+        try:
+            if isinstance(records, Exception):
+                raise records
+            route_costs[r] = tier_table(records, f"{TRANSFER_TYPES[route_kind]} data transfer").cost(route_gb[r])
+        except Exception as e:
+            errors[f"{from_location} -> {to_location}"] = str(e)
+            continue
+        route_rows.append({
+            "transferType": TRANSFER_TYPES[route_kind],
+            "from": from_location,
+            "to": "External" if route_kind == INTERNET else to_location,
+            "gb": round(float(route_gb[r]), 4),
+            "monthly_usd": round(float(route_costs[r]), 4),
+        })
+
+    edge_costs = _allocate(route_of_edge, route_costs, route_gb, index.gb[priced])
+    node_costs = np.bincount(index.src[priced], weights=edge_costs, minlength=node_count)
+    by_node = {index.node_ids[i]: round(float(node_costs[i]), 4) for i in np.flatnonzero(node_costs)}
+
+    for location, members in cloudfront.items():
+        records = records_by_key[make_query_key(*build_cloudfront_query(location))]
+        volumes = np.array([gb for _, gb in members])
+        try:
+            if isinstance(records, Exception):
+                raise records
+            cost = tier_table(records, "CloudFront data transfer").cost(volumes.sum())
+        except Exception as e:
+            for node_id, _ in members:
+                errors[node_id] = str(e)
+            continue
+        shares = _allocate(np.zeros(len(members), dtype=np.int64), np.array([cost]), np.array([volumes.sum()]), volumes)
+        for (node_id, _), share in zip(members, shares):
+            by_node[node_id] = round(by_node.get(node_id, 0.0) + float(share), 4)
+        route_rows.append({
+            "transferType": "CloudFront Outbound",
+            "from": location,
+            "to": "External",
+            "gb": round(float(volumes.sum()), 4),
+            "monthly_usd": round(float(cost), 4),
+        })
+
+    return {
+        "edges": int(len(priced)),
+        "routes": route_rows,
+        "nodes": by_node,
+        "total_monthly_usd": round(sum(row["monthly_usd"] for row in route_rows), 4),
+        "errors": errors,
+        "query_count": len(unique_queries),
+    }
@@ -0,0 +1,272 @@
+import argparse
+import json
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import instrumentation
+from aws_cost_estimation import SharedPricingClient, estimate_architecture, make_query_key
+from batch_estimate import estimate_record
+from price_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, CachedPricingClient
+from price_records import fetch_price_records
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_QUERY_WORKERS = 8
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CoalescingPricingClient:
+    """Pricing client wrapper that combines identical concurrent queries into one upstream call.
+
+    The first caller for a query makes the call; callers arriving while it is
+    in flight wait for it and share its result or exception.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}  # query key -> _Call
+
+    def _single_flight(self, key, fetch):
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+    def get_price_records(self, ServiceCode, Filters, MaxResults=1):
+        key = ("records", make_query_key(ServiceCode, Filters, MaxResults))
+        return self._single_flight(key, lambda: fetch_price_records(self.client, ServiceCode, Filters, MaxResults))
+
+    def get_products(self, ServiceCode, Filters=(), MaxResults=100, NextToken=None, **kwargs):
+        if NextToken:
+            kwargs["NextToken"] = NextToken
+        key = ("products", make_query_key(ServiceCode, Filters, MaxResults), NextToken)
+        return self._single_flight(key, lambda: self.client.get_products(
+            ServiceCode=ServiceCode, Filters=Filters, MaxResults=MaxResults, **kwargs))
+
+
+def create_service_client(client=None, cache_path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS):
+    # Hot cache in front, so only cache misses reach the coalescing layer
+    upstream = client if client is not None else SharedPricingClient()
+    return CachedPricingClient(CoalescingPricingClient(upstream), db_path=cache_path, ttl_seconds=ttl_seconds)
+
+
+def validate_architecture(document):
+    # Structural checks only, so a malformed request is a 400 rather than a
+    # KeyError deep inside the estimators
+    if not isinstance(document, dict) or not isinstance(document.get("nodes"), list):
+        raise ValueError("Architecture has no 'nodes' list.")
+    for i, node in enumerate(document["nodes"]):
+        if not isinstance(node, dict):
+            raise ValueError(f"Node {i} is not an object.")
+        for field in ("id", "type"):
+            if not isinstance(node.get(field), str):
+                raise ValueError(f"Node {i} has no '{field}'.")
+        if not isinstance(node.get("attributes", {}), dict):
+            raise ValueError(f"Node '{node['id']}' has non-object 'attributes'.")
+
+
+class EstimationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "CostEstimation/1.0"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": message})
+
+    def _content_length(self):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send_error(HTTPStatus.LENGTH_REQUIRED, "Content-Length is required.")
+            return None
+        try:
+            length = int(length)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self._send_error(HTTPStatus.BAD_REQUEST, f"Invalid Content-Length '{self.headers['Content-Length']}'.")
+            # The body cannot be delimited, so the connection cannot be reused
+            self.close_connection = True
+            return None
+        return length
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/metrics":
+            data = instrumentation.registry.to_prometheus().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"No route for GET {self.path}.")
+
+    def do_POST(self):
+        if self.path == "/estimate":
+            self._estimate()
+        elif self.path == "/estimate/batch":
+            self._estimate_batch()
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"No route for POST {self.path}.")
+
+    def _estimate(self):
+        length = self._content_length()
+        if length is None:
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Architecture is too large.")
+            return
+        try:
+            document = json.loads(self.rfile.read(length))
+            if "nodes" not in document and "architecture" in document:
+                document = document["architecture"]
+            validate_architecture(document)
+        except (ValueError, AttributeError, TypeError) as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, f"Invalid architecture: {e}")
+            return
+        try:
+            result = estimate_architecture(document, self.server.pricing_client, self.server.query_workers)
+        except Exception as e:
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+            return
+        self._send_json(HTTPStatus.OK, result)
+
+    def _estimate_batch(self):
+        # Request body is JSONL in the batch_estimate format; each result line
+        # is written back as soon as it is ready.
+        remaining = self._content_length()
+        if remaining is None:
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        line_number = 0
+        while remaining > 0:
+            line = self.rfile.readline(min(remaining, MAX_BODY_BYTES))
+            if not line:
+                break
+            remaining -= len(line)
+            line_number += 1
+            line = line.strip()
+            if not line:
+                continue
+            record = estimate_record(line_number, line, self.server.query_workers, self.server.pricing_client)
+            self._write_chunk(json.dumps(record).encode("utf-8") + b"\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class EstimationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pricing_client, query_workers=DEFAULT_QUERY_WORKERS, quiet=False):
+        super().__init__(address, EstimationRequestHandler)
+        self.pricing_client = pricing_client
+        self.query_workers = query_workers
+        self.quiet = quiet
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, pricing_client=None, query_workers=DEFAULT_QUERY_WORKERS,
+                  quiet=False):
+    if pricing_client is None:
+        pricing_client = create_service_client()
+    return EstimationServer((host, port), pricing_client, query_workers, quiet)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve cost estimates over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--query-workers", type=int, default=DEFAULT_QUERY_WORKERS,
+                        help="Concurrent pricing queries per architecture")
+    parser.add_argument("--cache-path", default=None,
+                        help=f"SQLite price cache (default: {DEFAULT_CACHE_PATH}; in memory only with --fake/--offline)")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL_SECONDS, help="Price cache TTL in seconds")
+    parser.add_argument("--offline", default=None, help="Price from bulk offer files or a compiled store instead of the API")
+    parser.add_argument("--fake", action="store_true", help="Price from the local fake backend (fixtures/offers)")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0, help="Injected latency for --fake")
+    parser.add_argument("--metrics", action="store_true", help="Collect metrics and serve them on GET /metrics")
+    parser.add_argument("--quiet", action="store_true", help="Do not log each request")
+    args = parser.parse_args(argv)
+
+    upstream = None
+    if args.fake:
+        from fake_pricing import FakePricingClient
+
+        upstream = FakePricingClient(latency_seconds=args.fake_latency_ms / 1000)
+    elif args.offline:
+        from offline_pricing import create_offline_pricing_client
+
+        upstream = create_offline_pricing_client(args.offline)
+    if args.metrics:
+        instrumentation.enable_metrics()
+
+    # Fake and offline prices must not land in the shared cache, whose keys do
+    # not say which backend answered
+    cache_path = args.cache_path or (None if upstream is not None else DEFAULT_CACHE_PATH)
+    pricing_client = create_service_client(upstream, cache_path=cache_path, ttl_seconds=args.ttl)
+    server = create_server(args.host, args.port, pricing_client, args.query_workers, args.quiet)
+    print(f"Serving estimates on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pricing_client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from offline_pricing import OfflinePricingClient, build_price_store
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "offers")
+
+
+class ThrottlingError(Exception):
+    """Shaped like botocore's ClientError for a throttled Pricing API call."""
+
+    def __init__(self, message="Rate exceeded"):
+        super().__init__(message)
+        self.response = {"Error": {"Code": "ThrottlingException", "Message": message}}
+
+
+class FakePricingClient:
+    """Local stand-in for the boto3 pricing client, serving recorded PriceList fixtures.
+
+    Latency and throttling can be injected to see how callers behave under
+    load. Like boto3, it only answers get_products with PriceList JSON strings.
+    """
+
+    def __init__(self, fixtures=DEFAULT_FIXTURES_DIR, latency_seconds=0.0, latency_jitter_seconds=0.0,
+                 throttle_rate=0.0, max_requests_per_second=None, seed=None):
+        self._offline = OfflinePricingClient(build_price_store(fixtures) if isinstance(fixtures, str) else fixtures)
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.throttle_rate = throttle_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.calls = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def _should_throttle(self):
+        if self.throttle_rate and self._random.random() < self.throttle_rate:
+            return True
+        if self.max_requests_per_second:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.max_requests_per_second:
+                return True
+            self._recent.append(now)
+        return False
+
+    def get_products(self, ServiceCode, Filters=(), MaxResults=100, **kwargs):
+        with self._lock:
+            self.calls += 1
+            throttled = self._should_throttle()
+            if throttled:
+                self.throttled += 1
+            delay = self.latency_seconds
+            if self.latency_jitter_seconds:
+                delay += self._random.uniform(0, self.latency_jitter_seconds)
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            raise ThrottlingError()
+        return self._offline.get_products(ServiceCode=ServiceCode, Filters=Filters, MaxResults=MaxResults, **kwargs)
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.throttled = 0
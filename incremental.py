@@ -0,0 +1,150 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from aws_cost_estimation import (
+    DEFAULT_MAX_WORKERS,
+    NODE_ESTIMATORS,
+    SharedPricingClient,
+    fetch_unique_queries,
+    node_config_key,
+    plan_node_queries,
+    price_planned_configs,
+)
+
+DEFAULT_MAX_CACHED_CONFIGS = 1024
+DEFAULT_MAX_CACHED_QUERIES = 4096
+
+
+def node_fingerprint(node):
+    # Stable across processes, unlike hash(); ids and labels are not part of it
+    return hashlib.blake2b(node_config_key(node).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class IncrementalEstimator:
+    """Re-estimates an edited architecture by re-pricing only the nodes that changed.
+
+    Each node is fingerprinted by (type, region, attributes). Unchanged and
+    removed nodes cost no pricing calls, and a recently priced configuration
+    (for example after an undo) is answered from memory. Remembered costs and
+    records are LRU-bounded; refresh(), or ttl_seconds, drops them so the
+    next update re-prices every node.
+    """
+
+    def __init__(self, pricing_client=None, max_workers=DEFAULT_MAX_WORKERS,
+                 max_cached_configs=DEFAULT_MAX_CACHED_CONFIGS, max_cached_queries=DEFAULT_MAX_CACHED_QUERIES,
+                 ttl_seconds=None):
+        self.pricing_client = pricing_client if pricing_client is not None else SharedPricingClient()
+        self.max_workers = max_workers
+        self.max_cached_configs = max_cached_configs
+        self.max_cached_queries = max_cached_queries
+        self.ttl_seconds = ttl_seconds
+        self._fingerprints = {}  # node id -> fingerprint
+        self._nodes = {}  # node id -> (node type, costs)
+        self._costs_by_fingerprint = OrderedDict()
+        self._records = OrderedDict()  # query key -> price records, shared by every config that needs them
+        self._refreshed_at = time.monotonic()
+        self._service_totals = {}
+        self.errors = {}
+        self.unpriced = []
+
+    @staticmethod
+    def _remember(cache, key, value, max_entries):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+
+    def refresh(self):
+        # Forget every remembered price; the next update re-prices all nodes
+        self._fingerprints.clear()
+        self._costs_by_fingerprint.clear()
+        self._records.clear()
+        self._refreshed_at = time.monotonic()
+
+    def _add(self, node_id, node_type, costs):
+        self._nodes[node_id] = (node_type, costs)
+        total = costs[NODE_ESTIMATORS[node_type][2]]
+        self._service_totals[node_type] = self._service_totals.get(node_type, 0.0) + total
+
+    def _remove(self, node_id):
+        self._fingerprints.pop(node_id, None)
+        self.errors.pop(node_id, None)
+        entry = self._nodes.pop(node_id, None)
+        if entry is None:
+            return
+        node_type, costs = entry
+        self._service_totals[node_type] -= costs[NODE_ESTIMATORS[node_type][2]]
+        if not any(t == node_type for t, _ in self._nodes.values()):
+            del self._service_totals[node_type]
+
+    def update(self, architecture_json):
+        if self.ttl_seconds is not None and time.monotonic() - self._refreshed_at >= self.ttl_seconds:
+            self.refresh()
+        seen = set()
+        to_price = []
+        changed = []
+        self.unpriced = []
+        for node in architecture_json['nodes']:
+            node_id = node['id']
+            if node['type'] not in NODE_ESTIMATORS:
+                self.unpriced.append(node_id)
+                continue
+            seen.add(node_id)
+            fingerprint = node_fingerprint(node)
+            if self._fingerprints.get(node_id) == fingerprint:
+                continue
+
+            changed.append(node_id)
+            self._remove(node_id)
+            costs = self._costs_by_fingerprint.get(fingerprint)
+            if costs is not None:
+                self._costs_by_fingerprint.move_to_end(fingerprint)
+                self._fingerprints[node_id] = fingerprint
+                self._add(node_id, node['type'], costs)
+            else:
+                to_price.append((node, fingerprint))
+
+        # Nodes that failed to price have no fingerprint, so they are retried
+        # on the next update; they still count as removed when they go away
+        removed = [node_id for node_id in {**self._nodes, **self.errors} if node_id not in seen]
+        for node_id in removed:
+            self._remove(node_id)
+
+        query_count = 0
+        if to_price:
+            configs, unique_queries, plan_errors = plan_node_queries([node for node, _ in to_price])
+            # A quantity-only edit reuses the records already fetched for the node
+            missing = {key: query for key, query in unique_queries.items() if key not in self._records}
+            fetched = fetch_unique_queries(self.pricing_client, missing, self.max_workers)
+            records_by_key = {key: self._records.get(key, fetched.get(key)) for key in unique_queries}
+            for key, records in records_by_key.items():
+                if not isinstance(records, Exception):
+                    self._remember(self._records, key, records, self.max_cached_queries)
+            costs_by_id, price_errors = price_planned_configs(configs, records_by_key)
+            query_count = len(missing)
+            for node, fingerprint in to_price:
+                costs = costs_by_id.get(node['id'])
+                if costs is None:
+                    continue
+                self._fingerprints[node['id']] = fingerprint
+                self._remember(self._costs_by_fingerprint, fingerprint, costs, self.max_cached_configs)
+                self._add(node['id'], node['type'], costs)
+            for node_id, e in {**plan_errors, **price_errors}.items():
+                self.errors[node_id] = str(e)
+
+        result = self.result()
+        result["changed"] = changed
+        result["removed"] = removed
+        result["query_count"] = query_count
+        return result
+
+    def result(self):
+        services = {node_type: round(total, 4) for node_type, total in self._service_totals.items()}
+        return {
+            "nodes": {node_id: {"type": node_type, **costs} for node_id, (node_type, costs) in self._nodes.items()},
+            "services": services,
+            "total_monthly_usd": round(sum(self._service_totals.values()), 4),
+            "errors": dict(self.errors),
+            "unpriced": list(self.unpriced),
+        }
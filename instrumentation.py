@@ -0,0 +1,262 @@
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+
+# Registered hooks; each is called with one event dict. When the list is empty
+# the instrumented code paths skip all timing and bookkeeping.
+_hooks = []
+
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def add_hook(hook):
+    if hook not in _hooks:
+        _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def enabled():
+    return bool(_hooks)
+
+
+def emit(event):
+    for hook in list(_hooks):
+        hook(event)
+
+
+def query_fingerprint(service_code, filters):
+    from aws_cost_estimation import make_query_key
+
+    return hashlib.blake2b(make_query_key(service_code, filters).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class QueryTimer:
+    """Context manager that times one pricing query and emits its "query" event.
+
+    Call received(response) as soon as a get_products response arrives; the
+    rest of the block is then timed as parsing. Does nothing when no hooks
+    are registered.
+    """
+
+    __slots__ = ("event", "_started_at", "_received_at")
+
+    def __init__(self, pricing_client, service_code, filters):
+        self.event = None
+        if _hooks:
+            self.event = {
+                "kind": "query",
+                "client": type(pricing_client).__name__,
+                "service_code": service_code,
+                "fingerprint": query_fingerprint(service_code, filters),
+                "error": None,
+            }
+        self._received_at = None
+
+    def __enter__(self):
+        self._started_at = time.perf_counter()
+        return self
+
+    def received(self, response):
+        if self.event is not None:
+            self._received_at = time.perf_counter()
+            self.event["wall_seconds"] = self._received_at - self._started_at
+            self.event["response_bytes"] = sum(
+                len(item) for item in response.get("PriceList", ()) if isinstance(item, str)
+            )
+        return response
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.event is None:
+            return False
+        finished_at = time.perf_counter()
+        if self._received_at is None:
+            self.event["wall_seconds"] = finished_at - self._started_at
+        else:
+            self.event["parse_seconds"] = finished_at - self._received_at
+        if exc_type is not None:
+            self.event["error"] = exc_type.__name__
+        emit(self.event)
+        return False
+
+
+def _estimator_event(name, started_at, error):
+    emit({
+        "kind": "estimator",
+        "name": name,
+        "wall_seconds": time.perf_counter() - started_at,
+        "error": error,
+    })
+
+
+def instrumented(name):
+    """Decorator emitting an "estimator" event with wall time around each call.
+
+    Works on coroutine functions too, timing the awaited call.
+    """
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _hooks:
+                    return await fn(*args, **kwargs)
+                started_at = time.perf_counter()
+                error = None
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    error = type(e).__name__
+                    raise
+                finally:
+                    _estimator_event(name, started_at, error)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _hooks:
+                return fn(*args, **kwargs)
+            started_at = time.perf_counter()
+            error = None
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                _estimator_event(name, started_at, error)
+
+        return wrapper
+
+    return decorator
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    """In-process counters and histograms fed by instrumentation events."""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._help = {}
+
+    def inc(self, name, labels=(), value=1, help_text=""):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._help.setdefault(name, (help_text, "counter"))
+
+    def observe(self, name, value, labels=(), help_text=""):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+                self._help.setdefault(name, (help_text, "histogram"))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def record(self, event):
+        kind = event["kind"]
+        if kind == "query":
+            labels = (("service_code", event["service_code"]), ("client", event["client"]))
+            status = (("status", "error" if event.get("error") else "ok"),)
+            self.inc("pricing_queries_total", labels + status, help_text="get_products calls")
+            self.observe("pricing_query_seconds", event["wall_seconds"], labels, "get_products wall time")
+            if "response_bytes" in event:
+                self.inc("pricing_response_bytes_total", labels, event["response_bytes"], "PriceList bytes received")
+            if "parse_seconds" in event:
+                self.observe("pricing_parse_seconds", event["parse_seconds"], labels, "PriceList parse time")
+        elif kind == "cache":
+            labels = (("service_code", event["service_code"]), ("result", event["result"]))
+            self.inc("price_cache_lookups_total", labels, help_text="Price cache lookups by result")
+        elif kind == "estimator":
+            labels = (("estimator", event["name"]),)
+            status = (("status", "error" if event.get("error") else "ok"),)
+            self.inc("estimator_calls_total", labels + status, help_text="Estimator calls")
+            self.observe("estimator_seconds", event["wall_seconds"], labels, "Estimator wall time")
+
+    __call__ = record
+
+    def cache_hit_rate(self):
+        with self._lock:
+            hits = sum(v for (name, labels), v in self._counters.items()
+                       if name == "price_cache_lookups_total" and ("result", "hit") in labels)
+            total = sum(v for (name, _), v in self._counters.items() if name == "price_cache_lookups_total")
+        return hits / total if total else None
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self._counters} | {name for name, _ in self._histograms})
+            for name in names:
+                help_text, metric_type = self._help[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets, histogram):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram[-2]}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram[-1],
+                    "sum": histogram[-2],
+                    "buckets": dict(zip((repr(b) for b in self.buckets), histogram)),
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms, "cache_hit_rate": self.cache_hit_rate()}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+registry = MetricsRegistry()
+
+
+def enable_metrics(metrics=None):
+    return add_hook(metrics if metrics is not None else registry)
+
+
+def disable_metrics(metrics=None):
+    remove_hook(metrics if metrics is not None else registry)
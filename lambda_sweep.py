@@ -0,0 +1,95 @@
+import numpy as np
+
+from aws_cost_estimation import LAMBDA_FREE_REQUESTS_PER_MONTH, build_lambda_queries, lambda_unit_prices
+from price_records import fetch_price_records
+from tiered_pricing import TierTable
+
+# Every memory size Lambda accepts, 128 MB to 10 GB in 1 MB steps
+LAMBDA_MEMORY_SIZES_MB = np.arange(128, 10241)
+
+
+class LambdaCostSurface:
+    """Monthly Lambda cost over a memory x duration x requests grid.
+
+    Cost arrays have shape (len(memory_mb), len(duration_ms), len(requests_per_month)).
+    """
+
+    def __init__(self, region, memory_mb, duration_ms, requests_per_month, compute_usd, request_usd,
+                 compute_tiers, price_per_request):
+        self.region = region
+        self.memory_mb = memory_mb
+        self.duration_ms = duration_ms
+        self.requests_per_month = requests_per_month
+        self.compute_usd = compute_usd
+        self.request_usd = request_usd
+        self.total_usd = np.round(compute_usd + request_usd, 4)
+        self.compute_tiers = compute_tiers
+        self.price_per_request = price_per_request
+
+    @property
+    def shape(self):
+        return self.total_usd.shape
+
+    def cost_at(self, memory_mb, duration_ms, requests_per_month):
+        i = int(np.searchsorted(self.memory_mb, memory_mb))
+        j = int(np.searchsorted(self.duration_ms, duration_ms))
+        k = int(np.searchsorted(self.requests_per_month, requests_per_month))
+        if (i >= len(self.memory_mb) or self.memory_mb[i] != memory_mb
+                or j >= len(self.duration_ms) or self.duration_ms[j] != duration_ms
+                or k >= len(self.requests_per_month) or self.requests_per_month[k] != requests_per_month):
+            raise ValueError("Point is not on the sweep grid.")
+        return {
+            "lambda_compute_monthly_usd": float(self.compute_usd[i, j, k]),
+            "lambda_request_monthly_usd": float(self.request_usd[i, j, k]),
+            "lambda_total_monthly_usd": float(self.total_usd[i, j, k]),
+        }
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        index = pd.MultiIndex.from_product(
+            [self.memory_mb, self.duration_ms, self.requests_per_month],
+            names=["memorySizeMB", "durationMs", "requestsPerMonth"],
+        )
+        return pd.DataFrame(
+            {
+                "lambda_compute_monthly_usd": self.compute_usd.ravel(),
+                "lambda_request_monthly_usd": self.request_usd.ravel(),
+                "lambda_total_monthly_usd": self.total_usd.ravel(),
+            },
+            index=index,
+        )
+
+
+def fetch_lambda_prices(pricing_client, region):
+    # One GB-second and one request price lookup, whatever the size of the sweep
+    queries = build_lambda_queries({"id": "sweep", "type": "AWSLambda", "region": region, "attributes": {}})
+    records = {
+        name: fetch_price_records(pricing_client, service_code, filters)
+        for name, (service_code, filters) in queries.items()
+    }
+    return lambda_unit_prices(records)
+
+
+def sweep_lambda_costs(pricing_client, region, memory_sizes_mb=LAMBDA_MEMORY_SIZES_MB, durations_ms=(100,),
+                       requests_per_month=(1000000,), free_requests_per_month=LAMBDA_FREE_REQUESTS_PER_MONTH,
+                       prices=None):
+    compute_tiers, price_per_request = prices if prices is not None else fetch_lambda_prices(pricing_client, region)
+    if not isinstance(compute_tiers, TierTable):
+        compute_tiers = TierTable.flat(compute_tiers)
+
+    memory_mb = np.unique(np.asarray(memory_sizes_mb, dtype=float))
+    duration_ms = np.unique(np.asarray(durations_ms, dtype=float))
+    requests = np.unique(np.asarray(requests_per_month, dtype=float))
+
+    # Broadcast the three axes against each other instead of looping
+    gb_seconds = (duration_ms[None, :, None] / 1000) * (memory_mb[:, None, None] / 1024) * requests[None, None, :]
+    compute_usd = np.round(compute_tiers.cost_array(gb_seconds), 4)
+
+    billable_requests = np.maximum(0.0, requests - free_requests_per_month)
+    request_usd = np.broadcast_to(np.round(price_per_request * billable_requests, 4), compute_usd.shape)
+
+    return LambdaCostSurface(
+        region, memory_mb, duration_ms, requests, compute_usd, np.array(request_usd),
+        compute_tiers, price_per_request,
+    )
@@ -0,0 +1,167 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from aws_cost_estimation import (
+    DEFAULT_MAX_WORKERS,
+    NODE_ESTIMATORS,
+    SharedPricingClient,
+    fetch_unique_queries,
+    index_nodes_by_type,
+    node_components,
+    plan_node_queries,
+)
+from offline_pricing import add_offline_argument, client_from_args
+
+DEFAULT_SAMPLES = 100000
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def sample_attribute(attributes, name, default, rng, n):
+    """Draws n values of a usage attribute, or returns it as-is if it is a plain number.
+
+    Distributions are written in place of the number:
+        {"distribution": "normal", "mean": 1e6, "stddev": 2e5}
+        {"distribution": "lognormal", "mu": 13.8, "sigma": 0.5}
+        {"distribution": "uniform", "low": 50, "high": 150}
+        {"distribution": "empirical", "samples": [90, 120, 180]}
+    Negative draws are clipped to zero since every attribute is a usage quantity.
+    """
+    spec = attributes.get(name, default)
+    if not isinstance(spec, dict):
+        return float(spec)
+
+    kind = spec.get("distribution")
+    try:
+        if kind == "normal":
+            values = rng.normal(spec["mean"], spec["stddev"], n)
+        elif kind == "lognormal":
+            values = rng.lognormal(spec["mu"], spec["sigma"], n)
+        elif kind == "uniform":
+            values = rng.uniform(spec["low"], spec["high"], n)
+        elif kind == "empirical":
+            samples = np.asarray(spec["samples"], dtype=float)
+            if not samples.size:
+                raise ValueError(f"Empirical distribution for '{name}' has no samples.")
+            values = rng.choice(samples, n)
+        else:
+            raise ValueError(f"Unknown distribution '{kind}' for '{name}'.")
+    except KeyError as e:
+        raise ValueError(f"{kind} distribution for '{name}' is missing {e}.") from None
+    return np.maximum(values, 0.0)
+
+
+def sampled_attribute_reader(node, rng, n):
+    # Same contract as node_attribute_reader, returning n draws per attribute
+    attributes = node['attributes']
+
+    def attribute(name, *default):
+        if not default and name not in attributes:
+            raise KeyError(name)
+        return sample_attribute(attributes, name, default[0] if default else None, rng, n)
+
+    return attribute
+
+
+def sample_node_costs(node, records, rng, n):
+    # n monthly cost samples for one node, from the same components the estimators price
+    total = 0.0
+    for _, quantity, tiers in node_components(node, records, sampled_attribute_reader(node, rng, n)):
+        total = total + (tiers.cost_array(quantity) if isinstance(quantity, np.ndarray) else tiers.cost(quantity))
+    return total
+
+
+def _summarise(costs, percentiles):
+    # costs: (rows, samples) -> one summary dict per row
+    values = np.percentile(costs, percentiles, axis=1)
+    means = costs.mean(axis=1)
+    return [
+        {
+            "mean": round(float(means[i]), 4),
+            **{f"p{p:g}": round(float(values[j, i]), 4) for j, p in enumerate(percentiles)},
+        }
+        for i in range(costs.shape[0])
+    ]
+
+
+def simulate_architecture(architecture_json, pricing_client=None, samples=DEFAULT_SAMPLES, seed=None,
+                          percentiles=DEFAULT_PERCENTILES, max_workers=DEFAULT_MAX_WORKERS):
+    if pricing_client is None:
+        pricing_client = SharedPricingClient()
+    rng = np.random.default_rng(seed)
+
+    node_index = index_nodes_by_type(architecture_json)
+    priced_nodes = [node for node_type in NODE_ESTIMATORS for node in node_index.get(node_type, ())]
+    unpriced = [node['id'] for node in architecture_json['nodes'] if node['type'] not in NODE_ESTIMATORS]
+
+    # Unit prices are fetched once per distinct query; only usage is sampled
+    configs, unique_queries, plan_errors = plan_node_queries(priced_nodes)
+    records_by_key = fetch_unique_queries(pricing_client, unique_queries, max_workers)
+    errors = {node_id: str(e) for node_id, e in plan_errors.items()}
+
+    node_ids = []
+    node_types = []
+    rows = []
+    for node, query_keys, ids in configs.values():
+        node_records = {name: records_by_key[key] for name, key in query_keys.items()}
+        failed = next((r for r in node_records.values() if isinstance(r, Exception)), None)
+        # Nodes sharing a configuration are separate resources, so each gets its own draws
+        for node_id in ids:
+            try:
+                if failed is not None:
+                    raise failed
+                costs = sample_node_costs(node, node_records, rng, samples)
+            except Exception as e:
+                errors[node_id] = str(e)
+                continue
+            node_ids.append(node_id)
+            node_types.append(node['type'])
+            rows.append(np.broadcast_to(costs, (samples,)))
+
+    result = {
+        "samples": samples,
+        "seed": seed,
+        "nodes": {},
+        "services": {},
+        "total_monthly_usd": None,
+        "errors": errors,
+        "unpriced": unpriced,
+        "query_count": len(unique_queries),
+    }
+    if not rows:
+        return result
+
+    costs = np.vstack(rows)
+    service_names = sorted(set(node_types))
+    row_types = np.array(node_types)
+    service_costs = np.vstack([costs[row_types == service].sum(axis=0) for service in service_names])
+
+    for node_id, node_type, summary in zip(node_ids, node_types, _summarise(costs, percentiles)):
+        result["nodes"][node_id] = {"type": node_type, **summary}
+    for service, summary in zip(service_names, _summarise(service_costs, percentiles)):
+        result["services"][service] = summary
+    result["total_monthly_usd"] = _summarise(service_costs.sum(axis=0, keepdims=True), percentiles)[0]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo monthly cost percentiles for an architecture.")
+    parser.add_argument("architecture", help="Architecture JSON; usage attributes may be distributions")
+    parser.add_argument("-n", "--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(DEFAULT_PERCENTILES))
+    add_offline_argument(parser)
+    args = parser.parse_args(argv)
+
+    with open(args.architecture, encoding="utf-8") as f:
+        architecture_json = json.load(f)
+    pricing_client = client_from_args(args.offline)
+    result = simulate_architecture(architecture_json, pricing_client, args.samples, args.seed, args.percentiles)
+    print(json.dumps(result, indent=2))
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+import csv
+import glob
+import gzip
+import json
+import os
+import sys
+
+from price_records import (
+    PriceRecord,
+    fetch_price_records,
+    filter_attributes,
+    records_from_terms,
+    records_to_price_list,
+)
+
+SUPPORTED_SERVICE_CODES = ("AmazonEC2", "AmazonRDS", "AmazonS3", "AWSLambda", "AWSDataTransfer", "AmazonCloudFront")
+
+# Attributes the estimators filter on; every other filter field is checked
+# against the candidate products left after the indexed lookups.
+INDEXED_FIELDS = (
+    "instancetype",
+    "databaseengine",
+    "regioncode",
+    "location",
+    "usagetype",
+    "volumeapiname",
+    "storageclass",
+    "operation",
+    "fromlocation",
+)
+
+# Bulk CSV headers that do not camel-case into the get_products attribute name
+CSV_COLUMN_ATTRIBUTE_MAP = {
+    "Product Family": "productFamily",
+    "serviceCode": "servicecode",
+    "usageType": "usagetype",
+    "CapacityStatus": "capacitystatus",
+    "Pre Installed S/W": "preInstalledSw",
+    "Volume API Name": "volumeApiName",
+    "Max IOPS/volume": "maxIopsvolume",
+    "Max throughput/volume": "maxThroughputvolume",
+}
+
+CSV_TERM_COLUMNS = (
+    "SKU", "OfferTermCode", "RateCode", "TermType", "PriceDescription", "EffectiveDate",
+    "StartingRange", "EndingRange", "Unit", "PricePerUnit", "Currency",
+    "LeaseContractLength", "PurchaseOption", "OfferingClass",
+)
+
+
+def _csv_column_to_attribute(column):
+    if column in CSV_COLUMN_ATTRIBUTE_MAP:
+        return CSV_COLUMN_ATTRIBUTE_MAP[column]
+    words = column.replace("/", " ").replace("-", " ").split()
+    if not words:
+        return column
+    return words[0][0].lower() + words[0][1:] + "".join(w[0].upper() + w[1:] for w in words[1:])
+
+
+class OfflinePriceStore:
+    """Indexed in-memory copy of the AWS bulk price-list offer files.
+
+    Prices are held as PriceRecords; the full product attributes are kept
+    alongside for matching and for rebuilding PriceList entries.
+    """
+
+    def __init__(self):
+        self.versions = {}
+        # service code -> sku -> (product, [PriceRecord])
+        self._products = {}
+        # service code -> field -> lower-cased value -> set of skus
+        self._index = {}
+        # service code -> sku -> {lower-cased field: lower-cased value}
+        self._match_attributes = {}
+
+    def services(self):
+        return list(self._products)
+
+    def product_count(self, service_code=None):
+        if service_code is not None:
+            return len(self._products.get(service_code, ()))
+        return sum(len(p) for p in self._products.values())
+
+    def add_product(self, service_code, product, terms):
+        sku = product["sku"]
+        products = self._products.setdefault(service_code, {})
+        records = records_from_terms(sku, service_code, terms, filter_attributes(product))
+        if sku in products:
+            self._merge_records(products[sku][1], records)
+            return
+        attributes = {k: sys.intern(str(v)) for k, v in product.get("attributes", {}).items()}
+        product = {"productFamily": product.get("productFamily", ""), "attributes": attributes, "sku": sku}
+        self._add(service_code, product, records)
+
+    def add_price_item(self, service_code, price_item):
+        # One get_products PriceList entry, as a JSON string or decoded
+        if isinstance(price_item, str):
+            price_item = json.loads(price_item)
+        self.add_product(price_item.get("serviceCode") or service_code, price_item["product"], price_item.get("terms", {}))
+
+    def add_records(self, service_code, product, records):
+        products = self._products.setdefault(service_code, {})
+        if product["sku"] in products:
+            self._merge_records(products[product["sku"]][1], records)
+        else:
+            self._add(service_code, product, list(records))
+
+    @staticmethod
+    def _merge_records(existing, records):
+        positions = {(r.term_type, r.offer_term_code): i for i, r in enumerate(existing)}
+        for record in records:
+            i = positions.get((record.term_type, record.offer_term_code))
+            if i is None:
+                existing.append(record)
+            else:
+                existing[i] = record
+
+    def _add(self, service_code, product, records):
+        sku = product["sku"]
+        self._products[service_code][sku] = (product, records)
+        index = self._index.setdefault(service_code, {})
+
+        matchable = {k.lower(): v.lower() for k, v in product["attributes"].items()}
+        if product["productFamily"]:
+            matchable["productfamily"] = product["productFamily"].lower()
+        self._match_attributes.setdefault(service_code, {})[sku] = matchable
+
+        for field in INDEXED_FIELDS:
+            value = matchable.get(field)
+            if value is not None:
+                index.setdefault(field, {}).setdefault(sys.intern(value), set()).add(sku)
+
+    def find_skus(self, service_code, filters):
+        products = self._products.get(service_code)
+        if not products:
+            return [], None
+
+        index = self._index[service_code]
+        term_type = None
+        indexed = []
+        remaining = []
+        for f in filters:
+            field = f["Field"].lower()
+            value = str(f["Value"]).lower()
+            if field == "termtype":
+                term_type = f["Value"]
+            elif field in INDEXED_FIELDS:
+                indexed.append(index.get(field, {}).get(value, set()))
+            else:
+                remaining.append((field, value))
+
+        if indexed:
+            indexed.sort(key=len)
+            candidates = set(indexed[0])
+            for skus in indexed[1:]:
+                candidates &= skus
+                if not candidates:
+                    return [], None
+        else:
+            candidates = products.keys()
+
+        match_attributes = self._match_attributes[service_code]
+        matched = []
+        for sku in candidates:
+            attributes = match_attributes[sku]
+            if all(attributes.get(field) == value for field, value in remaining):
+                if term_type is None or any(r.term_type == term_type for r in products[sku][1]):
+                    matched.append(sku)
+        matched.sort()
+        return matched, term_type
+
+    def product(self, service_code, sku):
+        return self._products[service_code][sku][0]
+
+    def records(self, service_code, sku, term_type=None):
+        records = self._products[service_code][sku][1]
+        if term_type is None:
+            return list(records)
+        return [r for r in records if r.term_type == term_type]
+
+    def iter_products(self, service_code):
+        return iter(self._products.get(service_code, {}).values())
+
+    def price_list_item(self, service_code, sku, term_type=None):
+        product, records = self._products[service_code][sku]
+        if term_type is not None:
+            records = [r for r in records if r.term_type == term_type]
+        item = json.loads(records_to_price_list(records)[0]) if records else {"terms": {}}
+        return json.dumps({
+            "product": product,
+            "serviceCode": service_code,
+            "terms": item["terms"],
+            "version": self.versions.get(service_code, ""),
+        })
+
+    def remove_product(self, service_code, sku):
+        products = self._products.get(service_code, {})
+        if sku not in products:
+            return
+        matchable = self._match_attributes[service_code].pop(sku)
+        del products[sku]
+        index = self._index[service_code]
+        for field in INDEXED_FIELDS:
+            value = matchable.get(field)
+            if value is not None:
+                index[field][value].discard(sku)
+
+    def drop_service(self, service_code):
+        self._products.pop(service_code, None)
+        self._index.pop(service_code, None)
+        self._match_attributes.pop(service_code, None)
+        self.versions.pop(service_code, None)
+
+    def save(self, path):
+        data = {
+            "versions": self.versions,
+            "products": {
+                service_code: [[product, [r.to_list() for r in records]] for product, records in products.values()]
+                for service_code, products in self._products.items()
+            },
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        store.versions.update(data.get("versions", {}))
+        for service_code, products in data["products"].items():
+            for product, records in products:
+                store.add_records(service_code, product, [PriceRecord.from_list(r) for r in records])
+        return store
+
+
+def ingest_offer_json(store, path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        offer = json.load(f)
+
+    service_code = offer["offerCode"]
+    store.versions[service_code] = offer.get("version", "")
+    terms_by_sku = {}
+    for term_type, skus in offer.get("terms", {}).items():
+        for sku, offers in skus.items():
+            terms_by_sku.setdefault(sku, {})[term_type] = offers
+
+    for sku, product in offer["products"].items():
+        store.add_product(service_code, product, terms_by_sku.get(sku, {}))
+    return service_code
+
+
+def ingest_offer_csv(store, path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+
+        # Bulk CSV files open with "Key","Value" metadata rows before the header
+        metadata = {}
+        header = None
+        for row in reader:
+            if row and row[0] == "SKU":
+                header = row
+                break
+            if len(row) >= 2:
+                metadata[row[0]] = row[1]
+        if header is None:
+            raise ValueError(f"No header row found in offer file '{path}'.")
+
+        service_code = metadata.get("OfferCode")
+        store.versions[service_code] = metadata.get("Version", "")
+        column = {name: i for i, name in enumerate(header)}
+        attribute_columns = [
+            (i, _csv_column_to_attribute(name))
+            for i, name in enumerate(header)
+            if name not in CSV_TERM_COLUMNS and name != "Product Family"
+        ]
+
+        # Each row is one price dimension; gather a product's rows before adding it
+        pending = {}
+        for row in reader:
+            if not row:
+                continue
+            sku = row[column["SKU"]]
+            if service_code is None:
+                service_code = row[column["serviceCode"]] if "serviceCode" in column else None
+                if service_code is None:
+                    raise ValueError(f"Offer file '{path}' does not name its service code.")
+
+            term_type = row[column["TermType"]]
+            offer_term_code = row[column["OfferTermCode"]]
+            rate_code = row[column["RateCode"]]
+            term_attributes = {
+                name: row[column[name]]
+                for name in ("LeaseContractLength", "PurchaseOption", "OfferingClass")
+                if name in column and row[column[name]]
+            }
+            dimension = {
+                "rateCode": rate_code,
+                "description": row[column["PriceDescription"]],
+                "beginRange": row[column["StartingRange"]] or "0",
+                "endRange": row[column["EndingRange"]] or "Inf",
+                "unit": row[column["Unit"]],
+                "pricePerUnit": {row[column["Currency"]]: row[column["PricePerUnit"]]},
+            }
+            if sku not in pending:
+                pending[sku] = ({
+                    "sku": sku,
+                    "productFamily": row[column["Product Family"]] if "Product Family" in column else "",
+                    "attributes": {name: row[i] for i, name in attribute_columns if row[i]},
+                }, {})
+            offers = pending[sku][1].setdefault(term_type, {})
+            term_id = f"{sku}.{offer_term_code}"
+            if term_id not in offers:
+                offers[term_id] = {
+                    "offerTermCode": offer_term_code,
+                    "sku": sku,
+                    "effectiveDate": row[column["EffectiveDate"]],
+                    "priceDimensions": {},
+                    "termAttributes": term_attributes,
+                }
+            offers[term_id]["priceDimensions"][rate_code] = dimension
+
+    for product, terms in pending.values():
+        store.add_product(service_code, product, terms)
+    return service_code
+
+
+def ingest_offer_file(store, path):
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return ingest_offer_csv(store, path)
+    if name.endswith(".json"):
+        return ingest_offer_json(store, path)
+    raise ValueError(f"Unsupported offer file format: '{path}'.")
+
+
+def build_price_store(paths_or_directory, service_codes=SUPPORTED_SERVICE_CODES):
+    if isinstance(paths_or_directory, str) and os.path.isdir(paths_or_directory):
+        paths = sorted(
+            p for pattern in ("*.json", "*.json.gz", "*.csv", "*.csv.gz")
+            for p in glob.glob(os.path.join(paths_or_directory, pattern))
+        )
+    elif isinstance(paths_or_directory, str):
+        paths = [paths_or_directory]
+    else:
+        paths = list(paths_or_directory)
+
+    store = OfflinePriceStore()
+    for path in paths:
+        ingest_offer_file(store, path)
+    for service_code in list(store.services()):
+        if service_codes and service_code not in service_codes:
+            store.drop_service(service_code)
+    return store
+
+
+class OfflinePricingClient:
+    """Answers get_products calls from an OfflinePriceStore instead of the Pricing API.
+
+    With a fallback client, queries the store cannot answer go to it instead.
+    """
+
+    def __init__(self, store, fallback=None):
+        self.store = store
+        self.fallback = fallback
+        self.fallback_calls = 0
+
+    def get_price_records(self, ServiceCode, Filters=(), MaxResults=100):
+        skus, term_type = self.store.find_skus(ServiceCode, Filters)
+        if not skus and self.fallback is not None:
+            self.fallback_calls += 1
+            return fetch_price_records(self.fallback, ServiceCode, Filters, MaxResults)
+        records = []
+        for sku in skus[:MaxResults]:
+            records.extend(self.store.records(ServiceCode, sku, term_type))
+        return records
+
+    def get_products(self, ServiceCode, Filters=(), MaxResults=100, NextToken=None, **kwargs):
+        skus, term_type = self.store.find_skus(ServiceCode, Filters)
+        if not skus and self.fallback is not None:
+            self.fallback_calls += 1
+            return self.fallback.get_products(ServiceCode=ServiceCode, Filters=Filters, MaxResults=MaxResults,
+                                              **({"NextToken": NextToken} if NextToken else {}), **kwargs)
+
+        start = int(NextToken) if NextToken else 0
+        end = start + MaxResults
+        response = {
+            "PriceList": [self.store.price_list_item(ServiceCode, sku, term_type) for sku in skus[start:end]],
+            "FormatVersion": "aws_v1",
+        }
+        if end < len(skus):
+            response["NextToken"] = str(end)
+        return response
+
+
+def create_offline_pricing_client(paths_or_directory, fallback=None):
+    if isinstance(paths_or_directory, str) and paths_or_directory.endswith(".store.json.gz"):
+        return OfflinePricingClient(OfflinePriceStore.load(paths_or_directory), fallback=fallback)
+    return OfflinePricingClient(build_price_store(paths_or_directory), fallback=fallback)
+
+
+def add_offline_argument(parser):
+    parser.add_argument("--offline", default=None, help="Price store or offer files to price from instead of AWS")
+
+
+def client_from_args(path):
+    # The client for a CLI's --offline value; None leaves the estimators on AWS
+    return create_offline_pricing_client(path) if path else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build an offline price store from AWS bulk offer files.")
+    parser.add_argument("sources", nargs="+", help="Offer files (.json/.csv, optionally .gz) or a directory of them")
+    parser.add_argument("-o", "--output", default="prices.store.json.gz", help="Where to write the compiled store")
+    args = parser.parse_args()
+
+    sources = args.sources[0] if len(args.sources) == 1 else args.sources
+    price_store = build_price_store(sources)
+    price_store.save(args.output)
+    for code in price_store.services():
+        print(f"{code}: {price_store.product_count(code)} products")
+    print(f"Wrote {args.output}")
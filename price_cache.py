@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import instrumentation
+from aws_cost_estimation import SharedPricingClient, make_query_key
+from price_records import dump_records, fetch_price_records, load_records, records_to_price_list
+
+DEFAULT_CACHE_PATH = os.getenv("PRICE_CACHE_PATH", os.path.expanduser("~/.cache/aws_cost_estimation/prices.sqlite3"))
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class CachedPricingClient:
+    """Drop-in wrapper for a pricing client that caches get_products results.
+
+    Results are held as parsed PriceRecords. Hot entries are kept in an
+    in-memory LRU, and every fetched result is also written through to SQLite
+    so a restarted process starts warm.
+    """
+
+    def __init__(self, client, db_path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.client = client
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            if db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS price_records ("
+                "cache_key TEXT PRIMARY KEY, records TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get_price_records(self, ServiceCode, Filters, MaxResults=1):
+        key = make_query_key(ServiceCode, Filters, MaxResults)
+        records = self._lookup(key)
+        if instrumentation.enabled():
+            instrumentation.emit({
+                "kind": "cache",
+                "service_code": ServiceCode,
+                "fingerprint": instrumentation.query_fingerprint(ServiceCode, Filters),
+                "result": "miss" if records is None else "hit",
+            })
+        if records is not None:
+            self.hits += 1
+            return records
+
+        self.misses += 1
+        records = tuple(fetch_price_records(self.client, ServiceCode, Filters, MaxResults))
+        self._store(key, records)
+        return records
+
+    def get_products(self, ServiceCode, Filters, MaxResults=1, **kwargs):
+        # Paginated calls are not cacheable under a single key
+        if kwargs.get("NextToken"):
+            return self.client.get_products(ServiceCode=ServiceCode, Filters=Filters, MaxResults=MaxResults, **kwargs)
+        records = self.get_price_records(ServiceCode, Filters, MaxResults)
+        return {"PriceList": records_to_price_list(records)}
+
+    def _lookup(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                records, fetched_at = entry
+                if now - fetched_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    return records
+                del self._memory[key]
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT records, fetched_at FROM price_records WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl_seconds:
+                self._db.execute("DELETE FROM price_records WHERE cache_key = ?", (key,))
+                self._db.commit()
+                return None
+            records = tuple(load_records(row[0]))
+            self._remember(key, records, row[1])
+            return records
+
+    def _store(self, key, records):
+        fetched_at = time.time()
+        with self._lock:
+            self._remember(key, records, fetched_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO price_records (cache_key, records, fetched_at) VALUES (?, ?, ?)",
+                    (key, dump_records(records), fetched_at),
+                )
+                self._db.commit()
+
+    def _remember(self, key, records, fetched_at):
+        self._memory[key] = (records, fetched_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            for key in [k for k, (_, fetched_at) in self._memory.items() if fetched_at <= cutoff]:
+                del self._memory[key]
+            if self._db is not None:
+                self._db.execute("DELETE FROM price_records WHERE fetched_at <= ?", (cutoff,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM price_records")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def create_cached_pricing_client(db_path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS,
+                                 max_entries=DEFAULT_MAX_ENTRIES, client=None):
+    return CachedPricingClient(
+        client if client is not None else SharedPricingClient(),
+        db_path=db_path,
+        ttl_seconds=ttl_seconds,
+        max_entries=max_entries,
+    )
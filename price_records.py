@@ -0,0 +1,233 @@
+import json
+import sys
+
+import instrumentation
+
+# Product attributes worth keeping on a record: the ones the estimators and
+# indexes filter on. Everything else in product.attributes is dropped.
+FILTER_ATTRIBUTES = frozenset(name.lower() for name in (
+    "productFamily",
+    "servicecode",
+    "instanceType",
+    "databaseEngine",
+    "deploymentOption",
+    "regionCode",
+    "location",
+    "usagetype",
+    "operation",
+    "volumeApiName",
+    "volumeType",
+    "storageClass",
+    "operatingSystem",
+    "tenancy",
+    "capacitystatus",
+    "preInstalledSw",
+    "transferType",
+    "fromLocation",
+    "toLocation",
+))
+
+_INF = float("inf")
+
+
+class PriceDimension:
+    __slots__ = ("begin_range", "end_range", "unit", "usd")
+
+    def __init__(self, begin_range, end_range, unit, usd):
+        self.begin_range = begin_range
+        self.end_range = end_range
+        self.unit = unit
+        self.usd = usd
+
+    def to_list(self):
+        return [self.begin_range, None if self.end_range == _INF else self.end_range, self.unit, self.usd]
+
+    @classmethod
+    def from_list(cls, values):
+        begin_range, end_range, unit, usd = values
+        return cls(begin_range, _INF if end_range is None else end_range, sys.intern(unit), usd)
+
+    def __repr__(self):
+        return f"PriceDimension({self.begin_range}, {self.end_range}, {self.unit!r}, {self.usd})"
+
+
+class PriceRecord:
+    """One offer term of one product, reduced to what pricing needs."""
+
+    __slots__ = ("sku", "service_code", "term_type", "offer_term_code", "dimensions", "attributes",
+                 "term_attributes")
+
+    def __init__(self, sku, service_code, term_type, offer_term_code, dimensions, attributes, term_attributes=None):
+        self.sku = sku
+        self.service_code = service_code
+        self.term_type = term_type
+        self.offer_term_code = offer_term_code
+        self.dimensions = dimensions  # tuple of PriceDimension sorted by begin_range
+        self.attributes = attributes
+        # LeaseContractLength / PurchaseOption / OfferingClass of Reserved terms
+        self.term_attributes = term_attributes or {}
+
+    @property
+    def usd(self):
+        # Price of the first (lowest) dimension, which is what untiered prices use
+        return self.dimensions[0].usd
+
+    def to_list(self):
+        return [
+            self.sku,
+            self.service_code,
+            self.term_type,
+            self.offer_term_code,
+            [d.to_list() for d in self.dimensions],
+            self.attributes,
+            self.term_attributes,
+        ]
+
+    @classmethod
+    def from_list(cls, values):
+        # Records saved before term attributes were kept have six fields
+        sku, service_code, term_type, offer_term_code, dimensions, attributes = values[:6]
+        term_attributes = values[6] if len(values) > 6 else None
+        return cls(
+            sku,
+            sys.intern(service_code),
+            sys.intern(term_type),
+            offer_term_code,
+            tuple(PriceDimension.from_list(d) for d in dimensions),
+            {sys.intern(k): sys.intern(v) for k, v in attributes.items()},
+            {sys.intern(k): sys.intern(v) for k, v in term_attributes.items()} if term_attributes else None,
+        )
+
+    def __repr__(self):
+        return f"PriceRecord({self.sku!r}, {self.term_type!r}, {self.offer_term_code!r}, {list(self.dimensions)!r})"
+
+
+def _format_range(value):
+    if value == _INF:
+        return "Inf"
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _parse_range(value, default):
+    if value in (None, ""):
+        return default
+    return _INF if value == "Inf" else float(value)
+
+
+def filter_attributes(product):
+    attributes = {
+        sys.intern(name): sys.intern(str(value))
+        for name, value in product.get("attributes", {}).items()
+        if name.lower() in FILTER_ATTRIBUTES
+    }
+    if product.get("productFamily"):
+        attributes["productFamily"] = sys.intern(product["productFamily"])
+    return attributes
+
+
+def parse_price_item(price_item, service_code=None):
+    # Accepts one PriceList entry, either as returned (a JSON string) or decoded
+    if isinstance(price_item, str):
+        price_item = json.loads(price_item)
+    product = price_item.get("product", {})
+    sku = product.get("sku", "")
+    service_code = sys.intern(price_item.get("serviceCode") or service_code or "")
+    attributes = filter_attributes(product)
+    return records_from_terms(sku, service_code, price_item.get("terms", {}), attributes)
+
+
+def records_from_terms(sku, service_code, terms, attributes):
+    records = []
+    for term_type, offers in terms.items():
+        term_type = sys.intern(term_type)
+        for offer in offers.values():
+            dimensions = [
+                PriceDimension(
+                    _parse_range(d.get("beginRange"), 0.0),
+                    _parse_range(d.get("endRange"), _INF),
+                    sys.intern(d.get("unit", "")),
+                    float(d.get("pricePerUnit", {}).get("USD", 0.0)),
+                )
+                for d in offer.get("priceDimensions", {}).values()
+            ]
+            if not dimensions:
+                continue
+            dimensions.sort(key=lambda d: d.begin_range)
+            term_attributes = {
+                sys.intern(k): sys.intern(str(v)) for k, v in (offer.get("termAttributes") or {}).items()
+            }
+            records.append(PriceRecord(sku, service_code, term_type, offer.get("offerTermCode", ""),
+                                       tuple(dimensions), attributes, term_attributes))
+    return records
+
+
+def records_from_response(response, service_code=None):
+    records = []
+    for price_item in response.get("PriceList", ()):
+        records.extend(parse_price_item(price_item, service_code))
+    return records
+
+
+def fetch_price_records(pricing_client, service_code, filters, max_results=1):
+    with instrumentation.QueryTimer(pricing_client, service_code, filters) as timer:
+        # Clients backed by a record cache or index skip the PriceList round trip
+        get_price_records = getattr(pricing_client, "get_price_records", None)
+        if get_price_records is not None:
+            return get_price_records(ServiceCode=service_code, Filters=filters, MaxResults=max_results)
+        response = timer.received(
+            pricing_client.get_products(ServiceCode=service_code, Filters=filters, MaxResults=max_results)
+        )
+        return records_from_response(response, service_code)
+
+
+def first_price(records, description, term_type=None, unit=None):
+    # With a unit, the price of the first dimension billed in it; Reserved
+    # terms also carry an upfront "Quantity" dimension that starts at 0 too
+    for record in records:
+        if term_type is None or record.term_type == term_type:
+            if unit is None:
+                return record.usd
+            for dimension in record.dimensions:
+                if dimension.unit.lower() == unit.lower():
+                    return dimension.usd
+    raise ValueError(f"Could not fetch {description} pricing info.")
+
+
+def records_to_price_list(records):
+    # Rebuilds get_products-shaped PriceList entries for callers that still want them
+    items = {}
+    for record in records:
+        item = items.get(record.sku)
+        if item is None:
+            attributes = dict(record.attributes)
+            product_family = attributes.pop("productFamily", "")
+            item = items[record.sku] = {
+                "product": {"productFamily": product_family, "attributes": attributes, "sku": record.sku},
+                "serviceCode": record.service_code,
+                "terms": {},
+            }
+        term_id = f"{record.sku}.{record.offer_term_code}"
+        item["terms"].setdefault(record.term_type, {})[term_id] = {
+            "offerTermCode": record.offer_term_code,
+            "sku": record.sku,
+            "termAttributes": dict(record.term_attributes),
+            "priceDimensions": {
+                f"{term_id}.{i}": {
+                    "rateCode": f"{term_id}.{i}",
+                    "beginRange": _format_range(d.begin_range),
+                    "endRange": _format_range(d.end_range),
+                    "unit": d.unit,
+                    "pricePerUnit": {"USD": repr(d.usd)},
+                }
+                for i, d in enumerate(record.dimensions)
+            },
+        }
+    return [json.dumps(item) for item in items.values()]
+
+
+def dump_records(records):
+    return json.dumps([r.to_list() for r in records], separators=(",", ":"))
+
+
+def load_records(data):
+    return [PriceRecord.from_list(values) for values in json.loads(data)]
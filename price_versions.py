@@ -0,0 +1,334 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import instrumentation
+from aws_cost_estimation import estimate_architecture
+from offline_pricing import OfflinePriceStore, OfflinePricingClient, build_price_store
+from price_records import dump_records, fetch_price_records, load_records
+
+DEFAULT_VERSIONS_PATH = "prices.versions.sqlite3"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS versions ("
+    "version_id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT, ingested_at REAL NOT NULL, "
+    "added INTEGER NOT NULL, changed INTEGER NOT NULL, removed INTEGER NOT NULL)",
+    # One row per SKU per version in which its prices changed; records is NULL
+    # when the SKU was withdrawn in that version
+    "CREATE TABLE IF NOT EXISTS sku_prices ("
+    "service_code TEXT NOT NULL, sku TEXT NOT NULL, version_id INTEGER NOT NULL, digest TEXT, "
+    "product TEXT, records TEXT, PRIMARY KEY (service_code, sku, version_id))",
+    "CREATE TABLE IF NOT EXISTS current_prices ("
+    "service_code TEXT NOT NULL, sku TEXT NOT NULL, version_id INTEGER NOT NULL, digest TEXT NOT NULL, "
+    "PRIMARY KEY (service_code, sku))",
+    "CREATE TABLE IF NOT EXISTS estimates ("
+    "estimate_id TEXT PRIMARY KEY, architecture TEXT NOT NULL, result TEXT NOT NULL, "
+    "version_id INTEGER, priced_at REAL NOT NULL)",
+    # Reverse index: which estimates used which SKU, and which queries came back empty
+    "CREATE TABLE IF NOT EXISTS estimate_dependencies ("
+    "estimate_id TEXT NOT NULL, service_code TEXT NOT NULL, fingerprint TEXT NOT NULL, sku TEXT)",
+    "CREATE INDEX IF NOT EXISTS estimate_dependencies_sku ON estimate_dependencies (service_code, sku)",
+    "CREATE INDEX IF NOT EXISTS estimate_dependencies_estimate ON estimate_dependencies (estimate_id)",
+    # The query behind each dependency fingerprint, so added SKUs can be matched against it
+    "CREATE TABLE IF NOT EXISTS dependency_queries ("
+    "fingerprint TEXT PRIMARY KEY, service_code TEXT NOT NULL, filters TEXT NOT NULL)",
+)
+
+
+def records_digest(product, records):
+    ordered = sorted(records, key=lambda r: (r.term_type, r.offer_term_code))
+    payload = json.dumps(product["attributes"], sort_keys=True) + dump_records(ordered)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TrackingPricingClient:
+    """Wraps a pricing client and remembers which SKUs each query returned."""
+
+    def __init__(self, client):
+        self.client = client
+        self.dependencies = set()  # (service code, query fingerprint, sku or None)
+        self.queries = {}  # query fingerprint -> (service code, filters)
+        self._lock = threading.Lock()
+
+    def get_price_records(self, ServiceCode, Filters, MaxResults=1):
+        records = fetch_price_records(self.client, ServiceCode, Filters, MaxResults)
+        fingerprint = instrumentation.query_fingerprint(ServiceCode, Filters)
+        with self._lock:
+            self.queries[fingerprint] = (ServiceCode, list(Filters))
+            if not records:
+                self.dependencies.add((ServiceCode, fingerprint, None))
+            for record in records:
+                self.dependencies.add((ServiceCode, fingerprint, record.sku))
+        return records
+
+
+class VersionedPriceStore:
+    """Price records kept per price-list version in SQLite, with the saved estimates that used them.
+
+    A new version is ingested as a delta: only SKUs whose prices changed get a
+    new row, and only the estimates that depend on those SKUs are re-priced.
+    """
+
+    def __init__(self, db_path=DEFAULT_VERSIONS_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+        self._lock = threading.RLock()
+        self._store = None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def current_version(self):
+        row = self._db.execute("SELECT MAX(version_id) FROM versions").fetchone()
+        return row[0]
+
+    def versions(self):
+        rows = self._db.execute(
+            "SELECT version_id, label, ingested_at, added, changed, removed FROM versions ORDER BY version_id"
+        ).fetchall()
+        return [
+            {"version_id": v, "label": label, "ingested_at": at, "added": a, "changed": c, "removed": r}
+            for v, label, at, a, c, r in rows
+        ]
+
+    def price_store(self):
+        # In-memory OfflinePriceStore of the current prices, kept in step with ingests
+        with self._lock:
+            if self._store is None:
+                store = OfflinePriceStore()
+                rows = self._db.execute(
+                    "SELECT p.service_code, p.product, p.records FROM current_prices c JOIN sku_prices p "
+                    "ON p.service_code = c.service_code AND p.sku = c.sku AND p.version_id = c.version_id"
+                )
+                for service_code, product, records in rows:
+                    store.add_records(service_code, json.loads(product), load_records(records))
+                self._store = store
+            return self._store
+
+    def pricing_client(self):
+        return OfflinePricingClient(self.price_store())
+
+    def ingest(self, new_store, label=None, service_codes=None):
+        """Ingests a full price list as a delta; returns {"version_id", "added", "changed", "removed"}.
+
+        SKUs are compared by a digest of their product attributes and records.
+        SKUs missing from a service that new_store covers count as removed.
+        """
+        service_codes = service_codes or new_store.services()
+        with self._lock:
+            current = {}
+            for service_code in service_codes:
+                rows = self._db.execute(
+                    "SELECT sku, digest FROM current_prices WHERE service_code = ?", (service_code,)
+                )
+                current[service_code] = dict(rows)
+
+            added, changed, removed = [], [], []
+            updates = []  # (service code, product, records, digest)
+            for service_code in service_codes:
+                seen = set()
+                for product, records in new_store.iter_products(service_code):
+                    sku = product["sku"]
+                    seen.add(sku)
+                    digest = records_digest(product, records)
+                    previous = current[service_code].get(sku)
+                    if previous == digest:
+                        continue
+                    (added if previous is None else changed).append((service_code, sku))
+                    updates.append((service_code, product, records, digest))
+                removed.extend((service_code, sku) for sku in current[service_code] if sku not in seen)
+
+            cursor = self._db.execute(
+                "INSERT INTO versions (label, ingested_at, added, changed, removed) VALUES (?, ?, ?, ?, ?)",
+                (label, time.time(), len(added), len(changed), len(removed)),
+            )
+            version_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO sku_prices (service_code, sku, version_id, digest, product, records) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(s, p["sku"], version_id, digest, json.dumps(p), dump_records(r)) for s, p, r, digest in updates]
+                + [(s, sku, version_id, None, None, None) for s, sku in removed],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO current_prices (service_code, sku, version_id, digest) VALUES (?, ?, ?, ?)",
+                [(s, p["sku"], version_id, digest) for s, p, _, digest in updates],
+            )
+            self._db.executemany("DELETE FROM current_prices WHERE service_code = ? AND sku = ?", removed)
+            self._db.commit()
+
+            if self._store is not None:
+                for service_code, product, records, _ in updates:
+                    self._store.remove_product(service_code, product["sku"])
+                    self._store.add_records(service_code, product, list(records))
+                for service_code, sku in removed:
+                    self._store.remove_product(service_code, sku)
+
+        return {"version_id": version_id, "added": added, "changed": changed, "removed": removed}
+
+    def ingest_offer_files(self, paths_or_directory, label=None):
+        return self.ingest(build_price_store(paths_or_directory), label)
+
+    def save_estimate(self, estimate_id, architecture_json, pricing_client=None):
+        # Prices the architecture against the current version (or pricing_client)
+        # and records which SKUs and queries it depended on
+        tracker = TrackingPricingClient(pricing_client if pricing_client is not None else self.pricing_client())
+        result = estimate_architecture(architecture_json, tracker, max_workers=1)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO estimates (estimate_id, architecture, result, version_id, priced_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (estimate_id, json.dumps(architecture_json), json.dumps(result), self.current_version(), time.time()),
+            )
+            self._db.execute("DELETE FROM estimate_dependencies WHERE estimate_id = ?", (estimate_id,))
+            self._db.executemany(
+                "INSERT INTO estimate_dependencies (estimate_id, service_code, fingerprint, sku) VALUES (?, ?, ?, ?)",
+                [(estimate_id, s, fingerprint, sku) for s, fingerprint, sku in tracker.dependencies],
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO dependency_queries (fingerprint, service_code, filters) VALUES (?, ?, ?)",
+                [(fingerprint, s, json.dumps(filters)) for fingerprint, (s, filters) in tracker.queries.items()],
+            )
+            self._db.commit()
+        return result
+
+    def load_estimate(self, estimate_id):
+        row = self._db.execute(
+            "SELECT architecture, result FROM estimates WHERE estimate_id = ?", (estimate_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"No saved estimate '{estimate_id}'.")
+        return json.loads(row[0]), json.loads(row[1])
+
+    def _queries_matching(self, added):
+        # Fingerprints of saved queries that an added SKU satisfies. Such a SKU
+        # can change a MaxResults=1 answer even when the query was not empty,
+        # so these are matched with the offline store's own filter semantics.
+        if not added:
+            return []
+        current = self.price_store()
+        matcher = OfflinePriceStore()
+        for service_code, sku in added:
+            matcher.add_records(service_code, current.product(service_code, sku), current.records(service_code, sku))
+        fingerprints = []
+        for service_code in matcher.services():
+            rows = self._db.execute(
+                "SELECT fingerprint, filters FROM dependency_queries WHERE service_code = ?", (service_code,)
+            )
+            for fingerprint, filters in rows:
+                if matcher.find_skus(service_code, json.loads(filters))[0]:
+                    fingerprints.append(fingerprint)
+        return fingerprints
+
+    def affected_estimates(self, delta):
+        # Estimates that used a changed or removed SKU, plus those with a query
+        # that an added SKU satisfies. Queries saved before dependency_queries
+        # existed are only matched when they came back empty.
+        touched = delta["changed"] + delta["removed"]
+        affected = set()
+        with self._lock:
+            for service_code, sku in touched:
+                rows = self._db.execute(
+                    "SELECT DISTINCT estimate_id FROM estimate_dependencies WHERE service_code = ? AND sku = ?",
+                    (service_code, sku),
+                )
+                affected.update(row[0] for row in rows)
+            for service_code in sorted({service_code for service_code, _ in delta["added"]}):
+                rows = self._db.execute(
+                    "SELECT DISTINCT estimate_id FROM estimate_dependencies WHERE service_code = ? AND sku IS NULL",
+                    (service_code,),
+                )
+                affected.update(row[0] for row in rows)
+            for fingerprint in self._queries_matching(delta["added"]):
+                rows = self._db.execute(
+                    "SELECT DISTINCT estimate_id FROM estimate_dependencies WHERE fingerprint = ?", (fingerprint,)
+                )
+                affected.update(row[0] for row in rows)
+        return sorted(affected)
+
+    def reprice(self, delta):
+        """Re-prices the saved estimates a delta affects; returns before/after per estimate."""
+        report = []
+        pricing_client = self.pricing_client()
+        for estimate_id in self.affected_estimates(delta):
+            architecture_json, before = self.load_estimate(estimate_id)
+            after = self.save_estimate(estimate_id, architecture_json, pricing_client)
+            node_deltas = {}
+            for node_id in sorted(set(before["nodes"]) | set(after["nodes"])):
+                old = before["nodes"].get(node_id)
+                new = after["nodes"].get(node_id)
+                if old != new:
+                    node_deltas[node_id] = {"before": old, "after": new}
+            report.append({
+                "estimate_id": estimate_id,
+                "before_monthly_usd": before["total_monthly_usd"],
+                "after_monthly_usd": after["total_monthly_usd"],
+                "delta_monthly_usd": round(after["total_monthly_usd"] - before["total_monthly_usd"], 4),
+                "nodes": node_deltas,
+            })
+        return report
+
+    def update(self, new_store, label=None):
+        # Ingest a new price list and re-price only what it touched
+        delta = self.ingest(new_store, label)
+        return delta, self.reprice(delta)
+
+
+def _delta_summary(delta):
+    return {
+        "version_id": delta["version_id"],
+        "added": len(delta["added"]),
+        "changed": len(delta["changed"]),
+        "removed": len(delta["removed"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Versioned price lists and re-pricing of saved estimates.")
+    parser.add_argument("--db", default=DEFAULT_VERSIONS_PATH, help="Versioned price database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Ingest a price list and re-price the estimates it affects")
+    ingest.add_argument("sources", nargs="+", help="Offer files, a directory of them, or a .store.json.gz")
+    ingest.add_argument("--label", default=None)
+    save = commands.add_parser("save", help="Price an architecture and save it for re-pricing")
+    save.add_argument("architecture", help="Architecture JSON")
+    save.add_argument("--id", default=None, help="Estimate id (default: the architecture's title)")
+    commands.add_parser("versions", help="List ingested versions")
+    args = parser.parse_args(argv)
+
+    versioned = VersionedPriceStore(args.db)
+    try:
+        if args.command == "ingest":
+            sources = args.sources[0] if len(args.sources) == 1 else args.sources
+            if isinstance(sources, str) and sources.endswith(".store.json.gz"):
+                new_store = OfflinePriceStore.load(sources)
+            else:
+                new_store = build_price_store(sources)
+            delta, report = versioned.update(new_store, args.label)
+            print(json.dumps({"delta": _delta_summary(delta), "repriced": report}, indent=2))
+        elif args.command == "save":
+            with open(args.architecture, encoding="utf-8") as f:
+                architecture_json = json.load(f)
+            estimate_id = args.id or architecture_json.get("title") or os.path.basename(args.architecture)
+            result = versioned.save_estimate(estimate_id, architecture_json)
+            print(json.dumps({"estimate_id": estimate_id, "total_monthly_usd": result["total_monthly_usd"]}))
+        else:
+            print(json.dumps(versioned.versions(), indent=2))
+    finally:
+        versioned.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
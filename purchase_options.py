@@ -0,0 +1,177 @@
+import argparse
+import json
+import re
+import sys
+
+from aws_cost_estimation import (
+    DEFAULT_MAX_WORKERS,
+    HOURS_PER_MONTH,
+    NODE_ESTIMATORS,
+    SharedPricingClient,
+    fetch_unique_queries,
+    index_nodes_by_type,
+    make_query_key,
+    node_config_key,
+)
+from offline_pricing import add_offline_argument, client_from_args
+
+# Node types whose instance price depends on the purchase option
+PURCHASE_OPTION_NODE_TYPES = ("AmazonEC2", "AmazonRDS")
+
+_LEASE_YEARS = re.compile(r"(\d+)\s*yr", re.IGNORECASE)
+
+
+def all_terms_query(node):
+    # The node's instance query without its termType filter, so one response
+    # carries every OnDemand and Reserved offer of the product. The builders
+    # may require a termType, so any value is filled in before it is dropped.
+    node = dict(node, attributes={"termType": "OnDemand", **node.get('attributes', {})})
+    service_code, filters = NODE_ESTIMATORS[node['type']][0](node)["instance"]
+    return service_code, [f for f in filters if f["Field"].lower() != "termtype"]
+
+
+def purchase_option_label(record):
+    if record.term_type != "Reserved":
+        return record.term_type
+    attributes = record.term_attributes
+    parts = [attributes.get("LeaseContractLength", ""), attributes.get("OfferingClass", ""),
+             attributes.get("PurchaseOption", "")]
+    return " ".join(["Reserved"] + [p for p in parts if p])
+
+
+def lease_months(record):
+    match = _LEASE_YEARS.search(record.term_attributes.get("LeaseContractLength", ""))
+    return int(match.group(1)) * 12 if match else None
+
+
+def price_purchase_option(record):
+    # Upfront fees ("Quantity" dimensions) are amortised over the lease;
+    # hourly dimensions are charged for HOURS_PER_MONTH hours
+    upfront = sum((d.usd for d in record.dimensions if d.unit == "Quantity"), 0.0)
+    hourly = sum((d.usd for d in record.dimensions if d.unit in ("Hrs", "Hours")), 0.0)
+    months = lease_months(record)
+    if upfront and not months:
+        raise ValueError(f"Term {record.offer_term_code} has an upfront fee but no lease length.")
+    return {
+        "option": purchase_option_label(record),
+        "term_type": record.term_type,
+        "offer_term_code": record.offer_term_code,
+        "lease_contract_length": record.term_attributes.get("LeaseContractLength"),
+        "purchase_option": record.term_attributes.get("PurchaseOption"),
+        "offering_class": record.term_attributes.get("OfferingClass"),
+        "upfront_usd": round(upfront, 4),
+        "hourly_usd": hourly,
+        "effective_monthly_usd": round((upfront / months if upfront else 0.0) + hourly * HOURS_PER_MONTH, 4),
+    }
+
+
+def price_purchase_options(records):
+    # Every term of a product in one pass, cheapest first
+    options = {}
+    for record in records:
+        option = price_purchase_option(record)
+        previous = options.get(option["option"])
+        if previous is None or option["effective_monthly_usd"] < previous["effective_monthly_usd"]:
+            options[option["option"]] = option
+    return sorted(options.values(), key=lambda o: (o["effective_monthly_usd"], o["option"]))
+
+
+def compare_purchase_options(architecture_json, pricing_client=None, max_workers=DEFAULT_MAX_WORKERS):
+    """OnDemand and every Reserved option for the instances of each EC2 and RDS node.
+
+    Costs cover the instance only; storage is billed the same under every option.
+    """
+    if pricing_client is None:
+        pricing_client = SharedPricingClient()
+    node_index = index_nodes_by_type(architecture_json)
+    nodes = [node for node_type in PURCHASE_OPTION_NODE_TYPES for node in node_index.get(node_type, ())]
+
+    # One query per distinct product; the node's termType no longer matters
+    query_keys = {}
+    unique_queries = {}
+    errors = {}
+    for node in nodes:
+        try:
+            query = all_terms_query(node)
+        except (KeyError, ValueError) as e:
+            errors[node['id']] = str(e)
+            continue
+        query_keys[node['id']] = make_query_key(*query)
+        unique_queries.setdefault(query_keys[node['id']], query)
+    records_by_key = fetch_unique_queries(pricing_client, unique_queries, max_workers)
+
+    options_by_config = {}
+    result_nodes = {}
+    for node in nodes:
+        key = query_keys.get(node['id'])
+        if key is None:
+            continue
+        config = node_config_key(node)
+        try:
+            options = options_by_config.get(config)
+            if options is None:
+                records = records_by_key[key]
+                if isinstance(records, Exception):
+                    raise records
+                options = options_by_config[config] = price_purchase_options(records)
+            if not options:
+                raise ValueError(f"No purchase options found for {node['type']} node '{node['id']}'.")
+        except Exception as e:
+            errors[node['id']] = str(e)
+            continue
+        on_demand = next((o for o in options if o["term_type"] == "OnDemand"), None)
+        cheapest = options[0]
+        result_nodes[node['id']] = {
+            "type": node['type'],
+            "instanceType": node['attributes'].get("instanceType"),
+            "options": options,
+            "cheapest_option": cheapest["option"],
+            "cheapest_monthly_usd": cheapest["effective_monthly_usd"],
+            "on_demand_monthly_usd": on_demand["effective_monthly_usd"] if on_demand else None,
+            "monthly_savings_usd": (
+                round(on_demand["effective_monthly_usd"] - cheapest["effective_monthly_usd"], 4) if on_demand else None
+            ),
+        }
+
+    # Whole architecture: one commitment for every node (nodes without that
+    # option stay OnDemand), and the per-node cheapest mix
+    labels = sorted({o["option"] for n in result_nodes.values() for o in n["options"]})
+    by_option = {}
+    for label in labels:
+        total = 0.0
+        for node_result in result_nodes.values():
+            option = next((o for o in node_result["options"] if o["option"] == label), None)
+            total += option["effective_monthly_usd"] if option else (node_result["on_demand_monthly_usd"] or 0.0)
+        by_option[label] = round(total, 4)
+    cheapest_option = min(by_option, key=by_option.get) if by_option else None
+
+    return {
+        "nodes": result_nodes,
+        "total": {
+            "by_option": by_option,
+            "cheapest_option": cheapest_option,
+            "cheapest_option_monthly_usd": by_option.get(cheapest_option),
+            "cheapest_mix_monthly_usd": round(sum(n["cheapest_monthly_usd"] for n in result_nodes.values()), 4),
+            "on_demand_monthly_usd": by_option.get("OnDemand"),
+        },
+        "errors": errors,
+        "query_count": len(unique_queries),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare OnDemand and Reserved pricing for an architecture.")
+    parser.add_argument("architecture", help="Architecture JSON")
+    add_offline_argument(parser)
+    args = parser.parse_args(argv)
+
+    with open(args.architecture, encoding="utf-8") as f:
+        architecture_json = json.load(f)
+    pricing_client = client_from_args(args.offline)
+    result = compare_purchase_options(architecture_json, pricing_client)
+    print(json.dumps(result, indent=2))
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from array import array
+
+import numpy as np
+
+# Row layout: one priced component of one node of one architecture
+COLUMNS = ("architecture", "node", "service", "region", "component")
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+_COST_SUFFIX = "_monthly_usd"
+_TOTAL_SUFFIX = "_total_monthly_usd"
+
+
+def estimate_rows(architecture_id, estimate, node_regions=None, node_types=None):
+    # (architecture, node, service, region, component, usd) rows for one
+    # estimate_architecture result; per-service totals are left out so the
+    # rows sum to the architecture total. node_types covers the data-transfer
+    # rows of nodes the estimators do not price, such as CloudFront.
+    node_regions = node_regions or {}
+    node_types = node_types or {}
+    for node_id, costs in estimate["nodes"].items():
+        region = node_regions.get(node_id, "")
+        for key, usd in costs.items():
+            if key.endswith(_COST_SUFFIX) and not key.endswith(_TOTAL_SUFFIX):
+                yield architecture_id, node_id, costs["type"], region, key[:-len(_COST_SUFFIX)], usd
+    transfer = estimate.get("data_transfer")
+    if transfer:
+        for node_id, usd in transfer["nodes"].items():
+            service = node_types.get(node_id) or estimate["nodes"].get(node_id, {}).get("type", "")
+            yield architecture_id, node_id, service, node_regions.get(node_id, ""), "data_transfer", usd
+
+
+def node_regions(architecture_json):
+    return {node["id"]: node.get("region", "") for node in architecture_json["nodes"]}
+
+
+def node_types(architecture_json):
+    return {node["id"]: node["type"] for node in architecture_json["nodes"]}
+
+
+class ResultWriter:
+    """Appends cost rows to a directory of columnar .npz chunks.
+
+    Strings are dictionary-encoded per chunk (int32 codes plus the chunk's
+    distinct values), so a chunk of a million rows is a few tens of MB in
+    memory and far less on disk. Rows are buffered until chunk_rows.
+    """
+
+    def __init__(self, directory, chunk_rows=DEFAULT_CHUNK_ROWS, compress=False):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+        self._next_part = len(glob.glob(os.path.join(directory, "part-*.npz")))
+        self.rows_written = 0
+        self._reset()
+
+    def _reset(self):
+        self._codes = {column: array("i") for column in COLUMNS}
+        self._values = {column: {} for column in COLUMNS}
+        self._usd = array("d")
+        self._encoders = [self._values[column] for column in COLUMNS]
+        self._code_arrays = [self._codes[column] for column in COLUMNS]
+
+    def __len__(self):
+        return self.rows_written + len(self._usd)
+
+    def append(self, architecture_id, node_id, service, region, component, usd):
+        for values, codes, value in zip(self._encoders, self._code_arrays,
+                                        (architecture_id, node_id, service, region, component)):
+            code = values.get(value)
+            if code is None:
+                code = values[value] = len(values)
+            codes.append(code)
+        self._usd.append(usd)
+        if len(self._usd) >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(*row)
+
+    def add_estimate(self, architecture_id, estimate, node_regions=None, node_types=None):
+        before = len(self)
+        self.extend(estimate_rows(str(architecture_id), estimate, node_regions, node_types))
+        return len(self) - before
+
+    def flush(self):
+        if not self._usd:
+            return
+        arrays = {"usd": np.frombuffer(self._usd, dtype=np.float64)}
+        for column in COLUMNS:
+            arrays[f"{column}_codes"] = np.frombuffer(self._codes[column], dtype=np.int32)
+            arrays[f"{column}_values"] = np.array([str(v) for v in self._values[column]], dtype=str)
+        path = os.path.join(self.directory, f"part-{self._next_part:05d}.npz")
+        # Written under a temporary name so readers never see a partial chunk
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            (np.savez_compressed if self.compress else np.savez)(f, **arrays)
+        os.replace(temporary, path)
+        self._next_part += 1
+        self.rows_written += len(self._usd)
+        self._reset()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ResultStore:
+    """Reads the chunks a ResultWriter wrote, one chunk in memory at a time."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, "part-*.npz")))
+
+    def chunks(self):
+        for path in self.paths():
+            with np.load(path) as chunk:
+                yield {name: chunk[name] for name in chunk.files}
+
+    def row_count(self):
+        count = 0
+        for path in self.paths():
+            with np.load(path) as chunk:
+                count += len(chunk["usd"])
+        return count
+
+    @staticmethod
+    def _mask(chunk, where):
+        mask = None
+        for column, wanted in where.items():
+            if column not in COLUMNS:
+                raise ValueError(f"Unknown column '{column}'; expected one of {', '.join(COLUMNS)}.")
+            wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+            codes = np.flatnonzero(np.isin(chunk[f"{column}_values"], wanted))
+            column_mask = np.isin(chunk[f"{column}_codes"], codes)
+            mask = column_mask if mask is None else mask & column_mask
+        return mask
+
+    def group_sum(self, by=("service",), where=None):
+        """Sums usd per distinct value (tuple of values) of the `by` columns.
+
+        where maps a column to a value or list of values to keep. Each chunk is
+        reduced with one bincount over its combined codes, so memory follows the
+        number of groups, not the number of rows.
+        """
+        by = (by,) if isinstance(by, str) else tuple(by)
+        for column in by:
+            if column not in COLUMNS:
+                raise ValueError(f"Unknown column '{column}'; expected one of {', '.join(COLUMNS)}.")
+        totals = {}
+        for chunk in self.chunks():
+            usd = chunk["usd"]
+            codes = [chunk[f"{column}_codes"].astype(np.int64) for column in by]
+            if where:
+                mask = self._mask(chunk, where)
+                usd = usd[mask]
+                codes = [c[mask] for c in codes]
+            if not len(usd):
+                continue
+            shape = tuple(len(chunk[f"{column}_values"]) for column in by)
+            if by:
+                keys, group_of = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+                sums = np.bincount(group_of, weights=usd, minlength=len(keys))
+                positions = np.unravel_index(keys, shape)
+            else:
+                sums = np.array([usd.sum()])
+                positions = ()
+            values = [chunk[f"{column}_values"][p].tolist() for column, p in zip(by, positions)]
+            for group, total in zip(zip(*values) if by else [()], sums.tolist()):
+                totals[group] = totals.get(group, 0.0) + total
+        return {group: round(total, 4) for group, total in sorted(totals.items())}
+
+    def total(self, where=None):
+        return self.group_sum(by=(), where=where).get((), 0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll up stored per-node cost rows.")
+    parser.add_argument("directory", help="Result directory written by ResultWriter (e.g. batch_estimate --results)")
+    parser.add_argument("--by", nargs="+", default=["service"], choices=COLUMNS, help="Columns to group by")
+    parser.add_argument("--where", nargs="+", default=[], metavar="COLUMN=VALUE", help="Keep only matching rows")
+    args = parser.parse_args(argv)
+
+    where = {}
+    for condition in args.where:
+        column, _, value = condition.partition("=")
+        where.setdefault(column, []).append(value)
+    store = ResultStore(args.directory)
+    for group, usd in store.group_sum(args.by, where).items():
+        print(json.dumps({**dict(zip(args.by, group)), "monthly_usd": usd}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
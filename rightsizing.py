@@ -0,0 +1,308 @@
+import argparse
+import copy
+import heapq
+import json
+import re
+import sys
+
+from aws_cost_estimation import HOURS_PER_MONTH, REGION_CODE_MAP, resolve_region
+from offline_pricing import OfflinePriceStore, build_price_store
+
+
+# Only products priced the way the estimators price a node by default are
+# indexed, so an alternative is always a like-for-like swap.
+INDEXED_PRODUCTS = {
+    "AmazonEC2": ("Compute Instance", {
+        "operatingSystem": "Linux", "tenancy": "Shared", "capacitystatus": "Used", "preInstalledSw": "NA",
+    }),
+    "AmazonRDS": ("Database Instance", {"deploymentOption": "Single-AZ"}),
+}
+
+# networkPerformance labels without a number, as an approximate Gbit/s
+NETWORK_PERFORMANCE_GBPS = {
+    "very low": 0.05,
+    "low": 0.1,
+    "low to moderate": 0.3,
+    "moderate": 0.5,
+    "high": 1.0,
+}
+
+_NUMBER = re.compile(r"[\d,]*\.?\d+")
+
+
+def _parse_number(value, default=0.0):
+    match = _NUMBER.search(value or "")
+    return float(match.group().replace(",", "")) if match else default
+
+
+def parse_network_gbps(value):
+    value = (value or "").strip().lower()
+    if value in NETWORK_PERFORMANCE_GBPS:
+        return NETWORK_PERFORMANCE_GBPS[value]
+    gbps = _parse_number(value)
+    return gbps / 1000 if "megabit" in value else gbps
+
+
+def instance_family(instance_type):
+    # "m5.large" -> "m5", "db.r6g.xlarge" -> "r6g"
+    parts = instance_type.split(".")
+    return parts[1] if parts[0] == "db" and len(parts) > 2 else parts[0]
+
+
+class InstanceOffer:
+    __slots__ = ("service_code", "instance_type", "family", "instance_family", "region_code", "location",
+                 "vcpu", "memory_gib", "network_gbps", "database_engine", "hourly_usd", "sku",
+                 "license_model", "database_edition")
+
+    def __init__(self, service_code, instance_type, family, instance_family, region_code, location,
+                 vcpu, memory_gib, network_gbps, database_engine, hourly_usd, sku, license_model="",
+                 database_edition=""):
+        self.service_code = service_code
+        self.instance_type = instance_type
+        self.family = family
+        self.instance_family = instance_family
+        self.region_code = region_code
+        self.location = location
+        self.vcpu = vcpu
+        self.memory_gib = memory_gib
+        self.network_gbps = network_gbps
+        self.database_engine = database_engine
+        self.hourly_usd = hourly_usd
+        self.sku = sku
+        self.license_model = license_model
+        self.database_edition = database_edition
+
+    @property
+    def monthly_usd(self):
+        return round(self.hourly_usd * HOURS_PER_MONTH, 4)
+
+    def to_dict(self):
+        result = {
+            "instanceType": self.instance_type,
+            "region": self.region_code,
+            "vcpu": self.vcpu,
+            "memoryGiB": self.memory_gib,
+            "networkGbps": self.network_gbps,
+            "hourly_usd": self.hourly_usd,
+            "monthly_usd": self.monthly_usd,
+        }
+        if self.database_engine:
+            result["databaseEngine"] = self.database_engine
+        if self.license_model:
+            result["licenseModel"] = self.license_model
+        if self.database_edition:
+            result["databaseEdition"] = self.database_edition
+        return result
+
+    def __repr__(self):
+        return f"InstanceOffer({self.instance_type!r}, {self.region_code!r}, {self.hourly_usd})"
+
+
+def offers_from_price_store(store, service_codes=tuple(INDEXED_PRODUCTS)):
+    offers = []
+    for service_code in service_codes:
+        product_family, required = INDEXED_PRODUCTS[service_code]
+        for product, records in store.iter_products(service_code):
+            attributes = product["attributes"]
+            if product["productFamily"] != product_family:
+                continue
+            if any(attributes.get(name) != value for name, value in required.items()):
+                continue
+            on_demand = [r for r in records if r.term_type == "OnDemand"]
+            if not on_demand or not on_demand[0].usd:
+                continue
+            instance_type = attributes.get("instanceType", "")
+            offers.append(InstanceOffer(
+                service_code,
+                instance_type,
+                instance_family(instance_type),
+                attributes.get("instanceFamily", ""),
+                attributes.get("regionCode") or REGION_CODE_MAP.get(attributes.get("location"), ""),
+                attributes.get("location", ""),
+                int(_parse_number(attributes.get("vcpu"))),
+                _parse_number(attributes.get("memory")),
+                parse_network_gbps(attributes.get("networkPerformance")),
+                attributes.get("databaseEngine", ""),
+                on_demand[0].usd,
+                product["sku"],
+                attributes.get("licenseModel", ""),
+                attributes.get("databaseEdition", ""),
+            ))
+    return offers
+
+
+def _matches(value, wanted):
+    return wanted is None or value.lower() == wanted.lower()
+
+
+class InstanceIndex:
+    """EC2 and RDS instance offers by (service, region), each list sorted by hourly price.
+
+    A search walks the cheapest offers of the requested regions in merged price
+    order and stops at the k-th match, so top-k queries touch few offers.
+    """
+
+    def __init__(self, offers):
+        self._offers = {}  # (service code, region code) -> [InstanceOffer] by price
+        for offer in offers:
+            self._offers.setdefault((offer.service_code, offer.region_code), []).append(offer)
+        for region_offers in self._offers.values():
+            region_offers.sort(key=lambda o: (o.hourly_usd, o.instance_type))
+        # (service code, region code, instance type, engine) -> [InstanceOffer]; RDS
+        # engines such as SQL Server have one product per license model and edition
+        self._by_type = {}
+        for region_offers in self._offers.values():
+            for o in region_offers:
+                key = (o.service_code, o.region_code, o.instance_type, o.database_engine.lower())
+                self._by_type.setdefault(key, []).append(o)
+
+    @classmethod
+    def from_price_store(cls, store, service_codes=tuple(INDEXED_PRODUCTS)):
+        return cls(offers_from_price_store(store, service_codes))
+
+    def __len__(self):
+        return sum(len(region_offers) for region_offers in self._offers.values())
+
+    def regions(self, service_code):
+        return sorted(region for code, region in self._offers if code == service_code)
+
+    def lookup(self, service_code, region, instance_type, database_engine="", license_model=None,
+               database_edition=None):
+        """The offer for an instance type, or None.
+
+        license_model and database_edition narrow the match; they are required
+        when the engine has more than one product for the instance type.
+        """
+        region_code = resolve_region(region)[1]
+        offers = [
+            o for o in self._by_type.get((service_code, region_code, instance_type, database_engine.lower()), ())
+            if _matches(o.license_model, license_model) and _matches(o.database_edition, database_edition)
+        ]
+        if len(offers) > 1:
+            choices = ", ".join(sorted(f"{o.license_model or '-'} / {o.database_edition or '-'}" for o in offers))
+            raise ValueError(
+                f"Instance '{instance_type}' in '{region}' has several products ({choices}); "
+                "set licenseModel and databaseEdition."
+            )
+        return offers[0] if offers else None
+
+    def search(self, service_code, min_vcpu=0, min_memory_gib=0.0, min_network_gbps=0.0, regions=None,
+               families=None, database_engine=None, max_hourly_usd=None, k=5, license_model=None,
+               database_edition=None):
+        if service_code not in INDEXED_PRODUCTS:
+            raise ValueError(f"Rightsizing does not support '{service_code}'.")
+        region_codes = (
+            [resolve_region(r)[1] for r in regions] if regions is not None else self.regions(service_code)
+        )
+        families = set(families) if families else None
+        engine = database_engine.lower() if database_engine else None
+
+        matches = []
+        candidates = heapq.merge(
+            *(self._offers.get((service_code, r), ()) for r in region_codes),
+            key=lambda o: (o.hourly_usd, o.instance_type),
+        )
+        for offer in candidates:
+            if max_hourly_usd is not None and offer.hourly_usd > max_hourly_usd:
+                break
+            if (offer.vcpu >= min_vcpu and offer.memory_gib >= min_memory_gib
+                    and offer.network_gbps >= min_network_gbps
+                    and (families is None or offer.family in families)
+                    and (engine is None or offer.database_engine.lower() == engine)
+                    and _matches(offer.license_model, license_model)
+                    and _matches(offer.database_edition, database_edition)):
+                matches.append(offer)
+                if len(matches) >= k:
+                    break
+        return matches
+
+
+def create_instance_index(paths_or_directory):
+    if isinstance(paths_or_directory, OfflinePriceStore):
+        return InstanceIndex.from_price_store(paths_or_directory)
+    if isinstance(paths_or_directory, str) and paths_or_directory.endswith(".store.json.gz"):
+        return InstanceIndex.from_price_store(OfflinePriceStore.load(paths_or_directory))
+    return InstanceIndex.from_price_store(build_price_store(paths_or_directory))
+
+
+def rightsize_node(node, index, k=3, regions=None):
+    attributes = node["attributes"]
+    is_rds = node["type"] == "AmazonRDS"
+    engine = attributes.get("databaseEngine", "") if is_rds else ""
+    default_type = "t3.micro" if node["type"] == "AmazonEC2" else None
+    current = index.lookup(
+        node["type"], node["region"], attributes.get("instanceType", default_type), engine,
+        attributes.get("licenseModel") if is_rds else None, attributes.get("databaseEdition") if is_rds else None,
+    )
+    if current is None:
+        raise ValueError(f"Instance '{attributes.get('instanceType')}' in '{node['region']}' is not in the index.")
+
+    # Anything at least as big as the current instance, strictly cheaper
+    alternatives = index.search(
+        node["type"],
+        min_vcpu=current.vcpu,
+        min_memory_gib=current.memory_gib,
+        regions=regions if regions is not None else [node["region"]],
+        database_engine=engine or None,
+        max_hourly_usd=current.hourly_usd,
+        k=k + 1,
+        # Alternatives keep the current license model and edition
+        license_model=current.license_model,
+        database_edition=current.database_edition,
+    )
+    alternatives = [o for o in alternatives if o is not current and o.hourly_usd < current.hourly_usd][:k]
+    return {
+        "current": current.to_dict(),
+        "alternatives": [
+            dict(o.to_dict(), monthly_savings_usd=round(current.monthly_usd - o.monthly_usd, 4))
+            for o in alternatives
+        ],
+    }
+
+
+def annotate_architecture(architecture_json, index, k=3, regions=None):
+    # Returns a copy with a "rightsizing" entry on every EC2 and RDS node
+    annotated = copy.deepcopy(architecture_json)
+    for node in annotated["nodes"]:
+        if node["type"] not in INDEXED_PRODUCTS:
+            continue
+        try:
+            node["rightsizing"] = rightsize_node(node, index, k, regions)
+        except (KeyError, ValueError) as e:
+            node["rightsizing"] = {"error": str(e)}
+    return annotated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find the cheapest instances that meet a size requirement.")
+    parser.add_argument("prices", help="Price store (.store.json.gz), offer file or directory of offer files")
+    parser.add_argument("--service", choices=sorted(INDEXED_PRODUCTS), default="AmazonEC2")
+    parser.add_argument("--vcpu", type=int, default=0, help="Minimum vCPUs")
+    parser.add_argument("--memory", type=float, default=0.0, help="Minimum memory in GiB")
+    parser.add_argument("--network", type=float, default=0.0, help="Minimum network performance in Gbit/s")
+    parser.add_argument("--regions", nargs="+", default=None, help="Region codes or location names (default: all)")
+    parser.add_argument("--families", nargs="+", default=None, help="Instance families, e.g. m5 c5")
+    parser.add_argument("--engine", default=None, help="Database engine (RDS only)")
+    parser.add_argument("--license-model", default=None, help="License model (RDS only)")
+    parser.add_argument("--edition", default=None, help="Database edition (RDS only)")
+    parser.add_argument("-k", type=int, default=5, help="Number of candidates")
+    parser.add_argument("--architecture", default=None, help="Annotate this architecture JSON instead")
+    args = parser.parse_args(argv)
+
+    index = create_instance_index(args.prices)
+    if args.architecture:
+        with open(args.architecture, encoding="utf-8") as f:
+            result = annotate_architecture(json.load(f), index, args.k, args.regions)
+    else:
+        result = [
+            o.to_dict() for o in index.search(
+                args.service, args.vcpu, args.memory, args.network, args.regions, args.families, args.engine,
+                k=args.k, license_model=args.license_model, database_edition=args.edition,
+            )
+        ]
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import argparse
+import json
+import sys
+
+from aws_cost_estimation import (
+    DEFAULT_MAX_WORKERS,
+    NODE_ESTIMATORS,
+    SharedPricingClient,
+    fetch_unique_queries,
+    node_config_key,
+    plan_node_queries,
+    price_planned_configs,
+)
+from offline_pricing import add_offline_argument, client_from_args
+
+DEFAULT_READ_SIZE = 1 << 20
+# Largest single node, edge or top-level field; a malformed value is reported
+# once this much is buffered rather than after reading to the end of the file
+DEFAULT_MAX_VALUE_SIZE = 16 << 20
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+_decoder = json.JSONDecoder()
+
+
+class _Scanner:
+    # Incremental reader over a text stream: values are decoded with
+    # raw_decode from a buffer that is refilled whenever a value runs past it
+    def __init__(self, stream, read_size, max_value_size=DEFAULT_MAX_VALUE_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.max_value_size = max_value_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.stream.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer stays about one read long
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found '{found or 'end of file'}' in architecture JSON.")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if len(self.buffer) - self.pos > self.max_value_size:
+                    raise ValueError(
+                        f"Malformed architecture JSON, or a value larger than {self.max_value_size} characters: {e.msg}."
+                    ) from None
+                if self._fill():
+                    continue
+                raise ValueError(f"Malformed or truncated architecture JSON: {e.msg}.") from None
+            # A number that reaches the end of the buffer, possibly followed by
+            # a partial fraction or exponent, may continue in the next read
+            if (isinstance(value, (int, float)) and not self.eof
+                    and not self.buffer[end:].strip(_NUMBER_CHARS) and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' but found '{separator or 'end of file'}' in architecture JSON.")
+
+
+def iter_architecture(stream, read_size=DEFAULT_READ_SIZE, max_value_size=DEFAULT_MAX_VALUE_SIZE):
+    """Yields ("node", node), ("edge", edge) and (key, value) for the other top-level fields.
+
+    Only one node or edge is decoded at a time, so memory does not grow with
+    the size of the nodes and edges arrays.
+    """
+    scanner = _Scanner(stream, read_size, max_value_size)
+    scanner.expect("{")
+    if scanner.peek() == "}":
+        return
+    while True:
+        key = scanner.value()
+        scanner.expect(":")
+        if key in ("nodes", "edges"):
+            kind = key[:-1]
+            for item in scanner.array():
+                yield kind, item
+        else:
+            yield key, scanner.value()
+        separator = scanner.peek()
+        scanner.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or '}}' but found '{separator or 'end of file'}' in architecture JSON.")
+
+
+def group_architecture(stream, read_size=DEFAULT_READ_SIZE, max_value_size=DEFAULT_MAX_VALUE_SIZE):
+    """Reads an architecture document once and groups its nodes by configuration.
+
+    Returns {"configs": {config key: [first node, count]}, "unpriced": {type: count},
+    "node_count", "edges": {"count", "dataTransferGB"}, "fields"}. Node ids other
+    than the first of each configuration are not kept.
+    """
+    configs = {}
+    unpriced = {}
+    fields = {}
+    node_count = 0
+    edge_count = 0
+    edge_gb = 0.0
+    for kind, item in iter_architecture(stream, read_size, max_value_size):
+        if kind == "node":
+            node_count += 1
+            if item['type'] not in NODE_ESTIMATORS:
+                unpriced[item['type']] = unpriced.get(item['type'], 0) + 1
+                continue
+            config = node_config_key(item)
+            group = configs.get(config)
+            if group is None:
+                configs[config] = [item, 1]
+            else:
+                group[1] += 1
+        elif kind == "edge":
+            edge_count += 1
+            edge_gb += float(item.get("attributes", {}).get("dataTransferGB", 0.0))
+        else:
+            fields[kind] = item
+    return {
+        "configs": configs,
+        "unpriced": unpriced,
+        "node_count": node_count,
+        "edges": {"count": edge_count, "dataTransferGB": round(edge_gb, 4)},
+        "fields": fields,
+    }
+
+
+def estimate_grouped(grouped, pricing_client=None, max_workers=DEFAULT_MAX_WORKERS):
+    # Prices each distinct configuration once and scales it by its node count
+    if pricing_client is None:
+        pricing_client = SharedPricingClient()
+    nodes = [node for node, _ in grouped["configs"].values()]
+    counts = {node['id']: count for node, count in grouped["configs"].values()}
+    configs, unique_queries, plan_errors = plan_node_queries(nodes)
+    records_by_key = fetch_unique_queries(pricing_client, unique_queries, max_workers)
+    costs_by_id, price_errors = price_planned_configs(configs, records_by_key)
+
+    priced = []
+    service_totals = {}
+    for node in nodes:
+        costs = costs_by_id.get(node['id'])
+        if costs is None:
+            continue
+        count = counts[node['id']]
+        total = round(costs[NODE_ESTIMATORS[node['type']][2]] * count, 4)
+        priced.append({
+            "type": node['type'],
+            "region": node.get('region'),
+            "attributes": node.get('attributes', {}),
+            "count": count,
+            "example_node_id": node['id'],
+            "unit_costs": costs,
+            "total_monthly_usd": total,
+        })
+        service_totals[node['type']] = round(service_totals.get(node['type'], 0.0) + total, 4)
+
+    errors = {
+        node_id: {"error": str(e), "count": counts[node_id]}
+        for node_id, e in {**plan_errors, **price_errors}.items()
+    }
+    return {
+        "configs": priced,
+        "services": service_totals,
+        "total_monthly_usd": round(sum(service_totals.values()), 4),
+        "errors": errors,
+        "unpriced": grouped["unpriced"],
+        "node_count": grouped["node_count"],
+        "config_count": len(grouped["configs"]),
+        "edges": grouped["edges"],
+        "query_count": len(unique_queries),
+    }
+
+
+def estimate_architecture_file(path, pricing_client=None, max_workers=DEFAULT_MAX_WORKERS,
+                               read_size=DEFAULT_READ_SIZE, max_value_size=DEFAULT_MAX_VALUE_SIZE):
+    """estimate_architecture for a document too large to json.load, priced per distinct configuration.
+
+    Edges are only counted; data transfer along them is not priced here.
+    """
+    with open(path, encoding="utf-8") as f:
+        grouped = group_architecture(f, read_size, max_value_size)
+    return estimate_grouped(grouped, pricing_client, max_workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate a very large architecture JSON without loading it whole.")
+    parser.add_argument("architecture", help="Architecture JSON ('-' for stdin)")
+    add_offline_argument(parser)
+    parser.add_argument("--summary", action="store_true", help="Leave out the per-configuration breakdown")
+    args = parser.parse_args(argv)
+
+    pricing_client = client_from_args(args.offline)
+    if args.architecture == "-":
+        result = estimate_grouped(group_architecture(sys.stdin), pricing_client)
+    else:
+        result = estimate_architecture_file(args.architecture, pricing_client)
+    if args.summary:
+        result.pop("configs")
+    print(json.dumps(result, indent=2))
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules live flat at the repository root
+sys.path.insert(0, ROOT)
+
+FIXTURES_DIR = os.path.join(ROOT, "fixtures")
+OFFERS_DIR = os.path.join(FIXTURES_DIR, "offers")
+ARCHITECTURE_PATH = os.path.join(ROOT, "aws_archtecture.json")
+
+
+@pytest.fixture(scope="session")
+def offers_dir():
+    return OFFERS_DIR
+
+
+@pytest.fixture(scope="session")
+def csv_offer_path():
+    return os.path.join(FIXTURES_DIR, "csv", "AmazonRDS.csv")
+
+
+@pytest.fixture
+def architecture():
+    import json
+
+    with open(ARCHITECTURE_PATH, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+import aws_cost_estimation
+import async_pricing
+from async_pricing import AsyncPricingClient, TokenBucket
+from fake_pricing import FakePricingClient, ThrottlingError
+
+FILTERS = [
+    {"Type": "TERM_MATCH", "Field": "instanceType", "Value": "db.t3.micro"},
+    {"Type": "TERM_MATCH", "Field": "databaseEngine", "Value": "PostgreSQL"},
+    {"Type": "TERM_MATCH", "Field": "regionCode", "Value": "ap-south-1"},
+    {"Type": "TERM_MATCH", "Field": "termType", "Value": "OnDemand"},
+]
+
+
+@pytest.fixture(scope="module")
+def fake():
+    return FakePricingClient()
+
+
+class FlakyClient:
+    # Throttles the first `failures` calls, then answers from the fake
+    def __init__(self, client, failures, error=ThrottlingError):
+        self.client = client
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def get_products(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error()
+        return self.client.get_products(**kwargs)
+
+
+def fast_client(client, **kwargs):
+    return AsyncPricingClient(client, rate_limiter=TokenBucket(1000, 1000), base_delay=0.001, max_delay=0.01,
+                              **kwargs)
+
+
+def test_token_bucket_paces_after_burst():
+    async def acquire_all(bucket, n):
+        started_at = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - started_at
+
+    # The burst is free, then one token every 1/rate seconds
+    assert asyncio.run(acquire_all(TokenBucket(rate_per_second=20, burst=5), 5)) < 0.05
+    assert asyncio.run(acquire_all(TokenBucket(rate_per_second=50, burst=1), 6)) >= 0.09
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate_per_second=0)
+
+
+def test_retries_throttling_then_succeeds(fake):
+    flaky = FlakyClient(fake, failures=2)
+    client = fast_client(flaky, max_retries=3)
+    response = asyncio.run(client.get_products(ServiceCode="AmazonRDS", Filters=FILTERS))
+    assert len(response["PriceList"]) == 1
+    assert flaky.calls == 3
+    assert client.retries == 2
+
+
+def test_gives_up_after_max_retries():
+    throttled = FakePricingClient(throttle_rate=1.0)
+    client = fast_client(throttled, max_retries=3)
+    with pytest.raises(ThrottlingError):
+        asyncio.run(client.get_products(ServiceCode="AmazonRDS", Filters=FILTERS))
+    assert throttled.calls == 4
+    assert client.retries == 3
+
+
+def test_other_errors_are_not_retried(fake):
+    flaky = FlakyClient(fake, failures=1, error=RuntimeError)
+    client = fast_client(flaky, max_retries=3)
+    with pytest.raises(RuntimeError):
+        asyncio.run(client.get_products(ServiceCode="AmazonRDS", Filters=FILTERS))
+    assert flaky.calls == 1
+
+
+def test_identical_in_flight_calls_are_coalesced():
+    slow = FakePricingClient(latency_seconds=0.05)
+    client = fast_client(slow)
+
+    async def run():
+        return await asyncio.gather(*(
+            client.get_products(ServiceCode="AmazonRDS", Filters=FILTERS) for _ in range(10)
+        ))
+
+    responses = asyncio.run(run())
+    assert slow.calls == 1
+    assert all(response == responses[0] for response in responses)
+
+    # Once the shared call finished, the next one goes upstream again
+    asyncio.run(client.get_products(ServiceCode="AmazonRDS", Filters=FILTERS))
+    assert slow.calls == 2
+
+
+@pytest.mark.parametrize("name", ["rds", "ec2", "lambda", "s3"])
+def test_async_estimators_match_sync(fake, architecture, name):
+    sync_estimate = getattr(aws_cost_estimation, f"get_{name}_cost_estimate")
+    async_estimate = getattr(async_pricing, f"get_{name}_cost_estimate_async")
+    client = fast_client(fake)
+    assert asyncio.run(async_estimate(client, architecture)) == sync_estimate(fake, architecture)
+
+
+def test_async_estimator_raises_like_sync(fake):
+    client = fast_client(fake)
+    with pytest.raises(ValueError, match="No AmazonRDS node"):
+        asyncio.run(async_pricing.get_rds_cost_estimate_async(client, {"nodes": []}))
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from aws_cost_estimation import estimate_architecture, resolve_region, resolve_regions
+from fake_pricing import FakePricingClient
+from offline_pricing import build_price_store
+
+
+def test_resolve_region_accepts_codes_and_locations():
+    assert resolve_region("ap-south-1") == ("Asia Pacific (Mumbai)", "ap-south-1")
+    assert resolve_region("Asia Pacific (Mumbai)") == ("Asia Pacific (Mumbai)", "ap-south-1")
+    assert resolve_regions(["us-east-1"]) == [("US East (N. Virginia)", "us-east-1")]
+    with pytest.raises(ValueError, match="not mapped"):
+        resolve_region("mars-north-1")
+
+
+def test_estimate_architecture_fixture_totals(architecture):
+    result = estimate_architecture(architecture, FakePricingClient(), max_workers=1)
+    assert result["services"] == {"AmazonRDS": 39.38, "AmazonEC2": 9.544, "AWSLambda": 3.8833, "AmazonS3": 2.57}
+    assert result["total_monthly_usd"] == 55.3773
+    assert result["unpriced"] == ["cloudfrontCDN", "iamRole"]
+
+
+class LiveShapedClient:
+    """Answers like the live get_products: every term of each matched product, in the given order."""
+
+    def __init__(self, offers_dir, first_offer_term_code):
+        self.store = build_price_store(offers_dir)
+        self.first_offer_term_code = first_offer_term_code
+
+    def get_products(self, ServiceCode, Filters, MaxResults=1, **kwargs):
+        skus, _ = self.store.find_skus(ServiceCode, Filters)
+        price_list = []
+        for sku in skus[:MaxResults]:
+            item = json.loads(self.store.price_list_item(ServiceCode, sku))
+            terms = {}
+            for term_type in ("Reserved", "OnDemand"):
+                offers = item["terms"].get(term_type, {})
+                # The chosen Reserved offer first, with its upfront fee listed before the hourly rate
+                ordered = sorted(offers.items(), key=lambda o: o[1]["offerTermCode"] != self.first_offer_term_code)
+                terms[term_type] = {
+                    code: dict(offer, priceDimensions=dict(reversed(list(offer["priceDimensions"].items()))))
+                    for code, offer in ordered
+                }
+            item["terms"] = terms
+            price_list.append(json.dumps(item))
+        return {"PriceList": price_list}
+
+
+def test_instances_are_priced_from_the_hourly_rate_of_the_nodes_term_type(offers_dir, architecture):
+    client = LiveShapedClient(offers_dir, "HU7G6KETJZ")  # 1yr Partial Upfront: 87 USD + 0.0108/h
+    on_demand = estimate_architecture(architecture, client)
+    assert on_demand["nodes"]["database"]["rds_instance_monthly_usd"] == 26.28
+    assert on_demand["nodes"]["webAppServer"]["ec2_instance_monthly_usd"] == 8.176
+
+    for node in architecture["nodes"]:
+        if node["type"] in ("AmazonRDS", "AmazonEC2"):
+            node["attributes"]["termType"] = "Reserved"
+    reserved = estimate_architecture(architecture, client)
+    assert reserved["nodes"]["database"]["rds_instance_monthly_usd"] == pytest.approx(0.0108 * 730)
+    assert reserved["nodes"]["webAppServer"]["ec2_instance_monthly_usd"] == pytest.approx(0.00336 * 730)
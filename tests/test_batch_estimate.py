@@ -0,0 +1,17 @@
+import io
+import json
+
+from batch_estimate import run_batch
+
+
+def test_offline_batch_does_not_touch_the_price_cache(tmp_path, offers_dir, architecture):
+    cache_path = tmp_path / "prices.sqlite3"
+    stream = io.StringIO("".join(json.dumps({"id": f"a{i}", "architecture": architecture}) + "\n" for i in range(3)))
+    output = io.StringIO()
+    stats = run_batch(stream, output, workers=1, cache_path=str(cache_path), offline_source=offers_dir,
+                      report=io.StringIO())
+
+    assert stats["records"] == 3 and stats["errors"] == 0
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r["estimate"]["total_monthly_usd"] for r in records] == [55.3773] * 3
+    assert not cache_path.exists()
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from aws_cost_estimation import estimate_architecture
+from cross_region import compare_regions, main
+from fake_pricing import FakePricingClient
+
+
+def test_region_totals_match_the_estimators(architecture):
+    client = FakePricingClient()
+    result = compare_regions(architecture, client, regions=["ap-south-1", "us-east-1"])
+    totals = {entry["region_code"]: entry["total_monthly_usd"] for entry in result["regions"]}
+    assert totals == {"us-east-1": 39.6853, "ap-south-1": 55.3773}
+
+    expected = estimate_architecture(architecture, client)
+    mumbai = next(entry for entry in result["regions"] if entry["region_code"] == "ap-south-1")
+    for node_id, cost in mumbai["nodes"].items():
+        node = expected["nodes"][node_id]
+        assert cost == pytest.approx(next(v for k, v in node.items() if k.endswith("_total_monthly_usd")))
+
+
+def test_rds_node_without_storage_is_missing_not_free(architecture):
+    for node in architecture["nodes"]:
+        if node["type"] == "AmazonRDS":
+            del node["attributes"]["storageGB"]
+    result = compare_regions(architecture, FakePricingClient(), regions=["ap-south-1"])
+    entry = result["regions"][0]
+    assert entry["total_monthly_usd"] is None
+    assert "database" in entry["missing"]
+
+
+def test_main_prices_offline(architecture, offers_dir, tmp_path, capsys):
+    path = tmp_path / "architecture.json"
+    path.write_text(json.dumps(architecture), encoding="utf-8")
+    assert main([str(path), "--regions", "ap-south-1", "--offline", offers_dir]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["regions"][0]["total_monthly_usd"] == 55.3773
@@ -0,0 +1,76 @@
+import pytest
+
+from data_transfer import FREE, INTER_REGION, INTERNET, INTRA_REGION, EdgeIndex, estimate_data_transfer
+from fake_pricing import FakePricingClient
+
+MUMBAI = "Asia Pacific (Mumbai)"
+US_EAST = "US East (N. Virginia)"
+
+
+def _node(node_id, region, node_type="AmazonEC2", **attributes):
+    return {"id": node_id, "type": node_type, "region": region, "attributes": attributes}
+
+
+def _edge(source, target, gb, **attributes):
+    return {"from": source, "to": target, "attributes": dict(attributes, dataTransferGB=gb)}
+
+
+@pytest.fixture
+def graph():
+    return {
+        "nodes": [
+            _node("a", MUMBAI, availabilityZone="aps1-az1"),
+            _node("b", MUMBAI, availabilityZone="aps1-az2"),
+            _node("c", MUMBAI, availabilityZone="aps1-az1"),
+            _node("u", US_EAST),
+            _node("cdn", "Global", "AmazonCloudFront", dataOutGB=100),
+            _node("internet", "Global", "Internet"),
+        ],
+        "edges": [
+            _edge("a", "b", 100),  # cross-AZ
+            _edge("a", "c", 50),  # same AZ
+            _edge("c", "a", 20, crossAZ=True),  # cross-AZ by declaration
+            _edge("a", "u", 10),  # inter-region, Mumbai -> US East
+            _edge("u", "a", 10),  # inter-region, the cheaper direction
+            _edge("a", "internet", 8000),
+            _edge("b", "internet", 4000),
+            _edge("cdn", "a", 100),  # from a global node
+            _edge("a", "cdn", 100),  # origin fetch
+            _edge("a", "b", 0),
+            _edge("a", "ghost", 5),
+        ],
+    }
+
+
+def test_edges_are_classified(graph):
+    index = EdgeIndex(graph)
+    assert list(index.classify()) == [
+        INTRA_REGION, FREE, INTRA_REGION, INTER_REGION, INTER_REGION, INTERNET, INTERNET, FREE, FREE, FREE,
+    ]
+    assert index.errors == {"edge 10": "Edge a -> ghost references an unknown node."}
+    assert index.neighbours("a") == ["b", "c", "u", "internet", "cdn", "b"]
+
+
+def test_route_costs_are_tiered_on_total_volume_and_shared_by_volume(graph):
+    result = estimate_data_transfer(graph, FakePricingClient())
+
+    # 12000 GB out of Mumbai: 10240 GB at 0.1093, then 1760 GB at 0.085
+    internet = 10240 * 0.1093 + 1760 * 0.085
+    routes = {(row["transferType"], row["from"], row["to"]): row for row in result["routes"]}
+    assert routes["AWS Outbound", MUMBAI, "External"]["monthly_usd"] == pytest.approx(internet)
+    assert routes["AWS Outbound", MUMBAI, "External"]["gb"] == 12000
+    assert routes["IntraRegion", MUMBAI, MUMBAI]["monthly_usd"] == pytest.approx(1.2)
+    assert routes["InterRegion Outbound", MUMBAI, US_EAST]["monthly_usd"] == pytest.approx(0.86)
+    assert routes["InterRegion Outbound", US_EAST, MUMBAI]["monthly_usd"] == pytest.approx(0.2)
+    assert routes["CloudFront Outbound", "United States", "External"]["monthly_usd"] == 8.5
+
+    assert result["nodes"] == pytest.approx({
+        "a": 1.0 + 0.86 + internet * 8000 / 12000,
+        "b": internet * 4000 / 12000,
+        "c": 0.2,
+        "u": 0.2,
+        "cdn": 8.5,
+    }, abs=1e-4)
+    assert result["total_monthly_usd"] == pytest.approx(internet + 1.2 + 0.86 + 0.2 + 8.5, abs=1e-4)
+    assert result["edges"] == 6  # priced edges
+    assert set(result["errors"]) == {"edge 10"}
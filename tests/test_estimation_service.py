@@ -0,0 +1,110 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from estimation_service import CoalescingPricingClient, create_server, create_service_client
+from fake_pricing import FakePricingClient
+
+
+@pytest.fixture
+def server():
+    server = create_server(port=0, pricing_client=create_service_client(FakePricingClient(), cache_path=None),
+                           quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.pricing_client.close()
+
+
+def post(server, path, body, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        connection.request("POST", path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_estimate(server, architecture):
+    status, body = post(server, "/estimate", json.dumps(architecture))
+    assert status == 200
+    assert body["total_monthly_usd"] == 55.3773
+
+
+def test_non_integer_content_length_is_rejected(server):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        connection.putrequest("POST", "/estimate")
+        connection.putheader("Content-Length", "ten")
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "Content-Length" in json.loads(response.read())["error"]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("nodes", [
+    [{"id": "web", "region": "US East (N. Virginia)", "attributes": {}}],
+    ["web"],
+    [{"id": "web", "type": "AmazonEC2", "attributes": []}],
+])
+def test_malformed_node_is_a_bad_request(server, nodes):
+    status, body = post(server, "/estimate", json.dumps({"nodes": nodes}))
+    assert status == 400
+    assert body["error"].startswith("Invalid architecture")
+
+
+def test_concurrent_identical_misses_make_one_upstream_call():
+    backend = FakePricingClient(latency_seconds=0.2)
+    coalescing = CoalescingPricingClient(backend)
+    filters = [
+        {"Type": "TERM_MATCH", "Field": "instanceType", "Value": "t3.micro"},
+        {"Type": "TERM_MATCH", "Field": "location", "Value": "Asia Pacific (Mumbai)"},
+        {"Type": "TERM_MATCH", "Field": "termType", "Value": "OnDemand"},
+    ]
+    start = threading.Barrier(8)
+    results = []
+
+    def fetch():
+        start.wait()
+        results.append(coalescing.get_price_records("AmazonEC2", filters))
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.calls == 1
+    assert (coalescing.calls, coalescing.coalesced) == (1, 7)
+    assert len({id(records) for records in results}) == 1
+
+
+def test_batch_streams_jsonl_in_input_order(server, architecture):
+    lines = [
+        json.dumps({"id": "first", "architecture": architecture}),
+        "{not json",
+        "",
+        json.dumps(dict(architecture, title="second")),
+    ]
+    body = ("\n".join(lines) + "\n").encode("utf-8")
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        connection.request("POST", "/estimate/batch", body=body)
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader("Transfer-Encoding") == "chunked"
+        records = [json.loads(line) for line in response.read().decode("utf-8").splitlines()]
+    finally:
+        connection.close()
+
+    assert [record["line"] for record in records] == [1, 2, 4]
+    assert [record.get("id") for record in records] == ["first", None, "second"]
+    assert "error" in records[1] and "estimate" not in records[1]
+    assert [records[i]["estimate"]["total_monthly_usd"] for i in (0, 2)] == [55.3773, 55.3773]
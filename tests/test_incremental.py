@@ -0,0 +1,109 @@
+import copy
+
+from fake_pricing import FakePricingClient
+from incremental import IncrementalEstimator
+
+
+def test_unchanged_architecture_costs_no_queries(architecture):
+    estimator = IncrementalEstimator(FakePricingClient(), max_workers=1)
+    first = estimator.update(architecture)
+    assert first["total_monthly_usd"] == 55.3773
+    second = estimator.update(architecture)
+    assert second["changed"] == [] and second["query_count"] == 0
+    assert second["total_monthly_usd"] == 55.3773
+
+
+def test_edit_and_remove(architecture):
+    estimator = IncrementalEstimator(FakePricingClient(), max_workers=1)
+    estimator.update(architecture)
+    edited = copy.deepcopy(architecture)
+    edited["nodes"] = [node for node in edited["nodes"] if node["id"] != "storageBucket"]
+    result = estimator.update(edited)
+    assert result["removed"] == ["storageBucket"]
+    assert result["total_monthly_usd"] == round(55.3773 - 2.57, 4)
+
+
+def test_failed_nodes_are_retried(architecture):
+    fake = FakePricingClient(throttle_rate=1.0)
+    estimator = IncrementalEstimator(fake, max_workers=1)
+    failed = estimator.update(architecture)
+    assert len(failed["errors"]) == 4
+    assert failed["total_monthly_usd"] == 0
+
+    fake.throttle_rate = 0.0
+    retried = estimator.update(architecture)
+    assert retried["errors"] == {}
+    assert retried["query_count"] > 0
+    assert retried["total_monthly_usd"] == 55.3773
+
+
+def test_failed_node_removed_clears_its_error(architecture):
+    fake = FakePricingClient(throttle_rate=1.0)
+    estimator = IncrementalEstimator(fake, max_workers=1)
+    estimator.update(architecture)
+    result = estimator.update({"nodes": []})
+    assert sorted(result["removed"]) == ["database", "lambdaFunction", "storageBucket", "webAppServer"]
+    assert result["errors"] == {}
+
+
+def _resized(architecture, storage_gb):
+    edited = copy.deepcopy(architecture)
+    for node in edited["nodes"]:
+        if node["type"] == "AmazonS3":
+            node["attributes"]["storageGB"] = storage_gb
+    return edited
+
+
+def _retyped(architecture, instance_type):
+    edited = copy.deepcopy(architecture)
+    for node in edited["nodes"]:
+        if node["type"] == "AmazonEC2":
+            node["attributes"]["instanceType"] = instance_type
+    return edited
+
+
+def test_remembered_costs_and_records_are_bounded(architecture):
+    estimator = IncrementalEstimator(FakePricingClient(), max_workers=1, max_cached_configs=5, max_cached_queries=9)
+    estimator.update(architecture)
+    for storage_gb in range(1, 20):
+        estimator.update(_resized(architecture, storage_gb))
+    for instance_type in ("t3.small", "t3.medium", "c5.large", "m5.large", "r5.large"):
+        estimator.update(_retyped(architecture, instance_type))
+    assert len(estimator._costs_by_fingerprint) == 5
+    assert len(estimator._records) == 9
+
+    # Current nodes are still answered from the totals, not the caches
+    result = estimator.update(_retyped(architecture, "r5.large"))
+    assert result["changed"] == [] and result["query_count"] == 0
+
+
+def test_refresh_reprices_every_node(architecture):
+    backend = FakePricingClient()
+    estimator = IncrementalEstimator(backend, max_workers=1)
+    first = estimator.update(architecture)
+    calls = backend.calls
+
+    estimator.refresh()
+    edited = copy.deepcopy(architecture)
+    edited["nodes"] = [node for node in edited["nodes"] if node["id"] != "storageBucket"]
+    result = estimator.update(edited)
+    assert backend.calls > calls
+    assert result["query_count"] == first["query_count"] - 3  # all but the bucket's three queries
+    assert sorted(result["changed"]) == ["database", "lambdaFunction", "webAppServer"]
+    assert result["removed"] == ["storageBucket"]
+    assert result["total_monthly_usd"] == round(55.3773 - 2.57, 4)
+
+
+def test_ttl_expires_remembered_prices(architecture, monkeypatch):
+    import incremental
+
+    now = [1000.0]
+    monkeypatch.setattr(incremental.time, "monotonic", lambda: now[0])
+    estimator = IncrementalEstimator(FakePricingClient(), max_workers=1, ttl_seconds=60)
+    estimator.update(architecture)
+    now[0] += 59
+    assert estimator.update(architecture)["query_count"] == 0
+    now[0] += 1
+    result = estimator.update(architecture)
+    assert result["query_count"] > 0 and len(result["changed"]) == 4
+    assert result["total_monthly_usd"] == 55.3773
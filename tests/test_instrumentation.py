@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+import instrumentation
+from async_pricing import AsyncPricingClient, TokenBucket, get_s3_cost_estimate_async
+from aws_cost_estimation import get_s3_cost_estimate
+from fake_pricing import FakePricingClient, ThrottlingError
+from offline_pricing import OfflinePricingClient
+from price_records import fetch_price_records
+
+FILTERS = [
+    {"Type": "TERM_MATCH", "Field": "instanceType", "Value": "db.t3.micro"},
+    {"Type": "TERM_MATCH", "Field": "regionCode", "Value": "ap-south-1"},
+    {"Type": "TERM_MATCH", "Field": "termType", "Value": "OnDemand"},
+]
+
+
+@pytest.fixture
+def events():
+    received = []
+    instrumentation.add_hook(received.append)
+    yield received
+    instrumentation.remove_hook(received.append)
+
+
+def test_get_products_query_event(events):
+    fake = FakePricingClient()
+    records = fetch_price_records(fake, "AmazonRDS", FILTERS)
+    assert records
+    (event,) = events
+    assert event["kind"] == "query" and event["client"] == "FakePricingClient"
+    assert event["error"] is None
+    assert event["fingerprint"] == instrumentation.query_fingerprint("AmazonRDS", FILTERS)
+    assert event["response_bytes"] > 0
+    assert event["wall_seconds"] >= 0 and event["parse_seconds"] >= 0
+
+
+def test_record_client_query_event(events, offers_dir):
+    from offline_pricing import build_price_store
+
+    fetch_price_records(OfflinePricingClient(build_price_store(offers_dir)), "AmazonRDS", FILTERS)
+    (event,) = events
+    assert event["client"] == "OfflinePricingClient"
+    assert "wall_seconds" in event and "parse_seconds" not in event and "response_bytes" not in event
+
+
+def test_failed_query_event(events):
+    with pytest.raises(ThrottlingError):
+        fetch_price_records(FakePricingClient(throttle_rate=1.0), "AmazonRDS", FILTERS)
+    (event,) = events
+    assert event["error"] == "ThrottlingError"
+    assert "response_bytes" not in event
+
+
+def test_no_events_without_hooks():
+    assert not instrumentation.enabled()
+    assert fetch_price_records(FakePricingClient(), "AmazonRDS", FILTERS)
+
+
+def test_sync_and_async_estimators_emit_the_same_events(events, architecture):
+    fake = FakePricingClient()
+    get_s3_cost_estimate(fake, architecture)
+    client = AsyncPricingClient(fake, rate_limiter=TokenBucket(1000, 1000))
+    asyncio.run(get_s3_cost_estimate_async(client, architecture))
+
+    estimators = [e for e in events if e["kind"] == "estimator"]
+    assert [e["name"] for e in estimators] == ["get_s3_cost_estimate", "get_s3_cost_estimate_async"]
+    queries = [e for e in events if e["kind"] == "query"]
+    assert len(queries) == 6
+    assert {e["client"] for e in queries} == {"FakePricingClient", "AsyncPricingClient"}
+    assert all("parse_seconds" in e for e in queries)
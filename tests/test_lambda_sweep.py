@@ -0,0 +1,59 @@
+import pytest
+
+from aws_cost_estimation import get_lambda_cost_estimate
+from fake_pricing import FakePricingClient
+from lambda_sweep import LAMBDA_MEMORY_SIZES_MB, sweep_lambda_costs
+
+MUMBAI = "Asia Pacific (Mumbai)"
+MEMORY_MB = (128, 512, 1769, 10240)
+DURATIONS_MS = (1, 100, 15000)
+REQUESTS = (0, 500000, 1000000, 3000000, 2e9)
+
+
+@pytest.fixture(scope="module")
+def surface():
+    # Unsorted, repeated axes come back sorted and unique
+    return sweep_lambda_costs(FakePricingClient(), MUMBAI, memory_sizes_mb=(10240, 128, 512, 1769, 512),
+                              durations_ms=(15000, 1, 100), requests_per_month=REQUESTS)
+
+
+def _estimate(memory_mb, duration_ms, requests):
+    node = {"id": "fn", "type": "AWSLambda", "region": MUMBAI, "attributes": {
+        "memorySizeMB": memory_mb, "durationMs": duration_ms, "requestsPerMonth": requests,
+    }}
+    return get_lambda_cost_estimate(FakePricingClient(), {"nodes": [node]})["nodes"]["fn"]
+
+
+def test_grid_shape_and_axes(surface):
+    assert surface.shape == (4, 3, 5)
+    assert list(surface.memory_mb) == list(MEMORY_MB)
+    assert list(surface.duration_ms) == list(DURATIONS_MS)
+    assert len(LAMBDA_MEMORY_SIZES_MB) == 10240 - 128 + 1
+
+
+@pytest.mark.parametrize("memory_mb", MEMORY_MB)
+@pytest.mark.parametrize("duration_ms", DURATIONS_MS)
+@pytest.mark.parametrize("requests", REQUESTS)
+def test_cost_at_matches_the_estimator(surface, memory_mb, duration_ms, requests):
+    assert surface.cost_at(memory_mb, duration_ms, requests) == pytest.approx(
+        _estimate(memory_mb, duration_ms, requests), abs=1e-4
+    )
+
+
+def test_requests_below_the_free_tier_cost_nothing(surface):
+    assert surface.cost_at(128, 100, 500000)["lambda_request_monthly_usd"] == 0.0
+
+
+def test_points_off_the_grid_are_rejected(surface):
+    with pytest.raises(ValueError, match="not on the sweep grid"):
+        surface.cost_at(256, 100, 1000000)
+    with pytest.raises(ValueError, match="not on the sweep grid"):
+        surface.cost_at(128, 100, 4e9)
+
+
+def test_to_dataframe_index(surface):
+    pytest.importorskip("pandas")
+    frame = surface.to_dataframe()
+    assert list(frame.index.names) == ["memorySizeMB", "durationMs", "requestsPerMonth"]
+    assert len(frame) == 4 * 3 * 5
+    assert frame.loc[(1769.0, 100.0, 3000000.0)].to_dict() == pytest.approx(surface.cost_at(1769, 100, 3000000))
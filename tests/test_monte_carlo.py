@@ -0,0 +1,51 @@
+import copy
+
+import pytest
+
+from aws_cost_estimation import estimate_architecture
+from fake_pricing import FakePricingClient
+from monte_carlo import sample_attribute, simulate_architecture
+
+
+@pytest.fixture(scope="module")
+def fake():
+    return FakePricingClient()
+
+
+def test_fixed_usage_matches_deterministic_estimate(fake, architecture):
+    expected = estimate_architecture(architecture, fake, max_workers=1)
+    result = simulate_architecture(architecture, fake, samples=100, seed=1, max_workers=1)
+    assert result["total_monthly_usd"]["mean"] == expected["total_monthly_usd"]
+    for node_id, costs in expected["nodes"].items():
+        total_key = next(key for key in costs if key.endswith("_total_monthly_usd"))
+        assert result["nodes"][node_id]["p50"] == pytest.approx(costs[total_key], abs=1e-3)
+
+
+def test_missing_required_attribute_fails_like_the_estimator(fake, architecture):
+    broken = copy.deepcopy(architecture)
+    rds = next(node for node in broken["nodes"] if node["type"] == "AmazonRDS")
+    del rds["attributes"]["storageGB"]
+    expected = estimate_architecture(broken, fake, max_workers=1)
+    result = simulate_architecture(broken, fake, samples=10, seed=1, max_workers=1)
+    assert result["errors"] == expected["errors"] == {rds["id"]: "'storageGB'"}
+
+
+def test_sampled_usage_is_seeded(fake, architecture):
+    uncertain = copy.deepcopy(architecture)
+    lambda_node = next(node for node in uncertain["nodes"] if node["type"] == "AWSLambda")
+    lambda_node["attributes"]["requestsPerMonth"] = {"distribution": "uniform", "low": 0, "high": 4000000}
+    first = simulate_architecture(uncertain, fake, samples=20000, seed=7, max_workers=1)
+    second = simulate_architecture(uncertain, fake, samples=20000, seed=7, max_workers=1)
+    assert first == second
+    summary = first["nodes"][lambda_node["id"]]
+    assert summary["p50"] < summary["p90"] < summary["p99"]
+
+
+def test_sample_attribute_clips_negative_draws():
+    import numpy as np
+
+    values = sample_attribute({"x": {"distribution": "normal", "mean": 0, "stddev": 1}}, "x", 0,
+                              np.random.default_rng(0), 1000)
+    assert values.min() == 0.0
+    with pytest.raises(ValueError, match="Unknown distribution"):
+        sample_attribute({"x": {"distribution": "poisson"}}, "x", 0, np.random.default_rng(0), 10)
@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+from aws_cost_estimation import estimate_architecture
+from offline_pricing import (
+    OfflinePriceStore,
+    OfflinePricingClient,
+    build_price_store,
+    client_from_args,
+    ingest_offer_file,
+)
+
+
+@pytest.fixture(scope="module")
+def store(offers_dir):
+    return build_price_store(offers_dir)
+
+
+def rds_instance_filters(term_type):
+    return [
+        {"Type": "TERM_MATCH", "Field": "instanceType", "Value": "db.t3.micro"},
+        {"Type": "TERM_MATCH", "Field": "databaseEngine", "Value": "PostgreSQL"},
+        {"Type": "TERM_MATCH", "Field": "regionCode", "Value": "ap-south-1"},
+        {"Type": "TERM_MATCH", "Field": "termType", "Value": term_type},
+    ]
+
+
+def test_json_ingest(store):
+    assert set(store.services()) >= {"AmazonEC2", "AmazonRDS", "AmazonS3", "AWSLambda"}
+    assert store.versions["AmazonRDS"] == "20241001000000"
+    assert store.product_count("AmazonRDS") == 30
+    product = store.product("AmazonRDS", "A022E359B4724158")
+    assert product["productFamily"] == "Database Instance"
+    assert product["attributes"]["instanceType"] == "db.t3.micro"
+
+
+def test_csv_ingest(csv_offer_path):
+    store = OfflinePriceStore()
+    assert ingest_offer_file(store, csv_offer_path) == "AmazonRDS"
+    # Metadata rows ahead of the header
+    assert store.versions["AmazonRDS"] == "20241001000000"
+    assert store.product_count("AmazonRDS") == 2
+
+    product = store.product("AmazonRDS", "CSV0000000000001")
+    assert product["productFamily"] == "Database Instance"
+    attributes = product["attributes"]
+    assert attributes["instanceType"] == "db.t3.micro"
+    assert attributes["databaseEngine"] == "PostgreSQL"
+    assert attributes["regionCode"] == "ap-south-1"
+    assert attributes["locationType"] == "AWS Region"
+    assert attributes["usagetype"] == "APS3-InstanceUsage:db.t3.micro"
+    assert attributes["servicecode"] == "AmazonRDS"
+    assert attributes["vCPU"] == "2"
+    # Empty cells are not attributes; term columns never are
+    assert "volumeType" not in attributes
+    assert "termType" not in attributes and "unit" not in attributes
+
+    on_demand = store.records("AmazonRDS", "CSV0000000000001", "OnDemand")
+    assert [r.usd for r in on_demand] == [0.036]
+    reserved = {r.offer_term_code: r for r in store.records("AmazonRDS", "CSV0000000000001", "Reserved")}
+    assert set(reserved) == {"4NA7Y494T4", "HU7G6KETJZ"}
+    partial = reserved["HU7G6KETJZ"]
+    assert partial.term_attributes == {
+        "LeaseContractLength": "1yr", "PurchaseOption": "Partial Upfront", "OfferingClass": "standard",
+    }
+    assert sorted((d.unit, d.usd) for d in partial.dimensions) == [("Hrs", 0.0108), ("Quantity", 87.0)]
+    assert store.product("AmazonRDS", "CSV0000000000002")["attributes"]["volumeType"] == "General Purpose"
+
+
+def test_csv_and_json_price_the_same(store, csv_offer_path):
+    csv_store = build_price_store([csv_offer_path])
+    skus, term_type = csv_store.find_skus("AmazonRDS", rds_instance_filters("OnDemand"))
+    expected, _ = store.find_skus("AmazonRDS", rds_instance_filters("OnDemand"))
+    assert [r.usd for r in csv_store.records("AmazonRDS", skus[0], term_type)] == \
+        [r.usd for r in store.records("AmazonRDS", expected[0], term_type)]
+
+
+def test_find_skus_filters(store):
+    skus, term_type = store.find_skus("AmazonRDS", rds_instance_filters("OnDemand"))
+    assert term_type == "OnDemand"
+    assert len(skus) == 1
+    attributes = store.product("AmazonRDS", skus[0])["attributes"]
+    assert (attributes["instanceType"], attributes["regionCode"]) == ("db.t3.micro", "ap-south-1")
+
+    # Attribute values match case-insensitively
+    lower = [dict(f, Value=f["Value"].lower()) if f["Field"] != "termType" else f
+             for f in rds_instance_filters("OnDemand")]
+    assert store.find_skus("AmazonRDS", lower)[0] == skus
+
+    assert store.find_skus("AmazonRDS", rds_instance_filters("Reserved"))[0] == skus
+    assert store.find_skus("AmazonRDS", [{"Type": "TERM_MATCH", "Field": "instanceType", "Value": "db.x9.huge"}]) \
+        == ([], None)
+    assert store.find_skus("AmazonDynamoDB", rds_instance_filters("OnDemand")) == ([], None)
+
+
+def test_find_skus_term_type_excludes_products_without_the_term(store):
+    storage = [
+        {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Database Storage"},
+        {"Type": "TERM_MATCH", "Field": "regionCode", "Value": "ap-south-1"},
+    ]
+    skus, _ = store.find_skus("AmazonRDS", storage)
+    assert skus
+    assert store.find_skus("AmazonRDS", storage + [{"Type": "TERM_MATCH", "Field": "termType", "Value": "Reserved"}]) \
+        == ([], "Reserved")
+
+
+def test_get_products_term_type(store):
+    client = OfflinePricingClient(store)
+    response = client.get_products(ServiceCode="AmazonRDS", Filters=rds_instance_filters("OnDemand"))
+    item = json.loads(response["PriceList"][0])
+    assert item["serviceCode"] == "AmazonRDS"
+    assert item["version"] == "20241001000000"
+    assert list(item["terms"]) == ["OnDemand"]
+
+
+def test_get_products_paging(store):
+    client = OfflinePricingClient(store)
+    filters = [{"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Database Instance"}]
+    expected, _ = store.find_skus("AmazonRDS", filters)
+    assert len(expected) > 5
+
+    skus = []
+    token = None
+    pages = 0
+    while True:
+        kwargs = {"NextToken": token} if token else {}
+        response = client.get_products(ServiceCode="AmazonRDS", Filters=filters, MaxResults=2, **kwargs)
+        pages += 1
+        assert len(response["PriceList"]) <= 2
+        skus.extend(json.loads(item)["product"]["sku"] for item in response["PriceList"])
+        token = response.get("NextToken")
+        if token is None:
+            break
+    assert skus == expected
+    assert pages == (len(expected) + 1) // 2
+
+
+def test_get_price_records_max_results(store):
+    client = OfflinePricingClient(store)
+    filters = [{"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Database Instance"},
+               {"Type": "TERM_MATCH", "Field": "termType", "Value": "OnDemand"}]
+    records = client.get_price_records(ServiceCode="AmazonRDS", Filters=filters, MaxResults=3)
+    assert len({r.sku for r in records}) == 3
+    assert {r.term_type for r in records} == {"OnDemand"}
+
+
+def test_save_load_round_trip(store, tmp_path, architecture):
+    path = str(tmp_path / "prices.store.json.gz")
+    store.save(path)
+    loaded = OfflinePriceStore.load(path)
+
+    assert loaded.versions == store.versions
+    for service_code in store.services():
+        assert loaded.product_count(service_code) == store.product_count(service_code)
+        for product, records in store.iter_products(service_code):
+            assert loaded.product(service_code, product["sku"]) == product
+            assert [r.to_list() for r in loaded.records(service_code, product["sku"])] == \
+                [r.to_list() for r in records]
+
+    expected = estimate_architecture(architecture, OfflinePricingClient(store), max_workers=1)
+    result = estimate_architecture(architecture, OfflinePricingClient(loaded), max_workers=1)
+    assert result["total_monthly_usd"] == expected["total_monthly_usd"] == 55.3773
+
+
+def test_client_from_args(offers_dir):
+    assert client_from_args(None) is None
+    assert isinstance(client_from_args(offers_dir), OfflinePricingClient)
@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+import price_cache
+from fake_pricing import FakePricingClient
+from price_cache import CachedPricingClient
+from price_records import dump_records
+
+RDS_INSTANCE = [
+    {"Type": "TERM_MATCH", "Field": "productFamily", "Value": "Database Instance"},
+    {"Type": "TERM_MATCH", "Field": "instanceType", "Value": "db.t3.micro"},
+    {"Type": "TERM_MATCH", "Field": "databaseEngine", "Value": "postgresql"},
+    {"Type": "TERM_MATCH", "Field": "deploymentOption", "Value": "Single-AZ"},
+    {"Type": "TERM_MATCH", "Field": "regionCode", "Value": "ap-south-1"},
+    {"Type": "TERM_MATCH", "Field": "termType", "Value": "OnDemand"},
+]
+
+
+def region_query(region_code):
+    return [dict(f, Value=region_code) if f["Field"] == "regionCode" else f for f in RDS_INSTANCE]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(price_cache.time, "time", clock)
+    return clock
+
+
+def test_filter_order_and_field_case_share_one_entry():
+    backend = FakePricingClient()
+    cached = CachedPricingClient(backend, db_path=None)
+    first = cached.get_price_records("AmazonRDS", RDS_INSTANCE)
+    reordered = [dict(f, Field=f["Field"].upper()) for f in reversed(RDS_INSTANCE)]
+    assert cached.get_price_records("AmazonRDS", reordered) == first
+    assert (backend.calls, cached.hits, cached.misses) == (1, 1, 1)
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    backend = FakePricingClient()
+    cached = CachedPricingClient(backend, db_path=None, max_entries=2)
+    for region_code in ("ap-south-1", "us-east-1"):
+        cached.get_price_records("AmazonRDS", region_query(region_code))
+    cached.get_price_records("AmazonRDS", region_query("ap-south-1"))  # now most recent
+    cached.get_price_records("AmazonRDS", region_query("eu-west-1"))  # evicts us-east-1
+    assert backend.calls == 3
+
+    cached.get_price_records("AmazonRDS", region_query("ap-south-1"))
+    assert backend.calls == 3
+    cached.get_price_records("AmazonRDS", region_query("us-east-1"))
+    assert backend.calls == 4
+
+
+def test_memory_entries_expire_after_the_ttl(clock):
+    backend = FakePricingClient()
+    cached = CachedPricingClient(backend, db_path=None, ttl_seconds=60)
+    cached.get_price_records("AmazonRDS", RDS_INSTANCE)
+    clock.now += 59
+    cached.get_price_records("AmazonRDS", RDS_INSTANCE)
+    assert backend.calls == 1
+    clock.now += 1
+    cached.get_price_records("AmazonRDS", RDS_INSTANCE)
+    assert backend.calls == 2
+
+
+def test_reopened_cache_starts_warm(tmp_path):
+    db_path = str(tmp_path / "prices.sqlite3")
+    cached = CachedPricingClient(FakePricingClient(), db_path=db_path)
+    records = cached.get_price_records("AmazonRDS", RDS_INSTANCE)
+    cached.close()
+
+    backend = FakePricingClient()
+    reopened = CachedPricingClient(backend, db_path=db_path)
+    assert dump_records(reopened.get_price_records("AmazonRDS", RDS_INSTANCE)) == dump_records(records)
+    assert backend.calls == 0 and reopened.hits == 1
+    reopened.close()
+
+
+def _row_count(db_path):
+    with sqlite3.connect(db_path) as db:
+        return db.execute("SELECT COUNT(*) FROM price_records").fetchone()[0]
+
+
+def test_expired_sqlite_rows_are_refetched_and_replaced(tmp_path, clock):
+    db_path = str(tmp_path / "prices.sqlite3")
+    CachedPricingClient(FakePricingClient(), db_path=db_path, ttl_seconds=60).get_price_records(
+        "AmazonRDS", RDS_INSTANCE)
+
+    clock.now += 60
+    backend = FakePricingClient()
+    reopened = CachedPricingClient(backend, db_path=db_path, ttl_seconds=60)
+    reopened.get_price_records("AmazonRDS", RDS_INSTANCE)
+    assert backend.calls == 1 and reopened.misses == 1
+    assert _row_count(db_path) == 1
+    reopened.close()
+
+
+def test_purge_expired_drops_memory_and_sqlite_entries(tmp_path, clock):
+    db_path = str(tmp_path / "prices.sqlite3")
+    backend = FakePricingClient()
+    cached = CachedPricingClient(backend, db_path=db_path, ttl_seconds=60)
+    cached.get_price_records("AmazonRDS", region_query("ap-south-1"))
+    clock.now += 30
+    cached.get_price_records("AmazonRDS", region_query("us-east-1"))
+    clock.now += 30
+
+    cached.purge_expired()
+    assert _row_count(db_path) == 1
+    cached.get_price_records("AmazonRDS", region_query("us-east-1"))
+    assert backend.calls == 2
+    cached.get_price_records("AmazonRDS", region_query("ap-south-1"))
+    assert backend.calls == 3
+    cached.close()
@@ -0,0 +1,49 @@
+import json
+
+from offline_pricing import build_price_store
+from price_versions import VersionedPriceStore
+
+RDS_INSTANCE_SKU = "A022E359B4724158"
+
+
+def _with_product(offers_dir, service_code, sku, new_sku, **attributes):
+    # The fixture prices plus a copy of one product under a new SKU
+    store = build_price_store(offers_dir)
+    item = json.loads(store.price_list_item(service_code, sku))
+    item["product"] = dict(item["product"], sku=new_sku,
+                           attributes=dict(item["product"]["attributes"], **attributes))
+    for offers in item["terms"].values():
+        for offer in offers.values():
+            offer["sku"] = new_sku
+            for dimension in offer["priceDimensions"].values():
+                dimension["pricePerUnit"]["USD"] = "0.0100000000"
+    store.add_price_item(service_code, item)
+    return store
+
+
+def test_added_sku_matching_a_saved_query_reprices_the_estimate(offers_dir, architecture):
+    versioned = VersionedPriceStore(":memory:")
+    versioned.ingest(build_price_store(offers_dir))
+    versioned.save_estimate("main", architecture)
+
+    # Sorts ahead of the SKU the RDS instance query returned before
+    delta, report = versioned.update(_with_product(offers_dir, "AmazonRDS", RDS_INSTANCE_SKU, "0000000000000001"))
+
+    assert delta["added"] == [("AmazonRDS", "0000000000000001")]
+    assert [entry["estimate_id"] for entry in report] == ["main"]
+    assert report[0]["delta_monthly_usd"] < 0
+    assert list(report[0]["nodes"]) == ["database"]
+    versioned.close()
+
+
+def test_added_sku_matching_no_saved_query_reprices_nothing(offers_dir, architecture):
+    versioned = VersionedPriceStore(":memory:")
+    versioned.ingest(build_price_store(offers_dir))
+    versioned.save_estimate("main", architecture)
+
+    new_store = _with_product(offers_dir, "AmazonRDS", RDS_INSTANCE_SKU, "0000000000000001", instanceType="db.r5.large")
+    delta, report = versioned.update(new_store)
+
+    assert delta["added"] == [("AmazonRDS", "0000000000000001")]
+    assert report == []
+    versioned.close()
@@ -0,0 +1,68 @@
+import pytest
+
+from fake_pricing import FakePricingClient
+from offline_pricing import OfflinePricingClient, build_price_store
+from price_records import PriceDimension, PriceRecord
+from purchase_options import compare_purchase_options, price_purchase_option
+
+INF = float("inf")
+RDS_3YR_NO_UPFRONT = "Reserved 3yr standard No Upfront"
+
+
+def _reserved(lease, purchase_option, *dimensions):
+    return PriceRecord("SKU", "AmazonRDS", "Reserved", "CODE", tuple(dimensions), {},
+                       {"LeaseContractLength": lease, "OfferingClass": "standard", "PurchaseOption": purchase_option})
+
+
+def test_upfront_is_amortised_over_the_lease_and_hourly_is_charged_per_month():
+    record = _reserved("3yr", "Partial Upfront",
+                       PriceDimension(0.0, INF, "Quantity", 530.0), PriceDimension(0.0, INF, "Hrs", 0.0072))
+    option = price_purchase_option(record)
+    assert option["option"] == "Reserved 3yr standard Partial Upfront"
+    assert option["upfront_usd"] == 530.0
+    assert option["effective_monthly_usd"] == pytest.approx(530.0 / 36 + 0.0072 * 730, abs=1e-4)
+
+    all_upfront = price_purchase_option(_reserved("1yr", "All Upfront", PriceDimension(0.0, INF, "Quantity", 174.0)))
+    assert all_upfront["effective_monthly_usd"] == 14.5
+
+
+def test_upfront_without_a_lease_length_is_rejected():
+    with pytest.raises(ValueError, match="no lease length"):
+        price_purchase_option(_reserved("", "All Upfront", PriceDimension(0.0, INF, "Quantity", 100.0)))
+
+
+def test_compare_purchase_options_totals(architecture):
+    result = compare_purchase_options(architecture, FakePricingClient())
+    assert result["errors"] == {}
+    database = result["nodes"]["database"]
+    assert database["on_demand_monthly_usd"] == 26.28
+    assert database["cheapest_option"] == RDS_3YR_NO_UPFRONT
+    assert database["cheapest_monthly_usd"] == pytest.approx(0.0162 * 730)
+    assert len(database["options"]) == 7
+
+    total = result["total"]
+    assert total["on_demand_monthly_usd"] == pytest.approx(26.28 + 8.176)
+    assert total["cheapest_option"] == RDS_3YR_NO_UPFRONT
+    assert total["cheapest_option_monthly_usd"] == pytest.approx((0.0162 + 0.00504) * 730, abs=1e-4)
+    assert total["cheapest_mix_monthly_usd"] == total["cheapest_option_monthly_usd"]
+
+
+def test_nodes_without_an_option_stay_on_demand_in_the_totals(offers_dir, architecture):
+    store = build_price_store(offers_dir)
+    ec2_sku = "7E6C2951D78597C6"  # t3.micro in Mumbai
+    product = store.product("AmazonEC2", ec2_sku)
+    on_demand = store.records("AmazonEC2", ec2_sku, "OnDemand")
+    store.remove_product("AmazonEC2", ec2_sku)
+    store.add_records("AmazonEC2", product, on_demand)
+
+    result = compare_purchase_options(architecture, OfflinePricingClient(store))
+    assert [o["option"] for o in result["nodes"]["webAppServer"]["options"]] == ["OnDemand"]
+    assert result["total"]["by_option"][RDS_3YR_NO_UPFRONT] == pytest.approx(0.0162 * 730 + 8.176, abs=1e-4)
+
+
+def test_rds_node_without_term_type_is_compared(architecture):
+    for node in architecture["nodes"]:
+        node.get("attributes", {}).pop("termType", None)
+    result = compare_purchase_options(architecture, FakePricingClient())
+    assert result["errors"] == {}
+    assert set(result["nodes"]) == {"database", "webAppServer"}
@@ -0,0 +1,14 @@
+from aws_cost_estimation import estimate_architecture
+from fake_pricing import FakePricingClient
+from result_store import ResultStore, ResultWriter, node_regions, node_types
+
+
+def test_data_transfer_rows_roll_up_under_the_node_type(tmp_path, architecture):
+    estimate = estimate_architecture(architecture, FakePricingClient(), data_transfer=True)
+    with ResultWriter(str(tmp_path)) as writer:
+        writer.add_estimate("main", estimate, node_regions(architecture), node_types(architecture))
+
+    by_service = ResultStore(str(tmp_path)).group_sum(by="service")
+    assert by_service[("AmazonCloudFront",)] == 8.5
+    assert ("",) not in by_service
+    assert round(sum(by_service.values()), 4) == estimate["total_monthly_usd"]
@@ -0,0 +1,80 @@
+import pytest
+
+from rightsizing import InstanceIndex, InstanceOffer, annotate_architecture, create_instance_index
+
+
+@pytest.fixture(scope="module")
+def index(offers_dir):
+    return create_instance_index(offers_dir)
+
+
+def _types(offers):
+    return [(o.instance_type, o.region_code) for o in offers]
+
+
+def test_search_applies_the_size_constraints_in_price_order(index):
+    offers = index.search("AmazonEC2", min_vcpu=2, min_memory_gib=8, regions=["ap-south-1"])
+    assert _types(offers) == [("m5.large", "ap-south-1"), ("r5.large", "ap-south-1"), ("c5.xlarge", "ap-south-1")]
+    assert _types(index.search("AmazonEC2", min_network_gbps=10, regions=["ap-south-1"], k=1)) == [
+        ("c5.large", "ap-south-1")
+    ]
+    assert _types(index.search("AmazonEC2", regions=["ap-south-1"], families=["r5"])) == [("r5.large", "ap-south-1")]
+
+
+def test_search_merges_regions_by_price_and_stops_at_k(index):
+    offers = index.search("AmazonEC2", regions=["ap-south-1", "us-east-1", "ap-southeast-1"], k=4)
+    assert _types(offers) == [
+        ("t3.micro", "us-east-1"), ("t3.micro", "ap-south-1"), ("t3.micro", "ap-southeast-1"), ("t3.small", "us-east-1"),
+    ]
+    assert [o.hourly_usd for o in offers] == sorted(o.hourly_usd for o in offers)
+
+
+def test_search_stops_at_max_hourly_usd(index):
+    offers = index.search("AmazonRDS", regions=["us-east-1"], database_engine="postgresql", max_hourly_usd=0.036, k=10)
+    assert _types(offers) == [("db.t3.micro", "us-east-1"), ("db.t3.small", "us-east-1")]
+    assert all(o.database_engine == "PostgreSQL" for o in offers)
+
+
+def test_annotate_architecture_suggests_cheaper_alternatives(index, architecture):
+    for node in architecture["nodes"]:
+        if node["type"] == "AmazonEC2":
+            node["attributes"]["instanceType"] = "m5.large"
+    annotated = annotate_architecture(architecture, index, k=2, regions=["ap-south-1", "us-east-1"])
+
+    nodes = {node["id"]: node for node in annotated["nodes"]}
+    web = nodes["webAppServer"]["rightsizing"]
+    assert web["current"]["instanceType"] == "m5.large"
+    assert [(o["instanceType"], o["region"]) for o in web["alternatives"]] == [("m5.large", "us-east-1")]
+    assert web["alternatives"][0]["monthly_savings_usd"] == pytest.approx((0.101 - 0.096) * 730)
+
+    database = nodes["database"]["rightsizing"]
+    assert database["current"]["hourly_usd"] == 0.036
+    # db.t3.small in us-east-1 costs the same 0.036, so it is not an alternative
+    assert [(o["instanceType"], o["region"]) for o in database["alternatives"]] == [("db.t3.micro", "us-east-1")]
+    assert "rightsizing" not in nodes["lambdaFunction"]
+    assert "rightsizing" not in architecture["nodes"][0]
+
+
+def _sql_server(edition, hourly_usd, instance_type="db.m5.large"):
+    return InstanceOffer("AmazonRDS", instance_type, "m5", "General purpose", "us-east-1", "US East (N. Virginia)",
+                         2, 8.0, 10.0, "SQL Server", hourly_usd, f"SKU-{edition}-{instance_type}",
+                         "License included", edition)
+
+
+def test_license_model_and_edition_select_the_current_product():
+    index = InstanceIndex([
+        _sql_server("Express", 0.2), _sql_server("Standard", 1.0), _sql_server("Enterprise", 2.0),
+        _sql_server("Express", 0.1, "db.t3.large"), _sql_server("Standard", 0.5, "db.t3.large"),
+    ])
+    node = {"id": "db", "type": "AmazonRDS", "region": "US East (N. Virginia)",
+            "attributes": {"instanceType": "db.m5.large", "databaseEngine": "SQL Server"}}
+
+    annotated = annotate_architecture({"nodes": [node]}, index)
+    assert "set licenseModel and databaseEdition" in annotated["nodes"][0]["rightsizing"]["error"]
+
+    node["attributes"].update(licenseModel="License included", databaseEdition="Standard")
+    result = annotate_architecture({"nodes": [node]}, index)["nodes"][0]["rightsizing"]
+    assert result["current"]["hourly_usd"] == 1.0
+    # Only same-edition products are alternatives, never the cheaper Express ones
+    assert [(o["instanceType"], o["hourly_usd"]) for o in result["alternatives"]] == [("db.t3.large", 0.5)]
+    assert index.lookup("AmazonRDS", "us-east-1", "db.t3.large", "sql server", database_edition="express").hourly_usd == 0.1
@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+
+from aws_cost_estimation import estimate_architecture
+from fake_pricing import FakePricingClient
+from streaming_parser import estimate_architecture_file, group_architecture, iter_architecture
+
+
+def test_small_reads_match_estimate_architecture(tmp_path, architecture):
+    path = tmp_path / "architecture.json"
+    path.write_text(json.dumps(architecture, indent=2), encoding="utf-8")
+    client = FakePricingClient()
+
+    streamed = estimate_architecture_file(str(path), client, read_size=7)
+    expected = estimate_architecture(architecture, client)
+
+    assert streamed["total_monthly_usd"] == expected["total_monthly_usd"]
+    assert streamed["node_count"] == len(architecture["nodes"])
+    assert streamed["unpriced"] == {"AmazonCloudFront": 1, "AWSIAM": 1}
+    for config in streamed["configs"]:
+        assert config["unit_costs"] == {
+            k: v for k, v in expected["nodes"][config["example_node_id"]].items() if k != "type"
+        }
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 5])
+def test_numbers_and_separators_split_across_reads(read_size):
+    document = '{"title": "t", "n": 12345.5e1, "nodes": [ {"id": "a", "v": 1} ,{"id": "b", "v": [1, 22]}], "edges": []}'
+    items = list(iter_architecture(io.StringIO(document), read_size))
+    assert items == [
+        ("title", "t"),
+        ("n", 123455.0),
+        ("node", {"id": "a", "v": 1}),
+        ("node", {"id": "b", "v": [1, 22]}),
+    ]
+
+
+@pytest.mark.parametrize("document", [
+    '{"nodes": [{"id": "a"}',
+    '{"nodes": [{"id": "a"}, {"id": ',
+    '{"nodes": [{"id": "a"} {"id": "b"}]}',
+    '{"nodes": [{"id": "a"}], "edges": [] "title": 1}',
+    '{"nodes": [{"id": nope}]}',
+    '',
+])
+def test_truncated_or_malformed_documents_raise(document):
+    with pytest.raises(ValueError):
+        list(iter_architecture(io.StringIO(document), read_size=4))
+
+
+def test_malformed_value_stops_reading_at_the_size_cap():
+    stream = io.StringIO('{"nodes": [{"id": nope, "pad": "' + "x" * 100000 + '"}]}')
+    with pytest.raises(ValueError, match="larger than 64"):
+        group_architecture(stream, read_size=16, max_value_size=64)
+    assert stream.tell() < 200
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from aws_cost_estimation import get_s3_cost_estimate
+from fake_pricing import FakePricingClient
+from price_records import PriceDimension
+from tiered_pricing import TierTable
+
+INF = float("inf")
+# S3 Standard in ap-south-1, as in fixtures/offers
+S3_STANDARD = TierTable([
+    PriceDimension(512000.0, INF, "GB-Mo", 0.023),
+    PriceDimension(0.0, 51200.0, "GB-Mo", 0.025),
+    PriceDimension(51200.0, 512000.0, "GB-Mo", 0.024),
+])
+
+
+@pytest.mark.parametrize("quantity, expected", [
+    (0, 0.0),
+    (100, 2.5),
+    (51200, 1280.0),
+    (51201, 1280.024),
+    (512000, 1280.0 + 460800 * 0.024),
+    (1_000_000, 1280.0 + 460800 * 0.024 + 488000 * 0.023),
+])
+def test_cost_is_graduated_across_tiers(quantity, expected):
+    assert S3_STANDARD.cost(quantity) == pytest.approx(expected)
+
+
+def test_marginal_price_at_breakpoints():
+    assert S3_STANDARD.marginal_price(0) == 0.025
+    assert S3_STANDARD.marginal_price(51199.9) == 0.025
+    assert S3_STANDARD.marginal_price(51200) == 0.024
+    assert S3_STANDARD.marginal_price(10 ** 9) == 0.023
+
+
+def test_quantity_below_the_first_tier_is_free():
+    # Free-tier style tables whose first priced tier starts above zero
+    table = TierTable([PriceDimension(1000.0, INF, "Requests", 0.5)])
+    assert table.cost(0) == 0.0
+    assert table.cost(999) == 0.0
+    assert table.cost(1000) == 0.0
+    assert table.cost(1010) == pytest.approx(5.0)
+    assert table.marginal_price(0) == 0.5
+
+
+def test_cost_array_matches_cost():
+    quantities = np.array([0, 1, 51199.5, 51200, 51201, 511999, 512000, 512001, 5e6])
+    for table in (S3_STANDARD, TierTable([PriceDimension(1000.0, INF, "Requests", 0.5)]), TierTable.flat(0.1)):
+        assert table.cost_array(quantities) == pytest.approx([table.cost(q) for q in quantities])
+
+
+def test_empty_table_is_rejected():
+    with pytest.raises(ValueError):
+        TierTable([])
+
+
+def test_s3_storage_crossing_the_first_tier(architecture):
+    bucket = next(node for node in architecture["nodes"] if node["type"] == "AmazonS3")
+    bucket["attributes"]["storageGB"] = 60000
+    estimate = get_s3_cost_estimate(FakePricingClient(), architecture)
+    # 51200 GB at 0.025 plus 8800 GB at 0.024, not 60000 GB at a single rate
+    assert estimate["s3_storage_monthly_usd"] == 1491.2
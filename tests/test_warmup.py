@@ -0,0 +1,21 @@
+import io
+
+from aws_cost_estimation import estimate_architecture
+from fake_pricing import FakePricingClient
+from offline_pricing import OfflinePricingClient
+from warmup import WARMUP_FAMILIES, warm_price_store
+
+
+def test_warmed_store_prices_the_architecture_like_the_backend(architecture):
+    backend = FakePricingClient()
+    store, stats = warm_price_store(backend, ["ap-south-1", "us-east-1"], report=io.StringIO())
+
+    # The CloudFront catalogue is region-independent and fetched once
+    assert stats["queries"] == 2 * (len(WARMUP_FAMILIES) - 1) + 1
+    assert stats["failed"] == 0
+
+    expected = estimate_architecture(architecture, backend, data_transfer=True)
+    warmed = estimate_architecture(architecture, OfflinePricingClient(store), data_transfer=True)
+    assert warmed["errors"] == {}
+    assert warmed["data_transfer"]["nodes"] == {"cloudfrontCDN": 8.5}
+    assert warmed["total_monthly_usd"] == expected["total_monthly_usd"]
@@ -0,0 +1,76 @@
+import bisect
+import functools
+
+from price_records import PriceDimension
+
+
+class TierTable:
+    """Graduated price tiers compiled from a record's price dimensions.
+
+    Each tier is priced from its own beginRange, so the cost of a quantity is
+    the cost of every tier below it (precomputed as a running sum) plus the
+    part that falls in its own tier. Lookups are a binary search over the
+    breakpoints.
+    """
+
+    __slots__ = ("begins", "prices", "cumulative", "unit")
+
+    def __init__(self, dimensions):
+        dimensions = sorted(dimensions, key=lambda d: d.begin_range)
+        if not dimensions:
+            raise ValueError("A tier table needs at least one price dimension.")
+        self.begins = tuple(d.begin_range for d in dimensions)
+        self.prices = tuple(d.usd for d in dimensions)
+        self.unit = dimensions[0].unit
+        cumulative = [0.0]
+        for i in range(1, len(dimensions)):
+            cumulative.append(cumulative[-1] + (self.begins[i] - self.begins[i - 1]) * self.prices[i - 1])
+        self.cumulative = tuple(cumulative)
+
+    @classmethod
+    def flat(cls, price, unit=""):
+        return cls([PriceDimension(0.0, float("inf"), unit, price)])
+
+    def __len__(self):
+        return len(self.begins)
+
+    def _tier(self, quantity):
+        return bisect.bisect_right(self.begins, quantity) - 1
+
+    def marginal_price(self, quantity):
+        return self.prices[max(0, self._tier(quantity))]
+
+    def cost(self, quantity):
+        i = self._tier(quantity)
+        if i < 0:
+            return 0.0
+        return self.cumulative[i] + (quantity - self.begins[i]) * self.prices[i]
+
+    def cost_array(self, quantities):
+        # Same as cost(), for a whole NumPy array of quantities at once
+        import numpy as np
+
+        quantities = np.asarray(quantities, dtype=float)
+        begins = np.asarray(self.begins)
+        tiers = np.searchsorted(begins, quantities, side="right") - 1
+        below = tiers < 0
+        tiers = np.maximum(tiers, 0)
+        costs = np.asarray(self.cumulative)[tiers] + (quantities - begins[tiers]) * np.asarray(self.prices)[tiers]
+        return np.where(below, 0.0, costs)
+
+    def __repr__(self):
+        return f"TierTable(begins={list(self.begins)}, prices={list(self.prices)})"
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(dimensions):
+    return TierTable(dimensions)
+
+
+def tier_table(records, description, term_type=None):
+    # Tier table of the first matching record. Records come back from the
+    # caches as the same objects, so each one is only compiled once.
+    for record in records:
+        if term_type is None or record.term_type == term_type:
+            return _compile(record.dimensions)
+    raise ValueError(f"Could not fetch {description} pricing info.")
@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from aws_cost_estimation import REGION_CODE_MAP, SharedPricingClient, make_query_key, resolve_regions
+from offline_pricing import OfflinePriceStore
+
+DEFAULT_STORE_PATH = "prices.store.json.gz"
+PAGE_SIZE = 100
+
+
+def _term_matches(**fields):
+    return [{"Type": "TERM_MATCH", "Field": field, "Value": value} for field, value in fields.items()]
+
+
+# family name -> (service code, filters for a (region name, region code) pair).
+# Each family is broad enough to cover every query the estimators make for it.
+WARMUP_FAMILIES = {
+    "ec2-instances": ("AmazonEC2", lambda location, region_code: _term_matches(
+        productFamily="Compute Instance", location=location, operatingSystem="Linux",
+        tenancy="Shared", capacitystatus="Used", preInstalledSw="NA")),
+    "ebs-volumes": ("AmazonEC2", lambda location, region_code: _term_matches(
+        productFamily="Storage", location=location)),
+    "rds-instances": ("AmazonRDS", lambda location, region_code: _term_matches(
+        productFamily="Database Instance", regionCode=region_code, deploymentOption="Single-AZ")),
+    "rds-storage": ("AmazonRDS", lambda location, region_code: _term_matches(
+        productFamily="Database Storage", regionCode=region_code)),
+    "s3-storage": ("AmazonS3", lambda location, region_code: _term_matches(
+        productFamily="Storage", location=location)),
+    "s3-requests": ("AmazonS3", lambda location, region_code: _term_matches(
+        productFamily="Requests", regionCode=region_code)),
+    "lambda": ("AWSLambda", lambda location, region_code: _term_matches(
+        productFamily="Serverless", regionCode=region_code)),
+    "data-transfer": ("AWSDataTransfer", lambda location, region_code: _term_matches(
+        productFamily="Data Transfer", fromLocation=location)),
+    # CloudFront is priced by edge geography, not by region, so this is the
+    # same catalogue for every region and is fetched once
+    "cloudfront": ("AmazonCloudFront", lambda location, region_code: _term_matches(
+        productFamily="Data Transfer", transferType="CloudFront Outbound")),
+}
+
+
+def fetch_all_pages(pricing_client, service_code, filters, page_size=PAGE_SIZE):
+    price_list = []
+    next_token = None
+    while True:
+        kwargs = {"NextToken": next_token} if next_token else {}
+        with instrumentation.QueryTimer(pricing_client, service_code, filters) as timer:
+            response = timer.received(
+                pricing_client.get_products(ServiceCode=service_code, Filters=filters, MaxResults=page_size, **kwargs)
+            )
+        price_list.extend(response.get("PriceList", ()))
+        next_token = response.get("NextToken")
+        if not next_token:
+            return price_list
+
+
+def warm_price_store(pricing_client, regions, families=None, store=None, max_workers=4, report=sys.stderr):
+    store = store if store is not None else OfflinePriceStore()
+    families = families or list(WARMUP_FAMILIES)
+    jobs = []
+    seen = set()
+    for location, region_code in resolve_regions(regions):
+        for family in families:
+            service_code, build_filters = WARMUP_FAMILIES[family]
+            filters = build_filters(location, region_code)
+            key = make_query_key(service_code, filters)
+            if key not in seen:
+                seen.add(key)
+                jobs.append((family, region_code, filters))
+
+    def run(job):
+        family, _, filters = job
+        return fetch_all_pages(pricing_client, WARMUP_FAMILIES[family][0], filters)
+
+    stats = {"queries": len(jobs), "products": 0, "failed": 0}
+    started_at = time.perf_counter()
+    # Pages are fetched concurrently; the store itself is only touched here
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(job, executor.submit(run, job)) for job in jobs]
+        for (family, region_code, _), future in futures:
+            service_code = WARMUP_FAMILIES[family][0]
+            try:
+                price_list = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"{family} {region_code}: {type(e).__name__}: {e}", file=report)
+                continue
+            for price_item in price_list:
+                store.add_price_item(service_code, price_item)
+            stats["products"] += len(price_list)
+            print(f"{family} {region_code}: {len(price_list)} products", file=report)
+
+    stats["seconds"] = round(time.perf_counter() - started_at, 3)
+    return store, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch whole price catalogues into the local price store.")
+    parser.add_argument("regions", nargs="*", default=["ap-south-1"], help="Region codes or location names")
+    parser.add_argument("--all-regions", action="store_true", help="Warm every region in REGION_CODE_MAP")
+    parser.add_argument("--families", nargs="+", choices=sorted(WARMUP_FAMILIES), default=None)
+    parser.add_argument("-o", "--output", default=DEFAULT_STORE_PATH, help="Price store to create or extend")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Concurrent catalogue downloads")
+    args = parser.parse_args(argv)
+
+    regions = list(REGION_CODE_MAP.values()) if args.all_regions else args.regions
+    store = OfflinePriceStore.load(args.output) if os.path.exists(args.output) else OfflinePriceStore()
+    store, stats = warm_price_store(SharedPricingClient(), regions, args.families, store, args.workers)
+    store.save(args.output)
+    print(
+        f"Loaded {stats['products']} products from {stats['queries']} catalogue queries in "
+        f"{stats['seconds']}s ({stats['failed']} failed); {store.product_count()} products in {args.output}",
+        file=sys.stderr,
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())